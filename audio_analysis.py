@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Music Analysis for Beat-Synced Editing
+Onset and beat detection for music tracks, cached per track content
+"""
+
+import os
+import json
+import shutil
+import tempfile
+import threading
+import subprocess
+from typing import Dict, List, Tuple
+
+from render_cache import source_digest
+
+try:
+    import numpy as np
+    AUDIO_ANALYSIS_AVAILABLE = True
+except ImportError:
+    AUDIO_ANALYSIS_AVAILABLE = False
+
+# Stored in each entry; an entry from another version is recomputed and
+# overwritten in place. Raise it when onset or beat detection changes
+ANALYSIS_VERSION = 1
+
+SAMPLE_RATE = 22050
+FFT_SIZE = 2048
+HOP_SIZE = 512
+
+def decode_audio(path: str, sample_rate: int = SAMPLE_RATE) -> "np.ndarray":
+    """Decode any audio/video file to mono float32 samples with ffmpeg"""
+    if not shutil.which("ffmpeg"):
+        raise RuntimeError("ffmpeg is required to decode audio")
+    
+    cmd = [
+        'ffmpeg', '-v', 'error',
+        '-i', path,
+        '-vn',
+        '-ac', '1',
+        '-ar', str(sample_rate),
+        '-f', 'f32le',
+        'pipe:1'
+    ]
+    result = subprocess.run(cmd, capture_output=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"FFmpeg audio decode failed: {result.stderr.decode(errors='replace')}")
+    return np.frombuffer(result.stdout, dtype=np.float32)
+
+def onset_envelope(samples: "np.ndarray", n_fft: int = FFT_SIZE,
+                   hop: int = HOP_SIZE) -> "np.ndarray":
+    """Spectral flux: summed positive change in log magnitude, one value per hop
+    (frame i is centered on sample i * hop)"""
+    samples = np.pad(samples, (n_fft // 2, n_fft // 2))
+    
+    # All STFT frames as one strided view, transformed in a single batch
+    frames = np.lib.stride_tricks.sliding_window_view(samples, n_fft)[::hop]
+    spectrum = np.abs(np.fft.rfft(frames * np.hanning(n_fft).astype(np.float32), axis=1))
+    log_spectrum = np.log1p(100.0 * spectrum)
+    
+    flux = np.maximum(np.diff(log_spectrum, axis=0, prepend=log_spectrum[:1]), 0.0).sum(axis=1)
+    flux -= np.convolve(flux, np.ones(16) / 16, mode="same")  # Remove the slow trend
+    flux = np.maximum(flux, 0.0)
+    return flux / (flux.max() + 1e-9)
+
+def detect_onsets(envelope: "np.ndarray", frame_rate: float,
+                  threshold: float = 0.1, min_gap: float = 0.05) -> List[float]:
+    """Onset times (seconds) at local envelope peaks above an adaptive threshold"""
+    radius = max(1, int(round(min_gap * frame_rate)))
+    padded = np.pad(envelope, radius, mode="constant")
+    neighbourhood = np.lib.stride_tricks.sliding_window_view(padded, 2 * radius + 1)
+    local_mean = np.convolve(envelope, np.ones(2 * radius + 1) / (2 * radius + 1), mode="same")
+    
+    peaks = ((envelope == neighbourhood.max(axis=1))
+             & (envelope > local_mean + threshold)
+             & (envelope > 0))
+    return (np.flatnonzero(peaks) / frame_rate).tolist()
+
+def estimate_tempo(envelope: "np.ndarray", frame_rate: float,
+                   min_bpm: float = 60.0, max_bpm: float = 200.0) -> float:
+    """Tempo (BPM) from the envelope's autocorrelation, favouring ~120 BPM"""
+    centered = envelope - envelope.mean()
+    size = 1 << int(np.ceil(np.log2(2 * len(centered))))
+    spectrum = np.fft.rfft(centered, size)
+    autocorrelation = np.fft.irfft(spectrum * np.conj(spectrum), size)[:len(centered)]
+    
+    lags = np.arange(max(1, int(frame_rate * 60.0 / max_bpm)),
+                     min(len(autocorrelation), int(frame_rate * 60.0 / min_bpm) + 1))
+    if len(lags) == 0:
+        return 0.0
+    
+    # Log-normal prior around 120 BPM breaks octave ambiguity
+    bpm = 60.0 * frame_rate / lags
+    prior = np.exp(-0.5 * (np.log2(bpm / 120.0) / 1.0) ** 2)
+    best = lags[int(np.argmax(autocorrelation[lags] * prior))]
+    
+    # Parabolic interpolation between neighbouring lags for sub-frame precision
+    if 0 < best < len(autocorrelation) - 1:
+        left, center, right = autocorrelation[best - 1:best + 2]
+        curvature = left - 2 * center + right
+        if curvature < 0:
+            best = best + 0.5 * (left - right) / curvature
+    return float(60.0 * frame_rate / best)
+
+def track_beats(envelope: "np.ndarray", frame_rate: float, tempo: float) -> List[float]:
+    """Beat times on the regular grid (tempo within 2%, any phase) that best
+    matches the envelope, each snapped to the strongest onset within a tenth
+    of a beat"""
+    if tempo <= 0 or len(envelope) == 0:
+        return []
+    period = 60.0 * frame_rate / tempo
+    
+    # Score every (period, phase) grid at once: axes are period, phase, beat
+    periods = period * (1.0 + np.linspace(-0.02, 0.02, 41))
+    phases = np.arange(int(np.ceil(periods.max())))
+    beat_numbers = np.arange(int(len(envelope) / periods.min()) + 1)
+    grid = phases[None, :, None] + periods[:, None, None] * beat_numbers[None, None, :]
+    indices = np.round(grid).astype(int)
+    valid = (indices < len(envelope)) & (phases[None, :, None] < periods[:, None, None])
+    scores = np.where(valid, envelope[np.minimum(indices, len(envelope) - 1)], 0.0).sum(axis=2)
+    best_period, best_phase = np.unravel_index(int(np.argmax(scores)), scores.shape)
+    period = periods[best_period]
+    beats = indices[best_period, best_phase]
+    beats = beats[beats < len(envelope)]
+    
+    radius = max(1, int(period * 0.1))
+    padded = np.pad(envelope, radius, mode="constant")
+    windows = np.lib.stride_tricks.sliding_window_view(padded, 2 * radius + 1)[beats]
+    snapped = beats + windows.argmax(axis=1) - radius
+    return (np.maximum(snapped, 0) / frame_rate).tolist()
+
+def analyze_track(path: str, sample_rate: int = SAMPLE_RATE) -> Dict:
+    """Decode a track once and compute its tempo, beats and onsets"""
+    samples = decode_audio(path, sample_rate)
+    frame_rate = sample_rate / HOP_SIZE
+    envelope = onset_envelope(samples)
+    beats = track_beats(envelope, frame_rate, estimate_tempo(envelope, frame_rate))
+    # Report the tempo of the fitted grid rather than the coarse estimate
+    tempo = 60.0 * (len(beats) - 1) / (beats[-1] - beats[0]) if len(beats) > 1 else 0.0
+    
+    return {
+        "duration": len(samples) / sample_rate,
+        "tempo": round(tempo, 2),
+        "beats": [round(t, 4) for t in beats],
+        "onsets": [round(t, 4) for t in detect_onsets(envelope, frame_rate)]
+    }
+
+class AudioAnalysisCache:
+    """Persistent per-track analysis results keyed by the track's content hash
+    
+    A library of a few dozen tracks reused across thousands of posts is
+    decoded and analysed once per track; every later lookup is a JSON read.
+    """
+    
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+    
+    def analyze(self, path: str) -> Dict:
+        """Cached analysis of a track, computing and storing it on a miss"""
+        entry_path = os.path.join(self.cache_dir, f"{source_digest(path)}.json")
+        
+        try:
+            with open(entry_path, 'r') as f:
+                entry = json.load(f)
+            if entry.get("version") == ANALYSIS_VERSION:
+                with self._lock:
+                    self.hits += 1
+                return entry
+        except (OSError, ValueError):
+            pass
+        
+        with self._lock:
+            self.misses += 1
+        entry = {"version": ANALYSIS_VERSION, **analyze_track(path)}
+        
+        fd, temp_path = tempfile.mkstemp(prefix=".analysis-", dir=self.cache_dir)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(entry, f)
+        os.replace(temp_path, entry_path)
+        return entry
+    
+    def stats(self) -> Dict:
+        """Hit/miss counters"""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+def plan_beat_cuts(beats: List[float], clips: List[Tuple[str, float]],
+                   duration: float = 30.0, beats_per_cut: int = 4,
+                   min_cut: float = 1.0) -> List[Dict]:
+    """Assign footage to beat-aligned cuts
+    
+    Every cut spans beats_per_cut beats (doubled until it lasts at least
+    min_cut seconds) and the plan stops at the last beat within duration.
+    Clips are used round-robin, each continuing where its previous cut
+    ended and skipped once they run out of footage. Returns
+    [{"path", "start_time", "duration", "at"}, ...] where "at" is the cut's
+    position on the music timeline.
+    """
+    beats = [t for t in beats if t <= duration]
+    if len(beats) < 2 or not clips:
+        return []
+    
+    beat_period = (beats[-1] - beats[0]) / (len(beats) - 1)
+    while beats_per_cut * beat_period < min_cut:
+        beats_per_cut *= 2
+    
+    cursors = {path: 0.0 for path, _ in clips}
+    cuts = []
+    clip_index = 0
+    for i in range(0, len(beats) - 1, beats_per_cut):
+        start, end = beats[i], beats[min(i + beats_per_cut, len(beats) - 1)]
+        length = end - start
+        
+        # Next clip (round-robin) with enough footage left for this cut
+        for _ in range(len(clips)):
+            path, clip_duration = clips[clip_index % len(clips)]
+            clip_index += 1
+            if cursors[path] + length <= clip_duration:
+                break
+        else:
+            break
+        
+        cuts.append({"path": path, "start_time": round(cursors[path], 4),
+                     "duration": round(length, 4), "at": round(start, 4)})
+        cursors[path] += length
+    
+    return cuts
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Audio Asset Store for Music Tracks
+Transcodes each track once to the delivery AAC profile at a target loudness
+"""
+
+import os
+import re
+import json
+import shutil
+import hashlib
+import tempfile
+import threading
+import subprocess
+from typing import Dict, Optional
+
+from render_cache import source_digest
+
+# Part of the profile, so raising it renames every asset and loudness file.
+# Raise it when the loudnorm/AAC transcode chain changes
+ASSET_VERSION = 1
+
+# Trimmed variants are cut at the smallest of these that covers the request
+COMMON_DURATIONS = (15.0, 30.0, 60.0)
+
+class AudioAssetStore:
+    """Loudness-normalized AAC copies of music tracks, ready to stream-copy
+    
+    Assets live under <store_dir>/<track sha256>/, next to the track's EBU R128
+    measurement for their profile, so muxing music into a video never
+    re-encodes audio. Trimmed
+    variants at common durations (with a short fade-out) are kept alongside
+    the full-length asset.
+    """
+    
+    def __init__(self, store_dir: str, bitrate: str = "128k", sample_rate: int = 44100,
+                 target_lufs: float = -14.0, true_peak: float = -1.5,
+                 loudness_range: float = 11.0):
+        self.store_dir = store_dir
+        self.profile = {
+            "version": ASSET_VERSION,
+            "codec": "aac",
+            "bitrate": bitrate,
+            "sample_rate": sample_rate,
+            "channels": 2,
+            "lufs": target_lufs,
+            "true_peak": true_peak,
+            "lra": loudness_range
+        }
+        self.profile_id = hashlib.sha256(
+            json.dumps(self.profile, sort_keys=True).encode()).hexdigest()[:12]
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(store_dir, exist_ok=True)
+    
+    def asset(self, audio_path: str, duration: Optional[float] = None) -> str:
+        """Path of the track's asset, covering at least duration seconds when given"""
+        folder = os.path.join(self.store_dir, source_digest(audio_path))
+        variant = self._variant_duration(duration)
+        suffix = f"_{int(variant)}s" if variant else ""
+        asset_path = os.path.join(folder, f"{self.profile_id}{suffix}.m4a")
+        
+        if os.path.exists(asset_path):
+            with self._lock:
+                self.hits += 1
+            return asset_path
+        
+        with self._lock:
+            self.misses += 1
+        os.makedirs(folder, exist_ok=True)
+        loudness = self.loudness(audio_path)
+        self._transcode(audio_path, asset_path, loudness, variant)
+        return asset_path
+    
+    def loudness(self, audio_path: str) -> Dict:
+        """EBU R128 measurement of a track (integrated, true peak, range) against
+        this store's targets, cached per track and profile"""
+        folder = os.path.join(self.store_dir, source_digest(audio_path))
+        # The first pass measures against the profile's targets (target_offset
+        # depends on them), so each profile keeps its own measurement
+        measurement_path = os.path.join(folder, f"loudness_{self.profile_id}.json")
+        
+        try:
+            with open(measurement_path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            pass
+        
+        measurement = measure_loudness(audio_path, self.profile)
+        os.makedirs(folder, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(prefix=".loudness-", dir=folder)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(measurement, f)
+        os.replace(temp_path, measurement_path)
+        return measurement
+    
+    @staticmethod
+    def _variant_duration(duration: Optional[float]) -> Optional[float]:
+        if duration is None:
+            return None
+        return next((d for d in COMMON_DURATIONS if d >= duration), None)
+    
+    def _transcode(self, audio_path: str, asset_path: str, loudness: Dict,
+                   duration: Optional[float] = None):
+        """Second loudnorm pass (linear, using the cached measurement) to AAC"""
+        profile = self.profile
+        filters = [
+            f"loudnorm=I={profile['lufs']}:TP={profile['true_peak']}:LRA={profile['lra']}"
+            f":measured_I={loudness['input_i']}:measured_TP={loudness['input_tp']}"
+            f":measured_LRA={loudness['input_lra']}:measured_thresh={loudness['input_thresh']}"
+            f":offset={loudness['target_offset']}:linear=true",
+            f"aresample={profile['sample_rate']}"
+        ]
+        if duration:
+            filters.append(f"afade=t=out:st={max(0.0, duration - 1.0)}:d=1")
+        
+        cmd = ['ffmpeg', '-y', '-v', 'error', '-i', audio_path, '-vn']
+        if duration:
+            cmd += ['-t', str(duration)]
+        cmd += [
+            '-af', ','.join(filters),
+            '-c:a', 'aac',
+            '-b:a', profile['bitrate'],
+            '-ac', str(profile['channels']),
+            '-movflags', '+faststart'
+        ]
+        
+        fd, temp_path = tempfile.mkstemp(prefix=".asset-", suffix=".m4a",
+                                         dir=os.path.dirname(asset_path))
+        os.close(fd)
+        try:
+            result = subprocess.run(cmd + [temp_path], capture_output=True, text=True)
+            if result.returncode != 0:
+                raise RuntimeError(f"FFmpeg audio transcode failed: {result.stderr}")
+            os.replace(temp_path, asset_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+    
+    def stats(self) -> Dict:
+        """Hit/miss counters"""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+def measure_loudness(audio_path: str, profile: Dict) -> Dict:
+    """First loudnorm pass: the track's EBU R128 loudness figures"""
+    if not shutil.which("ffmpeg"):
+        raise RuntimeError("ffmpeg is required to measure loudness")
+    
+    cmd = [
+        'ffmpeg', '-hide_banner', '-nostats',
+        '-i', audio_path,
+        '-vn',
+        '-af', f"loudnorm=I={profile['lufs']}:TP={profile['true_peak']}"
+               f":LRA={profile['lra']}:print_format=json",
+        '-f', 'null', '-'
+    ]
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    match = re.search(r'\{[^{}]*"input_i"[^{}]*\}', result.stderr)
+    if result.returncode != 0 or match is None:
+        raise RuntimeError(f"FFmpeg loudness measurement failed: {result.stderr[-500:]}")
+    
+    measurement = json.loads(match.group(0))
+    return {key: measurement[key] for key in
+            ("input_i", "input_tp", "input_lra", "input_thresh", "target_offset")}
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Video Processing Benchmark
+Measures render throughput of the VideoProcessor pipeline
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+from video_processor import VideoProcessor
+
+# Operation chain used for every benchmark run
+BENCHMARK_OPERATIONS = [
+    {"op": "resize", "width": 1080, "height": 1920},
+    {"op": "enhance"},
+    {"op": "cinematic"},
+    {"op": "overlay", "text": "Drone life"}
+]
+
+# Single effects timed on their own, at source resolution
+EFFECT_OPERATIONS = {
+    "resize": [{"op": "resize", "width": 1080, "height": 1920}],
+    "enhance": [{"op": "enhance"}],
+    "cinematic": [{"op": "cinematic"}],
+    "overlay": [{"op": "overlay", "text": "Drone life"}],
+    "stabilize": [{"op": "stabilize"}]
+}
+
+def benchmark_effects(input_path: str, effects, output_dir: str) -> list:
+    """Render the clip once per effect and measure end-to-end throughput
+    
+    Stabilization includes its motion analysis pass.
+    """
+    processor = VideoProcessor()
+    frame_count = processor.get_video_info(input_path).get("frame_count", 0)
+    
+    results = []
+    for effect in effects:
+        output_path = os.path.join(output_dir, f"effect_{effect}.mp4")
+        
+        start = time.perf_counter()
+        ok = processor.process_video(input_path, output_path, EFFECT_OPERATIONS[effect])
+        elapsed = time.perf_counter() - start
+        
+        results.append({
+            "effect": effect,
+            "seconds": elapsed,
+            "fps": frame_count / elapsed if elapsed > 0 else 0.0,
+            "success": ok
+        })
+    
+    return results
+
+def print_effects(results: list):
+    """Print per-effect throughput"""
+    print("\n🎛️  Effect throughput")
+    print("-" * 50)
+    print(f"{'effect':>10} {'seconds':>10} {'fps':>10}")
+    
+    for result in results:
+        status = "" if result["success"] else "  (failed)"
+        print(f"{result['effect']:>10} {result['seconds']:>10.2f} "
+              f"{result['fps']:>10.1f}{status}")
+
+def benchmark_segment_scaling(input_path: str, worker_counts, output_dir: str) -> list:
+    """Render the same clip with segment parallelism at each worker count"""
+    processor = VideoProcessor(workers=1)
+    info = processor.get_video_info(input_path)
+    frame_count = info.get("frame_count", 0)
+    
+    results = []
+    for workers in worker_counts:
+        output_path = os.path.join(output_dir, f"segments_{workers}.mp4")
+        
+        start = time.perf_counter()
+        ok = processor.process_video_parallel(input_path, output_path,
+                                              BENCHMARK_OPERATIONS, workers=workers)
+        elapsed = time.perf_counter() - start
+        
+        results.append({
+            "workers": workers,
+            "seconds": elapsed,
+            "fps": frame_count / elapsed if elapsed > 0 else 0.0,
+            "success": ok
+        })
+    
+    return results
+
+def print_scaling_curve(results: list):
+    """Print the scaling table relative to the first run"""
+    print("\n📈 Segment scaling")
+    print("-" * 50)
+    print(f"{'workers':>8} {'seconds':>10} {'fps':>10} {'speedup':>10}")
+    
+    baseline = results[0]["seconds"] if results else 0.0
+    for result in results:
+        speedup = baseline / result["seconds"] if result["seconds"] > 0 else 0.0
+        status = "" if result["success"] else "  (failed)"
+        print(f"{result['workers']:>8} {result['seconds']:>10.2f} "
+              f"{result['fps']:>10.1f} {speedup:>9.2f}x{status}")
+
+def main():
+    """Run video processing benchmarks"""
+    parser = argparse.ArgumentParser(description="VideoProcessor benchmark")
+    parser.add_argument("--input", default="videos/content_1.mp4", help="Source clip")
+    parser.add_argument("--workers", default="1,2,4,8",
+                        help="Comma-separated worker counts for segment scaling")
+    parser.add_argument("--effects", default=",".join(EFFECT_OPERATIONS),
+                        help="Comma-separated effects to time individually")
+    
+    args = parser.parse_args()
+    
+    if not os.path.exists(args.input):
+        print(f"❌ Video not found: {args.input}")
+        sys.exit(1)
+    
+    worker_counts = [int(w) for w in args.workers.split(",") if w.strip()]
+    effects = [e.strip() for e in args.effects.split(",") if e.strip()]
+    unknown = [e for e in effects if e not in EFFECT_OPERATIONS]
+    if unknown:
+        print(f"❌ Unknown effects: {', '.join(unknown)}")
+        sys.exit(1)
+    
+    print("⏱️  Video Processing Benchmark")
+    print("=" * 50)
+    print(f"Input: {args.input}")
+    print(f"CPU cores: {os.cpu_count()}")
+    
+    with tempfile.TemporaryDirectory() as output_dir:
+        effect_results = benchmark_effects(args.input, effects, output_dir)
+        results = benchmark_segment_scaling(args.input, worker_counts, output_dir)
+    
+    print_effects(effect_results)
+    print_scaling_curve(results)
+
+if __name__ == "__main__":
+    main()
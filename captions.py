@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Caption Rendering for Video Overlays
+Rasterizes caption text (emoji included) into RGBA sprites once per clip
+"""
+
+import os
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import cv2
+    import numpy as np
+    from PIL import Image, ImageDraw, ImageFont
+    CAPTIONS_AVAILABLE = True
+except ImportError:
+    CAPTIONS_AVAILABLE = False
+
+# Searched in order; CAPTION_FONT overrides
+FONT_CANDIDATES = [
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
+    "/usr/share/fonts/TTF/DejaVuSans-Bold.ttf",
+    "/usr/share/fonts/truetype/liberation/LiberationSans-Bold.ttf",
+    "/System/Library/Fonts/Supplemental/Arial Bold.ttf",
+    "/Library/Fonts/Arial Bold.ttf",
+    "C:/Windows/Fonts/arialbd.ttf"
+]
+
+# Color emoji fonts; CAPTION_EMOJI_FONT overrides
+EMOJI_FONT_CANDIDATES = [
+    "/usr/share/fonts/truetype/noto/NotoColorEmoji.ttf",
+    "/usr/share/fonts/noto/NotoColorEmoji.ttf",
+    "/System/Library/Fonts/Apple Color Emoji.ttc",
+    "C:/Windows/Fonts/seguiemj.ttf"
+]
+
+# Bitmap color emoji fonts only ship this strike size
+EMOJI_STRIKE_SIZE = 109
+
+def find_font(candidates: List[str], env_var: str) -> Optional[str]:
+    """First existing font path, preferring the environment override"""
+    override = os.getenv(env_var)
+    if override and os.path.exists(override):
+        return override
+    return next((path for path in candidates if os.path.exists(path)), None)
+
+def is_emoji(char: str) -> bool:
+    """Whether a character belongs to the emoji/pictograph ranges"""
+    code = ord(char)
+    return (code >= 0x1F000 or 0x2600 <= code <= 0x27BF or 0x2B00 <= code <= 0x2BFF
+            or code in (0x200D, 0xFE0F, 0x20E3))
+
+def split_runs(text: str) -> List[Tuple[str, bool]]:
+    """Split text into (chunk, is_emoji) runs"""
+    runs = []
+    for char in text:
+        emoji = is_emoji(char)
+        if runs and runs[-1][1] == emoji:
+            runs[-1] = (runs[-1][0] + char, emoji)
+        else:
+            runs.append((char, emoji))
+    return runs
+
+class CaptionRenderer:
+    """Rasterizes captions with TrueType fonts into BGRA sprites"""
+    
+    def __init__(self, font_path: Optional[str] = None,
+                 emoji_font_path: Optional[str] = None):
+        if not CAPTIONS_AVAILABLE:
+            raise ImportError("Caption rendering libraries not available")
+        self.font_path = font_path or find_font(FONT_CANDIDATES, "CAPTION_FONT")
+        self.emoji_font_path = emoji_font_path or find_font(EMOJI_FONT_CANDIDATES,
+                                                            "CAPTION_EMOJI_FONT")
+        self._fonts = {}
+    
+    def _font(self, size: int):
+        if size not in self._fonts:
+            if self.font_path:
+                self._fonts[size] = ImageFont.truetype(self.font_path, size)
+            else:
+                self._fonts[size] = ImageFont.load_default(size=size)
+        return self._fonts[size]
+    
+    def _emoji_font(self):
+        if not self.emoji_font_path:
+            return None
+        if "emoji" not in self._fonts:
+            try:
+                self._fonts["emoji"] = ImageFont.truetype(self.emoji_font_path,
+                                                          EMOJI_STRIKE_SIZE)
+            except OSError:
+                self._fonts["emoji"] = None
+        return self._fonts["emoji"]
+    
+    def _render_run(self, chunk: str, emoji: bool, size: int) -> "Image.Image":
+        """One run of text as a tightly cropped RGBA image, line-height tall"""
+        emoji_font = self._emoji_font() if emoji else None
+        font = emoji_font or self._font(size)
+        ascent, descent = font.getmetrics()
+        width = max(1, int(np.ceil(font.getlength(chunk))))
+        image = Image.new("RGBA", (width, ascent + descent), (0, 0, 0, 0))
+        ImageDraw.Draw(image).text((0, 0), chunk, font=font, fill=(255, 255, 255, 255),
+                                   embedded_color=emoji_font is not None)
+        
+        if emoji_font is not None:
+            # Scale the fixed-size emoji strike to the text's line height
+            text_ascent, text_descent = self._font(size).getmetrics()
+            line_height = text_ascent + text_descent
+            scale = line_height / image.height
+            image = image.resize((max(1, int(image.width * scale)), line_height),
+                                 Image.LANCZOS)
+        return image
+    
+    def _render_line(self, line: str, size: int) -> "Image.Image":
+        # Without a color emoji font, emoji would draw as missing-glyph boxes
+        runs = [self._render_run(chunk, emoji, size) for chunk, emoji in split_runs(line)
+                if not emoji or self._emoji_font() is not None]
+        ascent, descent = self._font(size).getmetrics()
+        image = Image.new("RGBA", (max(1, sum(run.width for run in runs)), ascent + descent),
+                          (0, 0, 0, 0))
+        x = 0
+        for run in runs:
+            image.alpha_composite(run, (x, 0))
+            x += run.width
+        return image
+    
+    def _wrap(self, text: str, size: int, max_width: int) -> List[str]:
+        """Greedy word wrap measured with the same fonts used to draw"""
+        lines = []
+        for paragraph in text.split("\n"):
+            line = ""
+            for word in paragraph.split(" "):
+                candidate = f"{line} {word}" if line else word
+                if line and self._render_line(candidate, size).width > max_width:
+                    lines.append(line)
+                    line = word
+                else:
+                    line = candidate
+            lines.append(line)
+        return lines
+    
+    def render(self, text: str, font_size: int, max_width: int,
+               text_color: Tuple[int, int, int] = (255, 255, 255),
+               background: Tuple[int, int, int, int] = (0, 0, 0, 170),
+               padding: int = 10) -> "np.ndarray":
+        """Caption on a rounded box as a BGRA uint8 sprite"""
+        lines = [self._render_line(line, font_size)
+                 for line in self._wrap(text, font_size, max_width - 2 * padding)]
+        text_width = max(line.width for line in lines)
+        text_height = sum(line.height for line in lines)
+        
+        sprite = Image.new("RGBA", (text_width + 2 * padding, text_height + 2 * padding),
+                           (0, 0, 0, 0))
+        ImageDraw.Draw(sprite).rounded_rectangle(
+            (0, 0, sprite.width - 1, sprite.height - 1), radius=padding, fill=background)
+        
+        y = padding
+        for line in lines:
+            # Tint the white text glyphs; color emoji keep their own colors
+            tinted = np.array(line)
+            white = (tinted[:, :, 0] == 255) & (tinted[:, :, 1] == 255) & (tinted[:, :, 2] == 255)
+            tinted[white, :3] = text_color
+            sprite.alpha_composite(Image.fromarray(tinted),
+                                   ((sprite.width - line.width) // 2, y))
+            y += line.height
+        
+        return cv2.cvtColor(np.array(sprite), cv2.COLOR_RGBA2BGRA)
+
+def normalize_captions(text: str = "", position: str = "bottom",
+                       captions: Optional[List[Dict]] = None) -> List[Dict]:
+    """Single static caption or a timed track as a list of caption dicts"""
+    if captions is None:
+        captions = [{"text": text, "position": position}] if text else []
+    
+    track = []
+    for caption in captions:
+        track.append({
+            "text": caption["text"],
+            "position": caption.get("position", position),
+            "start": float(caption.get("start", 0.0)),
+            "end": float(caption.get("end", float("inf"))),
+            "fade": float(caption.get("fade", 0.0))
+        })
+    return track
+
+def caption_opacity(caption: Dict, t: float) -> float:
+    """Opacity of a caption at time t, with linear fade in/out"""
+    if not caption["start"] <= t < caption["end"]:
+        return 0.0
+    fade = caption["fade"]
+    if fade <= 0:
+        return 1.0
+    return max(0.0, min(1.0, (t - caption["start"]) / fade, (caption["end"] - t) / fade))
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Chunked Video Upload for TikTok
+Parallel, resumable Content-Range PUTs of memory-mapped file slices
+"""
+
+import os
+import mmap
+import asyncio
+import json
+import time
+import tempfile
+import threading
+import mimetypes
+from typing import Dict, Optional, Tuple
+
+import requests
+
+from http_transport import AsyncHTTPTransport
+from rate_limiter import retry_delay
+
+# TikTok's limits: chunks of 5-64 MB, files under 5 MB go up whole, and the
+# last chunk absorbs the remainder (up to 128 MB)
+MIN_CHUNK_SIZE = 5 * 1024 * 1024
+MAX_CHUNK_SIZE = 64 * 1024 * 1024
+DEFAULT_CHUNK_SIZE = 10 * 1024 * 1024
+
+# Upload URLs expire an hour after init; older progress records start over
+UPLOAD_URL_TTL = 55 * 60
+
+# Statuses worth retrying a chunk for; any other error ends the upload
+RETRYABLE_STATUSES = (408, 429, 500, 502, 503, 504)
+
+def plan_chunks(video_size: int, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Tuple[int, int]:
+    """(chunk_size, total_chunk_count) for a file within TikTok's chunk rules"""
+    if video_size < MIN_CHUNK_SIZE:
+        return video_size, 1
+    chunk_size = max(MIN_CHUNK_SIZE, min(chunk_size, MAX_CHUNK_SIZE, video_size))
+    return chunk_size, video_size // chunk_size
+
+def chunk_range(index: int, chunk_size: int, total_chunks: int,
+                video_size: int) -> Tuple[int, int]:
+    """Byte range [start, end) of a chunk; the last one runs to the end of the file"""
+    start = index * chunk_size
+    end = video_size if index == total_chunks - 1 else start + chunk_size
+    return start, end
+
+class UploadProgressStore:
+    """Per-publish_id upload progress, persisted after every acknowledged chunk
+    
+    A record ties a publish_id and its upload URL to the file it was opened
+    for (path, size, mtime) and lists the chunks the server has accepted, so
+    a later upload of the same file resumes instead of starting over.
+    """
+    
+    def __init__(self, state_dir: str, max_age: float = UPLOAD_URL_TTL):
+        self.state_dir = state_dir
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        os.makedirs(state_dir, exist_ok=True)
+    
+    @staticmethod
+    def _identity(path: str) -> Dict:
+        stat = os.stat(path)
+        return {"path": os.path.realpath(path), "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns}
+    
+    def _record_path(self, publish_id: str) -> str:
+        return os.path.join(self.state_dir, f"{publish_id}.json")
+    
+    def find(self, video_path: str) -> Optional[Dict]:
+        """Unexpired record for this exact file, if an upload of it was interrupted"""
+        identity = self._identity(video_path)
+        for name in os.listdir(self.state_dir):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.state_dir, name)
+            try:
+                with open(path, 'r') as f:
+                    record = json.load(f)
+            except (OSError, ValueError):
+                continue
+            
+            if time.time() - record.get("created_at", 0) > self.max_age:
+                # The upload URL is dead; the record can never be resumed
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                continue
+            if record.get("file") == identity:
+                record["acknowledged"] = set(record.get("acknowledged", []))
+                return record
+        return None
+    
+    def create(self, video_path: str, publish_id: str, upload_url: str,
+               chunk_size: int, total_chunks: int) -> Dict:
+        """Start tracking a freshly initialized upload"""
+        record = {
+            "publish_id": publish_id,
+            "upload_url": upload_url,
+            "file": self._identity(video_path),
+            "chunk_size": chunk_size,
+            "total_chunk_count": total_chunks,
+            "acknowledged": set(),
+            "created_at": time.time()
+        }
+        self._save(record)
+        return record
+    
+    def acknowledge(self, record: Dict, index: int):
+        """Mark a chunk as accepted by the server and persist the record"""
+        with self._lock:
+            record["acknowledged"].add(index)
+            self._save(record)
+    
+    def remove(self, record: Dict):
+        """Forget an upload (published, or no longer resumable)"""
+        try:
+            os.remove(self._record_path(record["publish_id"]))
+        except OSError:
+            pass
+    
+    def _save(self, record: Dict):
+        data = {**record, "acknowledged": sorted(record["acknowledged"])}
+        fd, temp_path = tempfile.mkstemp(prefix=".upload-", dir=self.state_dir)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f)
+        os.replace(temp_path, self._record_path(record["publish_id"]))
+
+class ChunkedUploader:
+    """PUTs the missing chunks of an upload, several at a time, as coroutines
+    
+    The file is memory-mapped and each chunk is sent straight from its slice
+    of the map, so a 500 MB upload never holds more than the in-flight
+    chunks' pages in memory. Failed chunks are retried with exponential
+    backoff; once one fails for good the others are cancelled. Cancellation
+    is safe at any point: in-flight chunks are cancelled and awaited before
+    the map is closed, and only chunks the server accepted are recorded, so
+    a later upload resumes from exactly those.
+    """
+    
+    def __init__(self, transport: AsyncHTTPTransport, workers: int = 4, retries: int = 3,
+                 backoff: float = 1.0, timeout: Tuple[float, float] = (10.0, 300.0)):
+        self.transport = transport
+        self.workers = max(1, workers)
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+    
+    async def upload(self, video_path: str, record: Dict, store: UploadProgressStore) -> int:
+        """Send every chunk not yet acknowledged; returns the number sent
+        
+        Raises the last requests exception of a chunk that could not be sent.
+        """
+        total_chunks = record["total_chunk_count"]
+        pending = [i for i in range(total_chunks) if i not in record["acknowledged"]]
+        if not pending:
+            return 0
+        
+        video_size = record["file"]["size"]
+        content_type = mimetypes.guess_type(video_path)[0] or "video/mp4"
+        slots = asyncio.Semaphore(self.workers)
+        
+        with open(video_path, 'rb') as f:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                async def send(index: int):
+                    async with slots:
+                        start, end = chunk_range(index, record["chunk_size"], total_chunks,
+                                                 video_size)
+                        headers = {
+                            "Content-Type": content_type,
+                            "Content-Length": str(end - start),
+                            "Content-Range": f"bytes {start}-{end - 1}/{video_size}"
+                        }
+                        with memoryview(buf)[start:end] as chunk:
+                            await self._put(record["upload_url"], chunk, headers)
+                        store.acknowledge(record, index)
+                
+                tasks = [asyncio.ensure_future(send(index)) for index in pending]
+                try:
+                    await asyncio.gather(*tasks)
+                except BaseException:
+                    # Failed or cancelled: stop the rest, and let every chunk
+                    # finish with the map before it is closed
+                    for task in tasks:
+                        task.cancel()
+                    await asyncio.gather(*tasks, return_exceptions=True)
+                    raise
+            finally:
+                buf.close()
+        
+        return len(pending)
+    
+    async def _put(self, upload_url: str, chunk: memoryview, headers: Dict):
+        """PUT one chunk, retrying timeouts, dropped connections and 5xx/429
+        (after Retry-After when the server sends one)"""
+        for attempt in range(self.retries + 1):
+            response = None
+            try:
+                response = await self.transport.put(upload_url, data=chunk, headers=headers,
+                                                    timeout=self.timeout)
+                if response.status_code not in RETRYABLE_STATUSES:
+                    response.raise_for_status()
+                    return
+                error = requests.exceptions.HTTPError(
+                    f"{response.status_code} on {headers['Content-Range']}", response=response)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                error = e
+            
+            if attempt < self.retries:
+                await asyncio.sleep(retry_delay(response, attempt, self.backoff))
+        raise error
@@ -211,11 +211,12 @@ class ContentScheduler:
                 # Simulate processing steps
                 video_path = f"mock_video_{content_item['id']}.mp4"
                 
-                # Mock video processing
-                self.video_processor.resize_video(video_path, f"processed_{video_path}")
-                self.video_processor.enhance_video(video_path, f"enhanced_{video_path}")
-                self.video_processor.add_text_overlay(video_path, f"final_{video_path}", 
-                                                     content_item['caption'][:20])
+                # Mock video processing (single decode/encode pass)
+                self.video_processor.process_video(video_path, f"final_{video_path}", [
+                    {"op": "resize", "width": 1080, "height": 1920},
+                    {"op": "enhance"},
+                    {"op": "overlay", "text": content_item['caption'][:20]}
+                ])
                 
                 # Mock upload
                 result = self.tiktok_manager.upload_video(
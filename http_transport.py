@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+Pooled HTTP Transport for TikTok API Calls
+One keep-alive connection pool shared by every request, with reuse statistics
+"""
+
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+
+# (connect, read) seconds; API calls are small, uploads pass their own
+DEFAULT_TIMEOUT = (5.0, 30.0)
+
+Timeout = Union[float, Tuple[float, float]]
+
+class _CountingAdapter(HTTPAdapter):
+    """HTTPAdapter whose connection pools report every new connection opened"""
+    
+    def __init__(self, on_connect, **kwargs):
+        self._on_connect = on_connect
+        super().__init__(**kwargs)
+    
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        on_connect = self._on_connect
+        
+        def counting(pool_class):
+            def _new_conn(pool):
+                on_connect()
+                return pool_class._new_conn(pool)
+            return type(pool_class.__name__, (pool_class,), {"_new_conn": _new_conn})
+        
+        self.poolmanager.pool_classes_by_scheme = {
+            scheme: counting(pool_class)
+            for scheme, pool_class in self.poolmanager.pool_classes_by_scheme.items()
+        }
+
+class _HTTPXResponse:
+    """The parts of requests.Response callers use, over an httpx response"""
+    
+    def __init__(self, response: "httpx.Response"):
+        self._response = response
+        self.status_code = response.status_code
+        self.headers = response.headers
+        self.content = response.content
+        self.text = response.text
+        self.url = str(response.url)
+    
+    def json(self):
+        return self._response.json()
+    
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(
+                f"{self.status_code} Error for url: {self.url}", response=self)
+
+def _httpx_client_options(pool_maxsize: int, max_connections: int, http2: bool) -> Dict:
+    """Keyword arguments for an httpx client, falling back to HTTP/1.1 without h2"""
+    if http2:
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            print("HTTP/2 requested but the h2 package is not installed, using HTTP/1.1")
+            http2 = False
+    return {
+        "http2": http2,
+        "limits": httpx.Limits(max_connections=max_connections,
+                               max_keepalive_connections=pool_maxsize),
+        "headers": {"Accept-Encoding": "gzip"}
+    }
+
+def _httpx_arguments(timeout: "Timeout", data=None, **kwargs) -> Dict:
+    """requests-style keyword arguments translated for httpx"""
+    if isinstance(timeout, tuple):
+        timeout = httpx.Timeout(timeout[1], connect=timeout[0])
+    if isinstance(data, memoryview):
+        data = data.tobytes()
+    if isinstance(data, (bytes, str)):
+        kwargs["content"] = data
+    elif data is not None:
+        kwargs["data"] = data
+    return {"timeout": timeout, **kwargs}
+
+class _ConnectionStats:
+    """Request and connection counters shared by the transports"""
+    
+    def __init__(self):
+        self.requests = 0
+        self.connections = 0
+        self.http2 = False
+        self._streams = set()
+        self._lock = threading.Lock()
+    
+    def _count_request(self):
+        with self._lock:
+            self.requests += 1
+    
+    def _count_connection(self):
+        with self._lock:
+            self.connections += 1
+    
+    def _count_stream(self, response: "httpx.Response"):
+        """Each distinct httpx network stream is one connection opened"""
+        stream = response.extensions.get("network_stream")
+        if stream is not None:
+            with self._lock:
+                if id(stream) not in self._streams:
+                    self._streams.add(id(stream))
+                    self.connections += 1
+    
+    def stats(self) -> Dict:
+        """Requests sent, connections opened and how many requests reused one"""
+        with self._lock:
+            reused = max(0, self.requests - self.connections)
+            return {
+                "requests": self.requests,
+                "connections": self.connections,
+                "reused": reused,
+                "reuse_rate": reused / self.requests if self.requests else 0.0,
+                "http2": self.http2
+            }
+
+class HTTPTransport(_ConnectionStats):
+    """Shared keep-alive session for all API traffic
+    
+    Connections are pooled per host (pool_connections hosts, pool_maxsize
+    connections each, which must cover the number of concurrent callers such
+    as upload workers) and reused across calls, so a run pays one TCP+TLS
+    handshake per connection instead of one per request. Responses are
+    gzip-compressed on the wire and every request carries a timeout. With
+    http2=True and httpx installed, requests go over a multiplexed HTTP/2
+    client instead; errors are still raised as requests exceptions.
+    """
+    
+    def __init__(self, pool_connections: int = 4, pool_maxsize: int = 10,
+                 timeout: Timeout = DEFAULT_TIMEOUT, http2: bool = False):
+        super().__init__()
+        self.timeout = timeout
+        
+        self._use_httpx = http2 and HTTPX_AVAILABLE
+        if http2 and not HTTPX_AVAILABLE:
+            print("HTTP/2 requested but httpx is not installed, using HTTP/1.1")
+        
+        if self._use_httpx:
+            options = _httpx_client_options(pool_maxsize, pool_connections * pool_maxsize, True)
+            self.http2 = options["http2"]
+            self._client = httpx.Client(**options)
+        else:
+            self._session = requests.Session()
+            self._session.headers["Accept-Encoding"] = "gzip"
+            adapter = _CountingAdapter(self._count_connection,
+                                       pool_connections=pool_connections,
+                                       pool_maxsize=pool_maxsize, max_retries=0)
+            self._session.mount("https://", adapter)
+            self._session.mount("http://", adapter)
+    
+    def request(self, method: str, url: str, timeout: Optional[Timeout] = None,
+                **kwargs) -> requests.Response:
+        """Send a request over the pool (kwargs as for requests.request)"""
+        timeout = timeout if timeout is not None else self.timeout
+        self._count_request()
+        
+        if not self._use_httpx:
+            return self._session.request(method, url, timeout=timeout, **kwargs)
+        
+        try:
+            response = self._client.request(method, url, **_httpx_arguments(timeout, **kwargs))
+        except httpx.TimeoutException as e:
+            raise requests.exceptions.Timeout(str(e))
+        except httpx.TransportError as e:
+            raise requests.exceptions.ConnectionError(str(e))
+        self._count_stream(response)
+        return _HTTPXResponse(response)
+    
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+    
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+    
+    def put(self, url: str, **kwargs) -> requests.Response:
+        return self.request("PUT", url, **kwargs)
+    
+    def close(self):
+        """Close every pooled connection"""
+        if self._use_httpx:
+            self._client.close()
+        else:
+            self._session.close()
+
+class AsyncHTTPTransport(_ConnectionStats):
+    """Coroutine counterpart of HTTPTransport, with at most max_concurrency
+    requests in flight
+    
+    With httpx installed (it is in requirements.txt), requests run on its
+    AsyncClient (HTTP/2 when asked for). Without it, which is announced with
+    a warning, each request runs on a pooled HTTPTransport in a
+    thread pool of max_concurrency threads. A cancelled request then waits
+    for its thread to finish before the cancellation propagates, so nothing
+    the request borrowed (such as a slice of a memory-mapped file) is
+    released while still in use. Errors are raised as requests exceptions
+    either way.
+    """
+    
+    def __init__(self, pool_connections: int = 4, pool_maxsize: int = 10,
+                 timeout: Timeout = DEFAULT_TIMEOUT, http2: bool = False,
+                 max_concurrency: int = 16):
+        super().__init__()
+        self.timeout = timeout
+        self.max_concurrency = max(1, max_concurrency)
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        pool_maxsize = max(pool_maxsize, self.max_concurrency)
+        
+        self.native = HTTPX_AVAILABLE
+        if self.native:
+            options = _httpx_client_options(pool_maxsize, pool_connections * pool_maxsize, http2)
+            self.http2 = options["http2"]
+            self._client = httpx.AsyncClient(**options)
+        else:
+            print(f"Warning: httpx is not installed (pip install -r requirements.txt); "
+                  f"async requests fall back to a {self.max_concurrency}-thread pool: "
+                  f"HTTP/1.1 only, at most {self.max_concurrency} in flight, and a "
+                  f"cancelled request keeps its thread until the request finishes")
+            self._sync = HTTPTransport(pool_connections, pool_maxsize, timeout, http2)
+            self._executor = ThreadPoolExecutor(self.max_concurrency,
+                                                thread_name_prefix="http")
+    
+    async def request(self, method: str, url: str, timeout: Optional[Timeout] = None,
+                      **kwargs) -> requests.Response:
+        """Send a request, waiting for a free slot first (kwargs as for requests.request)"""
+        timeout = timeout if timeout is not None else self.timeout
+        async with self._semaphore:
+            if not self.native:
+                future = asyncio.get_running_loop().run_in_executor(
+                    self._executor,
+                    functools.partial(self._sync.request, method, url, timeout=timeout, **kwargs))
+                try:
+                    return await asyncio.shield(future)
+                except asyncio.CancelledError:
+                    # The thread cannot be interrupted; let it finish first
+                    await asyncio.wait([future])
+                    raise
+            
+            self._count_request()
+            try:
+                response = await self._client.request(method, url,
+                                                      **_httpx_arguments(timeout, **kwargs))
+            except httpx.TimeoutException as e:
+                raise requests.exceptions.Timeout(str(e))
+            except httpx.TransportError as e:
+                raise requests.exceptions.ConnectionError(str(e))
+            self._count_stream(response)
+            return _HTTPXResponse(response)
+    
+    async def get(self, url: str, **kwargs) -> requests.Response:
+        return await self.request("GET", url, **kwargs)
+    
+    async def post(self, url: str, **kwargs) -> requests.Response:
+        return await self.request("POST", url, **kwargs)
+    
+    async def put(self, url: str, **kwargs) -> requests.Response:
+        return await self.request("PUT", url, **kwargs)
+    
+    def stats(self) -> Dict:
+        if not self.native:
+            return self._sync.stats()
+        return super().stats()
+    
+    async def aclose(self):
+        """Close every pooled connection"""
+        if self.native:
+            await self._client.aclose()
+        else:
+            self._sync.close()
+            self._executor.shutdown(wait=False)
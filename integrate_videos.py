@@ -8,6 +8,8 @@ import json
 import shutil
 from datetime import datetime
 
+from mp4_info import is_mp4, read_mp4_info
+
 class VideoIntegrator:
     """Integrate real drone videos with generated content"""
     
@@ -24,6 +26,7 @@ class VideoIntegrator:
     def scan_existing_videos(self):
         """Scan for existing drone videos"""
         self.existing_videos = {}
+        self.video_info = {}
         
         video_folders = ['drone_footage/wildlife', 'drone_footage/city', 
                       'drone_footage/urban', 'drone_footage/sunset', 'videos']
@@ -32,7 +35,20 @@ class VideoIntegrator:
             if os.path.exists(folder):
                 videos = [f for f in os.listdir(folder) if f.endswith(('.mp4', '.mov', '.avi'))]
                 self.existing_videos[folder] = videos
-                print(f"📁 Found {len(videos)} videos in {folder}/")
+                
+                # Header-only read: no decoder startup per file
+                total_duration = 0.0
+                for video in videos:
+                    path = os.path.join(folder, video)
+                    if not is_mp4(path):
+                        continue
+                    try:
+                        self.video_info[path] = read_mp4_info(path)
+                        total_duration += self.video_info[path].get("duration", 0.0)
+                    except (OSError, ValueError) as e:
+                        print(f"⚠️  Could not read {path}: {e}")
+                
+                print(f"📁 Found {len(videos)} videos in {folder}/ ({total_duration:.0f}s of footage)")
         
         return self.existing_videos
     
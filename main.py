@@ -147,8 +147,10 @@ class TikTokDroneApp:
             mock_video_path = f"drone_video_{content['id']}.mp4"
             
             if self.video_processor:
-                self.video_processor.resize_video(mock_video_path, f"processed_{mock_video_path}")
-                self.video_processor.enhance_video(mock_video_path, f"enhanced_{mock_video_path}")
+                self.video_processor.process_video(mock_video_path, f"processed_{mock_video_path}", [
+                    {"op": "resize", "width": 1080, "height": 1920},
+                    {"op": "enhance"}
+                ])
             
             # Simulate upload
             print("Uploading to TikTok...")
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+MP4/MOV Header Reader
+Reads video metadata straight from the moov atom without starting a decoder
+"""
+
+import os
+import sys
+import mmap
+import math
+import struct
+from array import array
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Seconds between the MP4 epoch (1904-01-01) and the Unix epoch
+MP4_EPOCH_OFFSET = 2082844800
+
+def _iter_boxes(buf, start: int, end: int) -> Iterator[Tuple[bytes, int, int]]:
+    """Yield (type, payload_start, box_end) for each box in buf[start:end]"""
+    offset = start
+    while offset + 8 <= end:
+        size, box_type = struct.unpack_from('>I4s', buf, offset)
+        header = 8
+        if size == 1:
+            size = struct.unpack_from('>Q', buf, offset + 8)[0]
+            header = 16
+        elif size == 0:
+            size = end - offset
+        if size < header or offset + size > end:
+            break
+        yield box_type, offset + header, offset + size
+        offset += size
+
+def _children(buf, start: int, end: int) -> Dict[bytes, List[Tuple[int, int]]]:
+    """Map of child box type -> [(payload_start, box_end), ...]"""
+    children = {}
+    for box_type, payload, box_end in _iter_boxes(buf, start, end):
+        children.setdefault(box_type, []).append((payload, box_end))
+    return children
+
+def _find(buf, start: int, end: int, *path: bytes) -> Optional[Tuple[int, int]]:
+    """First box matching a path of nested box types"""
+    for box_type in path:
+        match = _children(buf, start, end).get(box_type)
+        if not match:
+            return None
+        start, end = match[0]
+    return start, end
+
+def _runs(buf, box: Optional[Tuple[int, int]], fmt: str) -> List[Tuple[int, ...]]:
+    """Entries of a full box laid out as entry_count followed by fixed records"""
+    if box is None:
+        return []
+    start, end = box
+    count = struct.unpack_from('>I', buf, start + 4)[0]
+    record = struct.calcsize(fmt)
+    count = min(count, (end - start - 8) // record)
+    return [struct.unpack_from(fmt, buf, start + 8 + i * record) for i in range(count)]
+
+def _read_header(buf, box: Tuple[int, int]) -> Tuple[int, int, int]:
+    """creation_time, timescale and duration from an mvhd or mdhd box"""
+    start = box[0]
+    if buf[start] == 1:
+        creation, _, timescale, duration = struct.unpack_from('>QQIQ', buf, start + 4)
+    else:
+        creation, _, timescale, duration = struct.unpack_from('>IIII', buf, start + 4)
+    return creation, timescale, duration
+
+def _rotation(buf, tkhd: Tuple[int, int]) -> int:
+    """Display rotation in degrees from the tkhd transformation matrix"""
+    start = tkhd[0]
+    matrix_offset = start + (4 + 32 + 8 if buf[start] == 1 else 4 + 20 + 8) + 8
+    a, b = struct.unpack_from('>ii', buf, matrix_offset)
+    return int(round(math.degrees(math.atan2(b / 65536.0, a / 65536.0)))) % 360
+
+def _video_track(buf, moov: Tuple[int, int]) -> Optional[Dict]:
+    """Locate the boxes of the first video track"""
+    for trak in _children(buf, *moov).get(b'trak', []):
+        hdlr = _find(buf, *trak, b'mdia', b'hdlr')
+        if hdlr is None or bytes(buf[hdlr[0] + 8:hdlr[0] + 12]) != b'vide':
+            continue
+        
+        stbl = _find(buf, *trak, b'mdia', b'minf', b'stbl')
+        if stbl is None:
+            continue
+        tables = _children(buf, *stbl)
+        return {
+            "tkhd": _find(buf, *trak, b'tkhd'),
+            "mdhd": _find(buf, *trak, b'mdia', b'mdhd'),
+            "elst": _find(buf, *trak, b'edts', b'elst'),
+            **{name.decode(): boxes[0] for name, boxes in tables.items()}
+        }
+    return None
+
+class MP4File:
+    """Memory-mapped MP4/MOV file; only header pages are ever read"""
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self.buf = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError(f"Empty file: {path}")
+        
+        top = _children(self.buf, 0, len(self.buf))
+        if b'moov' not in top:
+            self.close()
+            raise ValueError(f"No moov atom in {path}")
+        self.moov = top[b'moov'][0]
+        self.track = _video_track(self.buf, self.moov)
+    
+    def close(self):
+        self.buf.close()
+        self._file.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+    
+    def info(self) -> Dict:
+        """Width, height, fps, frame count, duration, codec, bitrate, rotation, creation time
+        
+        Width and height are the display size: for a track rotated 90 or 270
+        degrees they are swapped from the coded size, matching the frames
+        ffmpeg and OpenCV decode (both apply the rotation).
+        """
+        buf = self.buf
+        mvhd = _find(buf, *self.moov, b'mvhd')
+        creation, movie_scale, movie_duration = _read_header(buf, mvhd) if mvhd else (0, 0, 0)
+        
+        info = {
+            "duration": movie_duration / movie_scale if movie_scale else 0.0,
+            "creation_time": (datetime.fromtimestamp(creation - MP4_EPOCH_OFFSET, timezone.utc).isoformat()
+                              if creation > MP4_EPOCH_OFFSET else None),
+            "file_size": len(buf)
+        }
+        
+        track = self.track
+        if track is None:
+            return info
+        
+        rotation = _rotation(buf, track["tkhd"]) if track.get("tkhd") else 0
+        stsd = track.get("stsd")
+        if stsd:
+            entry = stsd[0] + 8
+            codec = bytes(buf[entry + 4:entry + 8]).decode('latin-1')
+            width, height = struct.unpack_from('>HH', buf, entry + 32)
+            if rotation in (90, 270):
+                width, height = height, width
+            info.update({"codec": codec, "width": width, "height": height})
+        
+        frame_count = sum(count for count, _ in _runs(buf, track.get("stts"), '>II'))
+        _, timescale, media_duration = _read_header(buf, track["mdhd"]) if track.get("mdhd") else (0, 0, 0)
+        duration = media_duration / timescale if timescale else info["duration"]
+        
+        info.update({
+            "frame_count": frame_count,
+            "duration": duration,
+            "fps": frame_count / duration if duration else 0.0,
+            "rotation": rotation,
+            "bitrate": int(self._stream_bytes() * 8 / duration) if duration else 0
+        })
+        return info
+    
+    def _stream_bytes(self) -> int:
+        """Total size of the video track's samples (stsz)"""
+        stsz = self.track.get("stsz")
+        if stsz is None:
+            return 0
+        start, end = stsz
+        sample_size, count = struct.unpack_from('>II', self.buf, start + 4)
+        if sample_size:
+            return sample_size * count
+        
+        sizes = array('I')
+        sizes.frombytes(self.buf[start + 12:min(end, start + 12 + count * 4)])
+        if sys.byteorder == 'little':
+            sizes.byteswap()
+        return sum(sizes)
+    
+    def keyframes(self) -> List[float]:
+        """Presentation times (seconds) of the video track's sync samples"""
+        track = self.track
+        if track is None or not track.get("mdhd"):
+            return []
+        buf = self.buf
+        timescale = _read_header(buf, track["mdhd"])[1]
+        if not timescale:
+            return []
+        
+        stts = _runs(buf, track.get("stts"), '>II')
+        if track.get("stss") is None:
+            # No sync sample table: every sample is a keyframe
+            sync = list(range(1, sum(count for count, _ in stts) + 1))
+        else:
+            sync = [n for (n,) in _runs(buf, track["stss"], '>I')]
+        
+        ctts = _runs(buf, track.get("ctts"), '>Ii')
+        shift = 0
+        for edit in self._edits():
+            if edit >= 0:
+                shift = edit
+                break
+        
+        times = []
+        dts = 0
+        sample = 1
+        stts_iter = iter(stts)
+        run_count, run_delta = next(stts_iter, (0, 0))
+        run_end = sample + run_count
+        ctts_pos, ctts_end = 0, 1 + (ctts[0][0] if ctts else 0)
+        
+        for target in sorted(sync):
+            # Advance decode time to the target sample, one stts run at a time
+            while target >= run_end and run_count:
+                dts += (run_end - sample) * run_delta
+                sample = run_end
+                run_count, run_delta = next(stts_iter, (0, 0))
+                run_end = sample + run_count
+            dts += (target - sample) * run_delta
+            sample = target
+            
+            offset = 0
+            if ctts:
+                while target >= ctts_end and ctts_pos + 1 < len(ctts):
+                    ctts_pos += 1
+                    ctts_end += ctts[ctts_pos][0]
+                offset = ctts[ctts_pos][1]
+            times.append(max(0.0, (dts + offset - shift) / timescale))
+        
+        return times
+    
+    def _edits(self) -> List[int]:
+        """media_time of each edit list entry (-1 marks an empty edit)"""
+        elst = self.track.get("elst")
+        if elst is None:
+            return []
+        start = elst[0]
+        version = self.buf[start]
+        count = struct.unpack_from('>I', self.buf, start + 4)[0]
+        fmt, record = ('>Qq', 20) if version == 1 else ('>Ii', 12)
+        return [struct.unpack_from(fmt, self.buf, start + 8 + i * record)[1] for i in range(count)]
+
+def read_mp4_info(path: str) -> Dict:
+    """Metadata for an MP4/MOV file (raises ValueError if it is not one)"""
+    with MP4File(path) as mp4:
+        return mp4.info()
+
+def read_keyframes(path: str) -> List[float]:
+    """Keyframe times for an MP4/MOV file (raises ValueError if it is not one)"""
+    with MP4File(path) as mp4:
+        return mp4.keyframes()
+
+def is_mp4(path: str) -> bool:
+    """Cheap extension check for files this reader understands"""
+    return os.path.splitext(path)[1].lower() in ('.mp4', '.mov', '.m4v')
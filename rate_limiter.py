@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Rate Limiting for TikTok API Calls
+Token buckets per endpoint and account, with Retry-After aware backoff
+"""
+
+import time
+import random
+import asyncio
+import threading
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional, Tuple
+
+# Documented quotas as (requests, window seconds), per access token
+TIKTOK_QUOTAS = {
+    "/post/publish/video/init/": (6, 60),
+    "/post/publish/inbox/video/init/": (6, 60),
+    "/post/publish/content/init/": (6, 60),
+    "/post/publish/status/fetch/": (30, 60),
+    "/post/publish/creator_info/query/": (20, 60),
+    "/video/query/": (600, 60),
+    "/video/list/": (600, 60),
+    "/user/info/": (600, 60)
+}
+
+# Endpoints without a documented quota
+DEFAULT_QUOTA = (600, 60)
+
+def retry_delay(response=None, attempt: int = 0, base: float = 1.0,
+                cap: float = 60.0) -> float:
+    """Seconds to wait before retrying: the response's Retry-After when it has
+    one, otherwise exponential backoff with jitter (between half and all of
+    base * 2 ** attempt, capped)"""
+    retry_after = response.headers.get("Retry-After") if response is not None else None
+    if retry_after:
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            pass
+        try:
+            retry_at = parsedate_to_datetime(retry_after)
+            return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+        except (TypeError, ValueError):
+            pass
+    
+    delay = min(cap, base * 2 ** attempt)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+class TokenBucket:
+    """Token bucket sized so no window of `window` seconds sees more than
+    `requests` calls
+    
+    A burst of a tenth of the quota is allowed up front and the rest refills
+    evenly. Callers reserve a token and are told how long to wait before
+    using it, so waiting happens outside the lock and in arrival order.
+    """
+    
+    def __init__(self, requests: int, window: float):
+        self.capacity = max(1, requests // 10)
+        self.rate = max(requests - self.capacity, 1) / window
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+    
+    def reserve(self) -> float:
+        """Take a token; returns seconds to wait before it may be used"""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return max(0.0, -self.tokens / self.rate, self.blocked_until - now)
+    
+    def block(self, seconds: float):
+        """Hold every caller back for this long (the server asked us to)"""
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+class RateLimiter:
+    """Paces API calls per (account, endpoint) and records the waits
+    
+    One limiter can be shared by several managers so accounts are paced
+    independently while each keeps its own per-endpoint budgets.
+    """
+    
+    def __init__(self, quotas: Optional[Dict[str, Tuple[int, float]]] = None,
+                 default_quota: Tuple[int, float] = DEFAULT_QUOTA):
+        self.quotas = quotas if quotas is not None else TIKTOK_QUOTAS
+        self.default_quota = default_quota
+        self._buckets = {}
+        self._endpoints = {}
+        self._lock = threading.Lock()
+    
+    def bucket(self, endpoint: str, account: str = "") -> TokenBucket:
+        with self._lock:
+            key = (account, endpoint)
+            if key not in self._buckets:
+                self._buckets[key] = TokenBucket(*self.quotas.get(endpoint, self.default_quota))
+            return self._buckets[key]
+    
+    async def acquire(self, endpoint: str, account: str = "") -> float:
+        """Wait for this call's turn; returns the seconds waited"""
+        wait = self.bucket(endpoint, account).reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        self._record(endpoint, wait=wait)
+        return wait
+    
+    def throttled(self, endpoint: str, account: str, delay: float):
+        """The server answered 429: hold this bucket back for delay seconds"""
+        self.bucket(endpoint, account).block(delay)
+        self._record(endpoint, throttled=1)
+    
+    def _record(self, endpoint: str, wait: float = 0.0, throttled: int = 0):
+        with self._lock:
+            metrics = self._endpoints.setdefault(
+                endpoint, {"requests": 0, "waited": 0, "wait_seconds": 0.0,
+                           "max_wait": 0.0, "throttled": 0})
+            if not throttled:
+                metrics["requests"] += 1
+                metrics["waited"] += wait > 0
+                metrics["wait_seconds"] += wait
+                metrics["max_wait"] = max(metrics["max_wait"], wait)
+            metrics["throttled"] += throttled
+    
+    def stats(self) -> Dict:
+        """Wait time and 429 counts, in total and per endpoint"""
+        with self._lock:
+            endpoints = {name: dict(metrics) for name, metrics in self._endpoints.items()}
+        return {
+            "requests": sum(m["requests"] for m in endpoints.values()),
+            "wait_seconds": sum(m["wait_seconds"] for m in endpoints.values()),
+            "max_wait": max((m["max_wait"] for m in endpoints.values()), default=0.0),
+            "throttled": sum(m["throttled"] for m in endpoints.values()),
+            "endpoints": endpoints
+        }
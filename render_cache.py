@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Render Cache for Processed Videos
+Content-addressed on-disk store with LRU eviction and atomic publish
+"""
+
+import os
+import json
+import time
+import shutil
+import hashlib
+import tempfile
+import threading
+from typing import Dict, Optional, Tuple
+
+# Hashed into every key. Raise it when a stage or encoder default changes what
+# the same source and operations render to; old entries then miss and age out
+# under the LRU limit
+CACHE_VERSION = 1
+
+def file_digest(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """SHA-256 of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+# Digests already computed in this process, keyed on (realpath, size, mtime)
+_digests = {}
+_digests_lock = threading.Lock()
+
+def source_digest(path: str) -> str:
+    """Content hash of a file, memoized on (path, size, mtime) so a file used
+    by several caches is read once per process"""
+    stat = os.stat(path)
+    memo_key = (os.path.realpath(path), stat.st_size, stat.st_mtime_ns)
+    
+    with _digests_lock:
+        digest = _digests.get(memo_key)
+    if digest is None:
+        digest = file_digest(path)
+        with _digests_lock:
+            _digests[memo_key] = digest
+    return digest
+
+class RenderCache:
+    """Content-addressed cache of rendered outputs
+    
+    Keys hash the input file's contents together with the operation chain and
+    encoder settings, so a renamed source still hits and an edited one misses.
+    Entries are published with an atomic rename and evicted least recently
+    used first once the cache grows past max_bytes. The cache's size is kept
+    as a running total, so only a publish that takes it past max_bytes walks
+    the directory (which also picks up what other processes have added).
+    """
+    
+    def __init__(self, cache_dir: str, max_bytes: int = 10 * 1024 ** 3):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._bytes = None
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+    
+    def key(self, input_path: str, params: Dict) -> str:
+        """Cache key for an input file and render parameters"""
+        payload = json.dumps({
+            "version": CACHE_VERSION,
+            "source": source_digest(input_path),
+            "params": params
+        }, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+    
+    def _paths(self, key: str, suffix: str) -> Tuple[str, str]:
+        folder = os.path.join(self.cache_dir, key[:2])
+        return os.path.join(folder, key + suffix), os.path.join(folder, key + ".json")
+    
+    def lookup(self, key: str, suffix: str = ".mp4") -> Optional[Dict]:
+        """Return the entry's metadata (including "path") and mark it recently used"""
+        media_path, meta_path = self._paths(key, suffix)
+        
+        try:
+            with open(meta_path, 'r') as f:
+                entry = json.load(f)
+            os.utime(media_path)
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+        
+        with self._lock:
+            self.hits += 1
+        entry["path"] = media_path
+        return entry
+    
+    def reserve(self, key: str, suffix: str = ".mp4") -> str:
+        """Temporary path inside the cache to render into before publishing"""
+        folder = os.path.dirname(self._paths(key, suffix)[0])
+        os.makedirs(folder, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(prefix=f".{key[:16]}-", suffix=suffix, dir=folder)
+        os.close(fd)
+        return temp_path
+    
+    def publish(self, key: str, temp_path: str, metadata: Dict,
+                suffix: str = ".mp4") -> Dict:
+        """Atomically move a finished render into place and evict old entries"""
+        media_path, meta_path = self._paths(key, suffix)
+        entry = {**metadata, "created_at": time.time()}
+        
+        fd, meta_temp = tempfile.mkstemp(prefix=".meta-", dir=os.path.dirname(meta_path))
+        with os.fdopen(fd, 'w') as f:
+            json.dump(entry, f)
+        
+        size = os.path.getsize(temp_path)
+        try:
+            size -= os.path.getsize(media_path)
+        except OSError:
+            pass
+        
+        # Media first: a reader only trusts entries whose metadata exists
+        os.replace(temp_path, media_path)
+        os.replace(meta_temp, meta_path)
+        
+        # The first publish measures the cache; later ones only add to it
+        with self._lock:
+            if self._bytes is not None:
+                self._bytes += size
+            over = self._bytes is None or self._bytes > self.max_bytes
+        if over:
+            self.evict(keep=media_path)
+        entry["path"] = media_path
+        return entry
+    
+    def discard(self, temp_path: str):
+        """Drop an unfinished render"""
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+    
+    def export(self, cached_path: str, output_path: str):
+        """Copy a cached render to where the caller asked for it"""
+        if os.path.abspath(cached_path) != os.path.abspath(output_path):
+            shutil.copyfile(cached_path, output_path)
+    
+    def evict(self, keep: Optional[str] = None):
+        """Remove least recently used entries until the cache fits in max_bytes"""
+        entries = []
+        total = 0
+        
+        for folder, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.startswith('.') or name.endswith('.json'):
+                    continue
+                path = os.path.join(folder, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+        
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            for stale in (path, os.path.splitext(path)[0] + ".json"):
+                try:
+                    os.remove(stale)
+                except OSError:
+                    pass
+            total -= size
+        
+        with self._lock:
+            self._bytes = total
+    
+    def stats(self) -> Dict:
+        """Hit/miss counters and current disk usage"""
+        size = 0
+        entries = 0
+        for folder, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.startswith('.') or name.endswith('.json'):
+                    continue
+                entries += 1
+                size += os.path.getsize(os.path.join(folder, name))
+        
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": entries,
+                "bytes": size,
+                "max_bytes": self.max_bytes
+            }
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Request Coalescing for Batched API Lookups
+Merges concurrent single-key lookups into batched calls with a short-TTL cache
+"""
+
+import time
+import asyncio
+import threading
+from typing import Awaitable, Callable, Dict, Hashable, List
+
+# Cached entries beyond this count trigger a sweep of the expired ones
+MAX_CACHE_ENTRIES = 4096
+
+class BatchCoalescer:
+    """Turns many get(key) calls into few fetch_batch(keys) calls
+    
+    Keys requested within `window` seconds of the first one waiting (or as
+    soon as max_batch are waiting) go out as a single fetch_batch call, whose
+    {key: value} result is split back to the callers. A key already in
+    flight is not requested again; its callers share the result. Values are
+    cached for ttl seconds. If fetch_batch raises, every caller in that batch
+    gets the exception and nothing is cached; if the batch is cancelled, its
+    callers are cancelled. Either way its keys can be requested again.
+    """
+    
+    def __init__(self, fetch_batch: Callable[[List[Hashable]], Awaitable[Dict]],
+                 max_batch: int = 20, window: float = 0.02, ttl: float = 30.0):
+        self.fetch_batch = fetch_batch
+        self.max_batch = max(1, max_batch)
+        self.window = window
+        self.ttl = ttl
+        self.calls = 0
+        self.batches = 0
+        self.cache_hits = 0
+        self.shared = 0
+        self._cache = {}
+        self._inflight = {}
+        self._pending = []
+        self._timer = None
+        self._lock = threading.Lock()
+    
+    async def get(self, key: Hashable):
+        """Value for key, from the cache, an in-flight batch or the next batch"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self.calls += 1
+            cached = self._cache.get(key)
+            if cached is not None and cached[0] > time.monotonic():
+                self.cache_hits += 1
+                return cached[1]
+            
+            future = self._inflight.get(key)
+            if future is not None:
+                self.shared += 1
+            else:
+                future = loop.create_future()
+                self._inflight[key] = future
+                self._pending.append(key)
+                if len(self._pending) >= self.max_batch:
+                    self._flush()
+                elif self._timer is None:
+                    self._timer = loop.call_later(self.window, self._flush_later)
+        
+        # A cancelled caller must not cancel the batch others are waiting on
+        return await asyncio.shield(future)
+    
+    def _flush_later(self):
+        with self._lock:
+            self._timer = None
+            self._flush()
+    
+    def _flush(self):
+        """Send every waiting key in batches of max_batch (lock held)"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._pending:
+            keys, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+            self.batches += 1
+            asyncio.ensure_future(self._fetch(keys))
+    
+    async def _fetch(self, keys: List[Hashable]):
+        """Run one batch and settle every future waiting on it, however it ends"""
+        values, error = {}, None
+        try:
+            results = await self.fetch_batch(keys)
+            values = {key: results.get(key) for key in keys}
+        except Exception as e:
+            error = e
+        except BaseException as e:
+            # Cancelled (or interrupted): callers are cancelled, then it propagates
+            error = e
+            raise
+        finally:
+            with self._lock:
+                if error is None:
+                    self._store(values)
+                futures = [(self._inflight.pop(key, None), values.get(key)) for key in keys]
+            for future, value in futures:
+                if future is None or future.done():
+                    continue
+                if error is None:
+                    future.set_result(value)
+                elif isinstance(error, Exception):
+                    future.set_exception(error)
+                    # Retrieved by waiting callers; don't warn if all gave up
+                    future.exception()
+                else:
+                    future.cancel()
+    
+    def _store(self, values: Dict):
+        """Cache a batch's values (lock held)"""
+        expires = time.monotonic() + self.ttl
+        if len(self._cache) > MAX_CACHE_ENTRIES:
+            now = time.monotonic()
+            self._cache = {k: entry for k, entry in self._cache.items() if entry[0] > now}
+        for key, value in values.items():
+            self._cache[key] = (expires, value)
+    
+    def invalidate(self, key: Hashable):
+        """Drop a cached value (e.g. after changing or deleting it)"""
+        with self._lock:
+            self._cache.pop(key, None)
+    
+    def stats(self) -> Dict:
+        """Lookups, batches sent and how lookups were answered"""
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "batches": self.batches,
+                "cache_hits": self.cache_hits,
+                "shared": self.shared,
+                "cached": len(self._cache)
+            }
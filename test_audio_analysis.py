@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Audio Analysis Tests
+Tempo and beats of a synthetic click track, and beat-synced cut plans
+"""
+
+import shutil
+import wave
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from audio_analysis import AudioAnalysisCache, plan_beat_cuts
+
+SAMPLE_RATE = 22050
+
+def write_click_track(path: str, bpm: float, seconds: float = 12.0, offset: float = 0.25) -> list:
+    """Short decaying 1 kHz clicks on every beat over a quiet noise floor;
+    returns the click times"""
+    rng = np.random.default_rng(0)
+    samples = rng.normal(0.0, 0.003, int(seconds * SAMPLE_RATE))
+    click_time = np.arange(int(0.03 * SAMPLE_RATE)) / SAMPLE_RATE
+    click = 0.8 * np.sin(2 * np.pi * 1000 * click_time) * np.exp(-click_time * 150)
+    clicks = list(np.arange(offset, seconds - 0.1, 60.0 / bpm))
+    for t in clicks:
+        start = int(t * SAMPLE_RATE)
+        samples[start:start + len(click)] += click[:len(samples) - start]
+    
+    with wave.open(path, 'wb') as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(SAMPLE_RATE)
+        f.writeframes((np.clip(samples, -1, 1) * 32767).astype('<i2').tobytes())
+    return clicks
+
+@pytest.mark.skipif(not shutil.which("ffmpeg"), reason="ffmpeg not installed")
+@pytest.mark.parametrize("bpm", [96.0, 128.0])
+def test_click_track_tempo_and_beats(tmp_path, bpm):
+    track = str(tmp_path / "clicks.wav")
+    clicks = write_click_track(track, bpm)
+    cache = AudioAnalysisCache(str(tmp_path / "analysis"))
+    
+    analysis = cache.analyze(track)
+    assert analysis["tempo"] == pytest.approx(bpm, abs=1.0)
+    assert analysis["duration"] == pytest.approx(12.0, abs=0.01)
+    # Every beat over the clicks sits on one (within a hop or two); the
+    # grid may run on into the silent tail
+    beats = [beat for beat in analysis["beats"] if beat < clicks[-1] + 0.1]
+    assert len(beats) >= len(clicks) - 1
+    for beat in beats:
+        assert min(abs(beat - click) for click in clicks) < 0.05
+    
+    # The second lookup is a JSON read
+    assert cache.analyze(track) == analysis
+    assert cache.stats() == {"hits": 1, "misses": 1}
+
+def test_beat_cuts_rotate_clips_until_footage_runs_out():
+    beats = [0.5 * i for i in range(41)]
+    cuts = plan_beat_cuts(beats, [("a.mp4", 5.0), ("b.mp4", 3.0)], duration=12.0)
+    
+    # Four-beat cuts of 2 s; each clip continues where its last cut ended
+    assert [cut["path"] for cut in cuts] == ["a.mp4", "b.mp4", "a.mp4"]
+    assert [cut["at"] for cut in cuts] == [0.0, 2.0, 4.0]
+    assert [cut["start_time"] for cut in cuts] == [0.0, 0.0, 2.0]
+    assert all(cut["duration"] == 2.0 for cut in cuts)
+
+def test_short_beats_are_grouped_into_cuts_of_at_least_min_cut():
+    beats = [0.1 * i for i in range(100)]
+    cuts = plan_beat_cuts(beats, [("a.mp4", 60.0)], duration=10.0, beats_per_cut=2)
+    # 2 beats of 0.1 s double up to 16; only the tail cut is cut short
+    assert [cut["duration"] for cut in cuts[:-1]] == [1.6] * 6
+    assert cuts[-1]["at"] == 9.6
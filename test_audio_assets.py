@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Audio Asset Store Tests
+Per-profile loudness measurements and asset naming
+"""
+
+import os
+
+import audio_assets
+from audio_assets import AudioAssetStore
+
+def fake_measurement(calls):
+    def measure(audio_path, profile):
+        calls.append(profile["lufs"])
+        return {"input_i": "-30.0", "input_tp": "-20.0", "input_lra": "1.0",
+                "input_thresh": "-40.0", "target_offset": str(profile["lufs"] / 100)}
+    return measure
+
+def test_each_profile_measures_the_track_against_its_own_targets(tmp_path, monkeypatch):
+    track = tmp_path / "track.wav"
+    track.write_bytes(b"RIFF" + bytes(1000))
+    calls = []
+    monkeypatch.setattr(audio_assets, "measure_loudness", fake_measurement(calls))
+    
+    store_dir = str(tmp_path / "audio_cache")
+    loud = AudioAssetStore(store_dir, target_lufs=-14.0)
+    quiet = AudioAssetStore(store_dir, target_lufs=-23.0)
+    
+    assert loud.loudness(str(track))["target_offset"] == "-0.14"
+    assert quiet.loudness(str(track))["target_offset"] == "-0.23"
+    # Cached per profile from then on
+    assert loud.loudness(str(track))["target_offset"] == "-0.14"
+    assert AudioAssetStore(store_dir, target_lufs=-23.0).loudness(
+        str(track))["target_offset"] == "-0.23"
+    assert calls == [-14.0, -23.0]
+    
+    folder = os.path.join(store_dir, audio_assets.source_digest(str(track)))
+    assert sorted(os.listdir(folder)) == sorted(
+        [f"loudness_{loud.profile_id}.json", f"loudness_{quiet.profile_id}.json"])
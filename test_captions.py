@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Caption Tests
+Timed caption tracks, fades and sprite rendering
+"""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+pytest.importorskip("PIL")
+
+from captions import CaptionRenderer, caption_opacity, normalize_captions, split_runs
+
+def test_static_caption_and_timed_track_normalize_alike():
+    assert normalize_captions("Sunrise", "top") == [
+        {"text": "Sunrise", "position": "top", "start": 0.0, "end": float("inf"), "fade": 0.0}]
+    assert normalize_captions("") == []
+    
+    track = normalize_captions(captions=[{"text": "One", "start": 1, "end": 3, "fade": 0.5},
+                                         {"text": "Two", "start": 3, "position": "center"}])
+    assert [caption["position"] for caption in track] == ["bottom", "center"]
+    assert track[1]["end"] == float("inf")
+
+def test_captions_fade_in_and_out_inside_their_window():
+    caption = normalize_captions(captions=[{"text": "One", "start": 1, "end": 3, "fade": 0.5}])[0]
+    assert [caption_opacity(caption, t) for t in (0.9, 1.0, 1.25, 2.0, 2.75, 3.0)] == [
+        0.0, 0.0, 0.5, 1.0, 0.5, 0.0]
+    
+    hard = normalize_captions(captions=[{"text": "Two", "start": 1, "end": 2}])[0]
+    assert [caption_opacity(hard, t) for t in (0.99, 1.0, 1.99, 2.0)] == [0.0, 1.0, 1.0, 0.0]
+
+def test_emoji_are_split_into_runs_of_their_own():
+    assert split_runs("Fly 🚁🌅 high") == [("Fly ", False), ("🚁🌅", True), (" high", False)]
+
+def test_long_captions_wrap_to_the_sprite_width():
+    renderer = CaptionRenderer()
+    one_line = renderer.render("Drone", 20, 400)
+    wrapped = renderer.render("Drone life over the hills at dawn", 20, 120)
+    
+    assert wrapped.shape[2] == 4 and wrapped.dtype == np.uint8
+    assert wrapped.shape[1] <= 120
+    assert wrapped.shape[0] > 2 * one_line.shape[0]
+    
+    # Text is tinted; the translucent box stays behind it
+    red = renderer.render("Drone", 20, 400, text_color=(255, 0, 0))
+    opaque = red[:, :, 3] == 255
+    assert (red[opaque][:, 2] > 200).any() and not (red[opaque][:, 0] > 200).any()
+    assert one_line[0, one_line.shape[1] // 2, 3] == 170
+
+def test_emoji_without_a_color_font_are_left_out():
+    renderer = CaptionRenderer(emoji_font_path="/nonexistent/emoji.ttf")
+    assert renderer._emoji_font() is None
+    assert np.array_equal(renderer.render("Hi 🚁", 20, 400), renderer.render("Hi ", 20, 400))
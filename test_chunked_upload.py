@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Chunked Upload Tests
+Chunk planning and resuming an upload after a chunk failed
+"""
+
+import asyncio
+
+import pytest
+import requests
+
+from chunked_upload import (MIN_CHUNK_SIZE, ChunkedUploader, UploadProgressStore,
+                            chunk_range, plan_chunks)
+
+class FakeUploadServer:
+    """transport.put() that stores chunk bytes and can drop chosen chunks"""
+    
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.received = {}
+        self.attempts = []
+    
+    async def put(self, url, data=None, headers=None, timeout=None):
+        content_range = headers["Content-Range"]
+        self.attempts.append(content_range)
+        if content_range in self.failing:
+            raise requests.exceptions.ConnectionError(f"connection dropped on {content_range}")
+        self.received[content_range] = bytes(data)
+        response = requests.Response()
+        response.status_code = 201
+        return response
+
+def test_plan_chunks_follows_tiktok_limits():
+    assert plan_chunks(1000) == (1000, 1)
+    assert plan_chunks(3 * MIN_CHUNK_SIZE + 17, MIN_CHUNK_SIZE) == (MIN_CHUNK_SIZE, 3)
+    # The last chunk absorbs the remainder
+    assert chunk_range(2, MIN_CHUNK_SIZE, 3, 3 * MIN_CHUNK_SIZE + 17) == (
+        2 * MIN_CHUNK_SIZE, 3 * MIN_CHUNK_SIZE + 17)
+
+def test_upload_resumes_from_the_chunks_the_server_accepted(tmp_path):
+    video = tmp_path / "clip.mp4"
+    payload = bytes(range(256)) * 40
+    video.write_bytes(payload)
+    store = UploadProgressStore(str(tmp_path / "upload_state"))
+    record = store.create(str(video), "publish-1", "https://upload.example/1", 2048, 5)
+    
+    # The third chunk keeps failing: the upload stops, with the chunks the
+    # server did accept recorded
+    server = FakeUploadServer(failing={"bytes 4096-6143/10240"})
+    uploader = ChunkedUploader(server, workers=1, retries=1, backoff=0.0)
+    with pytest.raises(requests.exceptions.ConnectionError):
+        asyncio.run(uploader.upload(str(video), record, store))
+    assert server.attempts.count("bytes 4096-6143/10240") == 2
+    
+    resumed = store.find(str(video))
+    assert resumed["publish_id"] == "publish-1"
+    accepted = resumed["acknowledged"]
+    assert 2 not in accepted and {0, 1} <= accepted
+    assert len(server.received) == len(accepted)
+    
+    # A later attempt sends only what is missing
+    server.failing.clear()
+    server.attempts.clear()
+    missing = sorted(set(range(5)) - accepted)
+    assert asyncio.run(ChunkedUploader(server, workers=2).upload(
+        str(video), resumed, store)) == len(missing)
+    assert sorted(server.attempts) == [f"bytes {i * 2048}-{i * 2048 + 2047}/10240"
+                                       for i in missing]
+    assert b"".join(server.received[key] for key in sorted(
+        server.received, key=lambda key: int(key.split()[1].split("-")[0]))) == payload
+    assert store.find(str(video))["acknowledged"] == {0, 1, 2, 3, 4}
+
+def test_changed_file_does_not_resume(tmp_path):
+    video = tmp_path / "clip.mp4"
+    video.write_bytes(b"x" * 100)
+    store = UploadProgressStore(str(tmp_path / "upload_state"))
+    store.create(str(video), "publish-1", "https://upload.example/1", 100, 1)
+    video.write_bytes(b"y" * 120)
+    assert store.find(str(video)) is None
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+HTTP Transport Tests
+Connection reuse counts against a local keep-alive server
+"""
+
+import asyncio
+import gzip
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from http_transport import AsyncHTTPTransport, HTTPTransport
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    connections = set()
+    
+    def do_GET(self):
+        KeepAliveHandler.connections.add(self.client_address)
+        body = b'{"ok": true}'
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body)
+            self.send_response(200)
+            self.send_header("Content-Encoding", "gzip")
+        else:
+            self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    do_POST = do_GET
+    
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def server():
+    KeepAliveHandler.connections = set()
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+def test_sequential_requests_share_one_connection(server):
+    transport = HTTPTransport()
+    try:
+        for _ in range(5):
+            response = transport.get(f"{server}/video/list/")
+            assert response.json() == {"ok": True}
+        transport.post(f"{server}/video/query/", json={})
+    finally:
+        transport.close()
+    
+    assert transport.stats() == {"requests": 6, "connections": 1, "reused": 5,
+                                 "reuse_rate": 5 / 6, "http2": False}
+    assert len(KeepAliveHandler.connections) == 1
+
+def test_concurrent_requests_open_at_most_their_concurrency(server):
+    async def scenario():
+        transport = AsyncHTTPTransport(max_concurrency=3)
+        try:
+            for _ in range(3):
+                await asyncio.gather(*(transport.get(f"{server}/user/info/")
+                                       for _ in range(3)))
+            return transport.stats()
+        finally:
+            await transport.aclose()
+    
+    stats = asyncio.run(scenario())
+    assert stats["requests"] == 9
+    assert 1 <= stats["connections"] <= 3
+    assert stats["reused"] == 9 - stats["connections"]
+    assert len(KeepAliveHandler.connections) == stats["connections"]
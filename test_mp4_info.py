@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+MP4 Header Reader Tests
+Compares read_mp4_info with what the decoders report (needs ffmpeg)
+"""
+
+import shutil
+import subprocess
+
+import pytest
+
+from mp4_info import read_keyframes, read_mp4_info
+
+pytestmark = pytest.mark.skipif(not shutil.which("ffmpeg"), reason="ffmpeg not installed")
+
+@pytest.fixture
+def clip(tmp_path):
+    """2 s of 320x240 H.264 at 30 fps, a keyframe every 15 frames"""
+    path = str(tmp_path / "clip.mp4")
+    subprocess.run([
+        'ffmpeg', '-y', '-v', 'error',
+        '-f', 'lavfi', '-i', 'testsrc2=size=320x240:rate=30:duration=2',
+        '-c:v', 'libx264', '-pix_fmt', 'yuv420p', '-g', '15', '-sc_threshold', '0',
+        path
+    ], check=True)
+    return path
+
+def rotate(path: str, output_path: str, degrees: int) -> str:
+    """Copy of path with display rotation metadata (no re-encode)"""
+    subprocess.run([
+        'ffmpeg', '-y', '-v', 'error',
+        '-display_rotation', str(degrees), '-i', path,
+        '-c', 'copy', output_path
+    ], check=True)
+    return output_path
+
+def test_info_of_plain_clip(clip):
+    info = read_mp4_info(clip)
+    assert (info["width"], info["height"]) == (320, 240)
+    assert info["frame_count"] == 60
+    assert info["fps"] == pytest.approx(30.0)
+    assert info["duration"] == pytest.approx(2.0)
+    assert info["rotation"] == 0
+    assert read_keyframes(clip) == pytest.approx([0.0, 0.5, 1.0, 1.5])
+
+@pytest.mark.parametrize("degrees", [90, 270])
+def test_rotated_clip_reports_display_size(clip, tmp_path, degrees):
+    rotated = rotate(clip, str(tmp_path / "rotated.mp4"), degrees)
+    info = read_mp4_info(rotated)
+    assert info["rotation"] in (90, 270)
+    assert (info["width"], info["height"]) == (240, 320)
+    
+    # ffmpeg applies the rotation when decoding, so frames come out 240x320
+    frame = subprocess.run([
+        'ffmpeg', '-v', 'error', '-i', rotated,
+        '-frames:v', '1', '-f', 'rawvideo', '-pix_fmt', 'bgr24', '-'
+    ], capture_output=True, check=True).stdout
+    assert len(frame) == info["width"] * info["height"] * 3
+
+def test_upside_down_clip_keeps_its_size(clip, tmp_path):
+    rotated = rotate(clip, str(tmp_path / "rotated.mp4"), 180)
+    info = read_mp4_info(rotated)
+    assert info["rotation"] == 180
+    assert (info["width"], info["height"]) == (320, 240)
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Rate Limiter Tests
+Token bucket pacing, Retry-After handling and 429 retries
+"""
+
+import asyncio
+import time
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+
+import pytest
+import requests
+
+import rate_limiter
+from rate_limiter import RateLimiter, TokenBucket, retry_delay
+from tiktok_manager import AsyncTikTokManager
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+    
+    def monotonic(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter, "time", clock)
+    return clock
+
+def response_with(status: int, headers=None) -> requests.Response:
+    response = requests.Response()
+    response.status_code = status
+    response.headers.update(headers or {})
+    return response
+
+def test_bucket_allows_a_burst_then_paces_evenly(clock):
+    bucket = TokenBucket(60, 60.0)
+    assert [bucket.reserve() for _ in range(6)] == [0.0] * 6
+    rate = 54 / 60.0
+    assert bucket.reserve() == pytest.approx(1 / rate)
+    assert bucket.reserve() == pytest.approx(2 / rate)
+    
+    # Time refills the bucket: the waits shrink by the time passed
+    clock.now += 1.0
+    assert bucket.reserve() == pytest.approx(3 / rate - 1.0)
+
+def test_bucket_never_exceeds_the_quota_in_any_window(clock):
+    bucket = TokenBucket(6, 60.0)
+    start = clock.now
+    send_times = sorted(start + bucket.reserve() for _ in range(30))
+    for i, first in enumerate(send_times):
+        in_window = [t for t in send_times[i:] if t < first + 60.0]
+        assert len(in_window) <= 6
+
+def test_accounts_and_endpoints_get_their_own_buckets(clock):
+    limiter = RateLimiter(quotas={"/slow/": (10, 60)}, default_quota=(600, 60))
+    assert limiter.bucket("/slow/", "a") is limiter.bucket("/slow/", "a")
+    assert limiter.bucket("/slow/", "a") is not limiter.bucket("/slow/", "b")
+    assert limiter.bucket("/slow/", "a").capacity == 1
+    assert limiter.bucket("/fast/", "a").capacity == 60
+
+def test_retry_after_seconds_and_dates_are_honoured():
+    assert retry_delay(response_with(429, {"Retry-After": "7"})) == 7.0
+    retry_at = datetime.now(timezone.utc) + timedelta(seconds=30)
+    assert retry_delay(response_with(429, {"Retry-After": format_datetime(retry_at, usegmt=True)})
+                       ) == pytest.approx(30, abs=2)
+    # Without one: jittered exponential backoff, capped
+    for attempt in range(8):
+        delay = min(60.0, 2 ** attempt)
+        assert delay / 2 <= retry_delay(response_with(429), attempt) <= delay
+
+def test_throttled_bucket_holds_callers_back(clock):
+    limiter = RateLimiter()
+    limiter.throttled("/video/list/", "a", 5.0)
+    assert limiter.bucket("/video/list/", "a").reserve() == pytest.approx(5.0)
+    assert limiter.bucket("/video/list/", "b").reserve() == 0.0
+    assert limiter.stats()["throttled"] == 1
+
+def test_manager_waits_out_a_429_before_retrying(tmp_path):
+    class FakeHTTP:
+        def __init__(self):
+            self.sent = []
+        
+        async def post(self, url, **kwargs):
+            self.sent.append(time.monotonic())
+            if len(self.sent) == 1:
+                return response_with(429, {"Retry-After": "0.2"})
+            return response_with(200)
+    
+    manager = AsyncTikTokManager("key", "secret", upload_state_dir=str(tmp_path / "state"),
+                                 token_cache_path=str(tmp_path / "tokens.json"))
+    manager.http = FakeHTTP()
+    response = asyncio.run(manager._post(f"{manager.base_url}/video/list/"))
+    
+    assert response.status_code == 200
+    assert len(manager.http.sent) == 2
+    assert manager.http.sent[1] - manager.http.sent[0] >= 0.19
+    stats = manager.rate_limit_stats()["endpoints"]["/video/list/"]
+    assert stats["throttled"] == 1 and stats["requests"] == 2
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Render Cache Tests
+Content-addressed keys, hits and misses, and LRU eviction
+"""
+
+import os
+import shutil
+
+import render_cache
+from render_cache import RenderCache
+
+def publish(cache, key, size, created):
+    temp_path = cache.reserve(key)
+    with open(temp_path, 'wb') as f:
+        f.write(b"v" * size)
+    entry = cache.publish(key, temp_path, {"frame_count": 1})
+    os.utime(entry["path"], (created, created))
+    return entry
+
+def test_keys_follow_content_not_paths(tmp_path):
+    cache = RenderCache(str(tmp_path / "cache"))
+    source = tmp_path / "source.mp4"
+    source.write_bytes(b"original")
+    renamed = str(tmp_path / "renamed.mp4")
+    shutil.copyfile(source, renamed)
+    params = {"ops": [{"op": "enhance"}]}
+    
+    key = cache.key(str(source), params)
+    assert cache.key(renamed, params) == key
+    assert cache.key(str(source), {"ops": []}) != key
+    source.write_bytes(b"edited!!")
+    os.utime(source, (1, 1))
+    assert cache.key(str(source), params) != key
+
+def test_lookup_hits_only_published_entries(tmp_path):
+    cache = RenderCache(str(tmp_path / "cache"))
+    assert cache.lookup("ab" * 32) is None
+    
+    # A reserved but unpublished render is not an entry
+    temp_path = cache.reserve("cd" * 32)
+    assert cache.lookup("cd" * 32) is None
+    cache.discard(temp_path)
+    
+    entry = publish(cache, "ab" * 32, 10, 1000)
+    hit = cache.lookup("ab" * 32)
+    assert hit["path"] == entry["path"] and hit["frame_count"] == 1
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
+
+def test_least_recently_used_entries_are_evicted_past_the_limit(tmp_path, monkeypatch):
+    cache = RenderCache(str(tmp_path / "cache"), max_bytes=250)
+    walks = []
+    walk = os.walk
+    monkeypatch.setattr(render_cache.os, "walk", lambda *args: walks.append(1) or walk(*args))
+    
+    publish(cache, "01" * 32, 100, 1000)
+    publish(cache, "02" * 32, 100, 2000)
+    # Reading the oldest makes it the most recently used
+    assert cache.lookup("01" * 32) is not None
+    assert len(walks) == 1
+    
+    publish(cache, "03" * 32, 100, 3000)
+    assert len(walks) == 2
+    assert cache.lookup("02" * 32) is None
+    assert cache.lookup("01" * 32) is not None
+    assert cache.lookup("03" * 32) is not None
+    assert cache.stats()["bytes"] == 200
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Request Coalescer Tests
+Batching, sharing and cleanup of BatchCoalescer lookups
+"""
+
+import asyncio
+
+import pytest
+
+from request_coalescer import BatchCoalescer
+
+class FakeBackend:
+    """fetch_batch that records its batches and can be held open"""
+    
+    def __init__(self, fail: Exception = None):
+        self.batches = []
+        self.tasks = []
+        self.fail = fail
+        self.release = None
+    
+    async def fetch_batch(self, keys):
+        self.batches.append(list(keys))
+        self.tasks.append(asyncio.current_task())
+        if self.release is not None:
+            await self.release.wait()
+        if self.fail is not None:
+            raise self.fail
+        return {key: f"value-{key}" for key in keys}
+
+def run(coroutine):
+    return asyncio.run(asyncio.wait_for(coroutine, timeout=5.0))
+
+def test_concurrent_gets_share_one_batch_and_the_cache():
+    backend = FakeBackend()
+    coalescer = BatchCoalescer(backend.fetch_batch, max_batch=10, window=0.01)
+    
+    async def scenario():
+        values = await asyncio.gather(*(coalescer.get(key) for key in [1, 2, 3, 2, 1]))
+        again = await coalescer.get(3)
+        return values, again
+    
+    values, again = run(scenario())
+    assert values == ["value-1", "value-2", "value-3", "value-2", "value-1"]
+    assert again == "value-3"
+    assert backend.batches == [[1, 2, 3]]
+    assert coalescer.stats() == {"calls": 6, "batches": 1, "cache_hits": 1,
+                                 "shared": 2, "cached": 3}
+
+def test_full_batches_go_out_without_waiting_for_the_window():
+    backend = FakeBackend()
+    coalescer = BatchCoalescer(backend.fetch_batch, max_batch=2, window=60.0)
+    
+    async def scenario():
+        return await asyncio.gather(*(coalescer.get(key) for key in range(4)))
+    
+    assert run(scenario()) == [f"value-{key}" for key in range(4)]
+    assert backend.batches == [[0, 1], [2, 3]]
+
+def test_failed_batch_reaches_every_caller_and_is_not_cached():
+    backend = FakeBackend(fail=IOError("API down"))
+    coalescer = BatchCoalescer(backend.fetch_batch, window=0.01)
+    
+    async def scenario():
+        results = await asyncio.gather(coalescer.get("a"), coalescer.get("a"),
+                                       coalescer.get("b"), return_exceptions=True)
+        backend.fail = None
+        return results, await coalescer.get("a")
+    
+    results, retried = run(scenario())
+    assert all(isinstance(result, IOError) for result in results)
+    assert retried == "value-a"
+    assert backend.batches == [["a", "b"], ["a"]]
+    assert coalescer._inflight == {}
+
+def test_cancelled_batch_cancels_its_callers_and_frees_its_keys():
+    backend = FakeBackend()
+    coalescer = BatchCoalescer(backend.fetch_batch, window=0.01)
+    
+    async def scenario():
+        backend.release = asyncio.Event()
+        callers = [asyncio.ensure_future(coalescer.get(key)) for key in ("a", "b")]
+        while not backend.tasks:
+            await asyncio.sleep(0.001)
+        backend.tasks[0].cancel()
+        results = await asyncio.gather(*callers, return_exceptions=True)
+        inflight = dict(coalescer._inflight)
+        
+        # The keys go out again instead of waiting on the dead batch forever
+        backend.release.set()
+        return results, inflight, await coalescer.get("a")
+    
+    results, inflight, retried = run(scenario())
+    assert all(isinstance(result, asyncio.CancelledError) for result in results)
+    assert inflight == {}
+    assert retried == "value-a"
+    assert backend.batches == [["a", "b"], ["a"]]
+
+def test_cancelled_caller_leaves_the_shared_batch_running():
+    backend = FakeBackend()
+    coalescer = BatchCoalescer(backend.fetch_batch, window=0.01)
+    
+    async def scenario():
+        backend.release = asyncio.Event()
+        first = asyncio.ensure_future(coalescer.get("a"))
+        second = asyncio.ensure_future(coalescer.get("a"))
+        while not backend.tasks:
+            await asyncio.sleep(0.001)
+        first.cancel()
+        backend.release.set()
+        return await second, first
+    
+    value, first = run(scenario())
+    assert value == "value-a"
+    assert first.cancelled()
+    with pytest.raises(asyncio.CancelledError):
+        first.result()
+    assert backend.batches == [["a"]]
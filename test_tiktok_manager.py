@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+TikTok Manager Tests
+Token fetches across the event loop boundary and manager shutdown
+"""
+
+import asyncio
+import time
+
+import pytest
+
+import tiktok_manager
+from tiktok_manager import AsyncTikTokManager, TikTokManager
+
+def manager_options(tmp_path):
+    return {"upload_state_dir": str(tmp_path / "upload_state"),
+            "token_cache_path": str(tmp_path / "tokens.json")}
+
+def test_token_fetch_without_a_running_loop_fails_fast(tmp_path):
+    manager = AsyncTikTokManager("key", "secret", **manager_options(tmp_path))
+    started = time.monotonic()
+    with pytest.raises(RuntimeError):
+        manager._fetch_token()
+    assert time.monotonic() - started < 1.0
+
+def test_stuck_token_fetch_times_out_and_is_cancelled(tmp_path, monkeypatch):
+    monkeypatch.setattr(tiktok_manager, "TOKEN_FETCH_TIMEOUT", 0.2)
+    manager = TikTokManager("key", "secret", **manager_options(tmp_path))
+    cancelled = []
+    
+    async def stuck_post(url, **kwargs):
+        try:
+            await asyncio.sleep(3600)
+        except asyncio.CancelledError:
+            cancelled.append(url)
+            raise
+    
+    manager.client._loop = manager._loop
+    manager.client._post = stuck_post
+    try:
+        started = time.monotonic()
+        with pytest.raises(RuntimeError, match="timed out"):
+            manager.client._fetch_token()
+        assert time.monotonic() - started < 2.0
+        deadline = time.monotonic() + 2.0
+        while not cancelled and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert cancelled
+    finally:
+        manager.close()
+
+def test_close_cancels_the_token_timer_and_closes_the_loop(tmp_path):
+    manager = TikTokManager("key", "secret", **manager_options(tmp_path))
+    manager.client.tokens._schedule_refresh({"expires_at": time.time() + 3600,
+                                             "obtained_at": time.time()})
+    timer = manager.client.tokens._timer
+    
+    manager.close()
+    assert not manager._thread.is_alive()
+    assert manager._loop.is_closed()
+    timer.join(1.0)
+    assert not timer.is_alive()
+    
+    # A refresh firing after shutdown fails instead of hanging on the dead loop
+    manager.client._loop = manager._loop
+    with pytest.raises(RuntimeError):
+        manager.client._fetch_token()
+    manager.close()
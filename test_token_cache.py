@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Token Cache Tests
+When TokenCache fetches, adopts and schedules refreshes of tokens
+"""
+
+import time
+
+import pytest
+
+from token_cache import TokenCache
+
+class FakeTokenEndpoint:
+    """fetch() that counts calls and hands out numbered tokens"""
+    
+    def __init__(self, expires_in: float):
+        self.expires_in = expires_in
+        self.calls = 0
+    
+    def __call__(self):
+        self.calls += 1
+        return {"access_token": f"token-{self.calls}", "expires_in": self.expires_in}
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return str(tmp_path / "tokens.json")
+
+def test_token_shorter_than_the_margin_is_not_refetched_on_every_get(cache_path):
+    endpoint = FakeTokenEndpoint(expires_in=120)
+    cache = TokenCache(cache_path, "client:scope", endpoint, refresh_margin=300)
+    try:
+        assert [cache.get() for _ in range(20)] == ["token-1"] * 20
+        time.sleep(0.05)
+        assert endpoint.calls == 1
+        assert cache._background is None
+        # Refreshed at half-life rather than immediately
+        assert 55 < cache._timer.interval <= 60
+    finally:
+        cache.close()
+
+def test_token_read_from_the_file_gets_a_refresh_timer(cache_path):
+    endpoint = FakeTokenEndpoint(expires_in=3600)
+    writer = TokenCache(cache_path, "client:scope", endpoint)
+    writer.get()
+    writer.close()
+    
+    reader = TokenCache(cache_path, "client:scope", endpoint)
+    try:
+        assert reader.get() == "token-1"
+        assert endpoint.calls == 1
+        assert reader._timer is not None
+        assert 3200 < reader._timer.interval <= 3300
+    finally:
+        reader.close()
+
+def test_scheduled_refresh_runs_without_get(cache_path):
+    endpoint = FakeTokenEndpoint(expires_in=0.4)
+    cache = TokenCache(cache_path, "client:scope", endpoint)
+    try:
+        assert cache.get() == "token-1"
+        deadline = time.time() + 5.0
+        while endpoint.calls < 2 and time.time() < deadline:
+            time.sleep(0.01)
+        assert endpoint.calls >= 2
+    finally:
+        cache.close()
@@ -78,41 +78,25 @@ class TestVideoUpload:
         else:
             print("   🔄 Needs resizing to 1080x1920")
         
-        # Step 2: Resize (mock)
+        # Steps 2-4: Resize, enhance and caption in one render pass
         print("2️⃣ Resizing to TikTok format...")
-        result = self.video_processor.resize_video(
-            video_path, 
-            "videos/content_1_resized.mp4"
-        )
-        if result:
-            print("   ✅ Resizing completed")
-        else:
-            print("   ⚠️  Resizing simulated (mock mode)")
-        
-        # Step 3: Enhance colors
         print("3️⃣ Applying cinematic enhancements...")
-        result = self.video_processor.enhance_video(
-            "videos/content_1_resized.mp4",
-            "videos/content_1_enhanced.mp4"
-        )
-        if result:
-            print("   ✅ Enhancement completed")
-        else:
-            print("   ⚠️  Enhancement simulated (mock mode)")
-        
-        # Step 4: Add text overlay
         print("4️⃣ Adding text overlay...")
         post_1 = self.posts[0]
         caption = post_1['content']['tiktok_caption'][:30]
-        result = self.video_processor.add_text_overlay(
-            "videos/content_1_enhanced.mp4",
+        result = self.video_processor.process_video(
+            video_path,
             "videos/content_1_final.mp4",
-            caption
+            [
+                {"op": "resize", "width": 1080, "height": 1920},
+                {"op": "enhance"},
+                {"op": "overlay", "text": caption}
+            ]
         )
         if result:
-            print("   ✅ Text overlay added")
+            print("   ✅ Resize, enhancement and text overlay completed")
         else:
-            print("   ⚠️  Text overlay simulated (mock mode)")
+            print("   ⚠️  Processing simulated (mock mode)")
         
         return "videos/content_1_final.mp4"
     
@@ -0,0 +1,481 @@
+#!/usr/bin/env python3
+"""
+Video Processor Tests
+Frame-exact checks of the render paths on small synthetic clips (needs ffmpeg)
+"""
+
+import os
+import shutil
+import subprocess
+import time
+
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+np = pytest.importorskip("numpy")
+
+import video_processor
+from video_processor import ColorGrade, VideoProcessor
+
+pytestmark = pytest.mark.skipif(not shutil.which("ffmpeg"), reason="ffmpeg not installed")
+
+# Brightness drifts, so each frame grades differently
+DRIFTING = "eq=brightness='0.3*sin(t*2)':eval=frame"
+
+# Flat frames whose luma steps by 5 per frame, so each one is recognizable
+NUMBERED = "geq=lum='32+mod(N*5,190)':cb=128:cr=128"
+
+def make_clip(path: str, seconds: float = 5.0, fps: int = 30, gop: int = 30,
+              size: str = "320x240", pattern: str = DRIFTING, extra_args=()) -> str:
+    """H.264 test clip"""
+    subprocess.run([
+        'ffmpeg', '-y', '-v', 'error',
+        '-f', 'lavfi', '-i', f'testsrc2=size={size}:rate={fps}:duration={seconds}',
+        '-vf', pattern,
+        '-c:v', 'libx264', '-pix_fmt', 'yuv420p', '-g', str(gop), '-bf', '0',
+        *extra_args, path
+    ], check=True)
+    return path
+
+def read_frames(path: str) -> "np.ndarray":
+    cap = cv2.VideoCapture(path)
+    frames = []
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return np.array(frames)
+
+def nearest_source_frames(frames: "np.ndarray", source: "np.ndarray", first: int):
+    """Source index each output frame matches best, searching a few frames around
+    where it should be"""
+    indices = []
+    for i, frame in enumerate(frames):
+        window = range(max(0, first + i - 3), min(len(source), first + i + 4))
+        indices.append(min(window, key=lambda j: np.mean(
+            (source[j].astype(np.float32) - frame) ** 2)))
+    return indices
+
+def lossless_processor(workers: int) -> VideoProcessor:
+    """Lossless encodes, so equal frames in means equal frames out"""
+    return VideoProcessor(workers=workers, encoder="ffmpeg", preset="ultrafast", crf=0)
+
+ENHANCE_CHAIN = [
+    {"op": "trim", "start_time": 0.5, "duration": 4.0},
+    {"op": "resize", "width": 180, "height": 320},
+    {"op": "enhance", "brightness": 1.2, "contrast": 1.3, "saturation": 1.1}
+]
+
+def test_serial_threaded_and_parallel_renders_match(tmp_path, monkeypatch):
+    source = make_clip(str(tmp_path / "source.mp4"))
+    
+    # A slow pivot sample used to let workers race to set the grade
+    mean_luma = ColorGrade.mean_luma.__func__
+    
+    def slow_mean_luma(cls, frame, brightness=1.0):
+        time.sleep(0.01)
+        return mean_luma(cls, frame, brightness)
+    
+    monkeypatch.setattr(ColorGrade, "mean_luma", classmethod(slow_mean_luma))
+    
+    serial = str(tmp_path / "serial.mp4")
+    threaded = str(tmp_path / "threaded.mp4")
+    parallel = str(tmp_path / "parallel.mp4")
+    assert lossless_processor(1).process_video(source, serial, ENHANCE_CHAIN)
+    assert lossless_processor(4).process_video(source, threaded, ENHANCE_CHAIN)
+    assert lossless_processor(1).process_video_parallel(source, parallel, ENHANCE_CHAIN,
+                                                        workers=2)
+    
+    expected = read_frames(serial)
+    assert len(expected) == 120
+    assert np.array_equal(read_frames(threaded), expected)
+    assert np.array_equal(read_frames(parallel), expected)
+
+def test_variants_from_one_decode_get_their_own_frame_counts(tmp_path):
+    source = make_clip(str(tmp_path / "source.mp4"), seconds=3.0)
+    outputs = [str(tmp_path / f"variant_{i}.mp4") for i in range(3)]
+    assert lossless_processor(2).process_variants(source, [
+        (outputs[0], [{"op": "resize", "width": 180, "height": 320}]),
+        (outputs[1], [{"op": "trim", "start_time": 1.0, "duration": 1.5}]),
+        (outputs[2], [{"op": "trim", "start_time": 0.5, "duration": 1.0},
+                      {"op": "enhance"}])
+    ])
+    
+    assert [len(read_frames(path)) for path in outputs] == [90, 45, 30]
+    assert read_frames(outputs[0]).shape[1:] == (320, 180, 3)
+
+def test_variant_setup_failure_stops_the_encoders_already_open(tmp_path, monkeypatch):
+    source = make_clip(str(tmp_path / "source.mp4"), seconds=1.0)
+    processor = lossless_processor(1)
+    opened = []
+    open_writer = processor._open_writer
+    
+    def failing_open_writer(output_path, fps, size):
+        if opened:
+            raise IOError("encoder unavailable")
+        opened.append(open_writer(output_path, fps, size))
+        return opened[-1]
+    
+    monkeypatch.setattr(processor, "_open_writer", failing_open_writer)
+    assert not processor.process_variants(source, [
+        (str(tmp_path / "first.mp4"), [{"op": "resize", "width": 180, "height": 320}]),
+        (str(tmp_path / "second.mp4"), [{"op": "resize", "width": 90, "height": 160}])
+    ])
+    assert len(opened) == 1
+    assert opened[0].process.poll() is not None
+
+def test_factory_leaves_the_caches_opt_in(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv("RENDER_CACHE_DIR", raising=False)
+    monkeypatch.delenv("AUDIO_CACHE_DIR", raising=False)
+    assert video_processor.create_video_processor(use_mock=False).render_cache is None
+    assert os.listdir(tmp_path) == []
+    
+    monkeypatch.setenv("RENDER_CACHE_DIR", str(tmp_path / "renders"))
+    processor = video_processor.create_video_processor(use_mock=False)
+    assert processor.render_cache.cache_dir == str(tmp_path / "renders")
+
+def test_enhance_stage_requires_a_pinned_pivot():
+    processor = lossless_processor(1)
+    with pytest.raises(ValueError):
+        processor._build_enhance_stage(320, 240)
+
+def test_frame_pool_is_released_after_renders(tmp_path, monkeypatch):
+    source = make_clip(str(tmp_path / "source.mp4"), seconds=2.0)
+    processor = lossless_processor(3)
+    assert processor.frame_pool.max_free == 2 * processor.pipeline.queue_size + 3 + 2
+    
+    assert processor.process_video(source, str(tmp_path / "ok.mp4"), ENHANCE_CHAIN)
+    stats = processor.frame_pool.stats()
+    assert stats["reuses"] > 0
+    assert (stats["owned"], stats["free"]) == (0, 0)
+    
+    # Frames in flight when a stage fails are dropped with the session too
+    def failing_stage(width, height):
+        def stage(frame, t):
+            if t > 0.5:
+                raise RuntimeError("stage failed")
+            return frame
+        return stage, (width, height)
+    
+    monkeypatch.setattr(processor, "_build_cinematic_stage", failing_stage)
+    assert not processor.process_video(source, str(tmp_path / "failed.mp4"),
+                                       [{"op": "resize", "width": 180, "height": 320},
+                                        {"op": "cinematic"}])
+    assert processor.frame_pool.stats()["owned"] == 0
+
+@pytest.mark.skipif(not shutil.which("ffprobe"), reason="ffprobe not installed")
+def test_smart_trim_keeps_every_frame_of_the_range(tmp_path):
+    # Keyframes at 0, 10, 40, 70, 100, ...: the 75..225 range has a partial
+    # GOP at each edge and whole GOPs to stream-copy between them
+    source = make_clip(str(tmp_path / "source.mp4"), seconds=8.0, gop=1000,
+                       pattern=NUMBERED, extra_args=['-sc_threshold', '0', '-force_key_frames',
+                                   'expr:eq(n,0)+gte(n,10)*eq(mod(n-10,30),0)'])
+    output = str(tmp_path / "trimmed.mp4")
+    assert lossless_processor(1).trim_video(source, output, 2.5, 5.0)
+    
+    frames = read_frames(output)
+    assert len(frames) == 150
+    assert nearest_source_frames(frames, read_frames(source), 75) == list(range(75, 225))
+
+def test_trim_past_the_end_stops_at_the_last_frame(tmp_path):
+    source = make_clip(str(tmp_path / "source.mp4"), seconds=5.0, pattern=NUMBERED)
+    processor = lossless_processor(1)
+    output = str(tmp_path / "tail.mp4")
+    assert processor.trim_video(source, output, 2.0, 30.0)
+    assert len(read_frames(output)) == 90
+    
+    # Nothing at all to keep: fails without leaving a file behind
+    missing = str(tmp_path / "missing.mp4")
+    assert not processor.trim_video(source, missing, 6.0, 1.0)
+    assert not os.path.exists(missing)
+
+def test_passthrough_flag_falls_back_to_vsync_before_ffmpeg_5_1(monkeypatch):
+    help_text = {"4.4": "-vsync <>  video sync method\n",
+                 "7.0": "-vsync <>  deprecated, use -fps_mode\n-fps_mode  set framerate mode\n"}
+    for version, expected in (("4.4", ('-vsync', 'passthrough')),
+                              ("7.0", ('-fps_mode', 'passthrough'))):
+        monkeypatch.setattr(video_processor.subprocess, "run",
+                            lambda *args, **kwargs: subprocess.CompletedProcess(
+                                args, 0, help_text[version], ""))
+        assert video_processor._passthrough_args.__wrapped__() == expected
+
+def test_trim_operation_rounds_like_trim_video():
+    trim = [{"op": "trim", "start_time": 0.49, "duration": 1.0}]
+    assert VideoProcessor._trim_range(trim, 30.0) == (15, 45)
+
+def test_hyperlapse_of_rotated_clip_keeps_the_picture(tmp_path):
+    # A portrait phone clip: coded 320x240, displayed 240x320
+    coded = make_clip(str(tmp_path / "coded.mp4"), seconds=4.0, gop=10)
+    rotated = str(tmp_path / "rotated.mp4")
+    subprocess.run(['ffmpeg', '-y', '-v', 'error', '-display_rotation', '90',
+                    '-i', coded, '-c', 'copy', rotated], check=True)
+    output = str(tmp_path / "hyperlapse.mp4")
+    assert lossless_processor(1).create_hyperlapse(rotated, output, speed=10.0,
+                                                   stabilize=False)
+    
+    frames = read_frames(output)
+    source = read_frames(rotated)
+    assert frames.shape[1:] == source.shape[1:] == (320, 240, 3)
+    assert len(frames) == 12
+    assert nearest_source_frames(frames[:1], source, 0) == [0]
+    assert np.mean(np.abs(frames[0].astype(np.float32) - source[0])) < 2.0
+
+def test_hyperlapse_decodes_only_the_kept_keyframes(tmp_path, capsys):
+    source = make_clip(str(tmp_path / "source.mp4"), seconds=4.0, gop=10, pattern=NUMBERED,
+                       extra_args=['-sc_threshold', '0'])
+    processor = lossless_processor(1)
+    assert processor.create_hyperlapse(source, str(tmp_path / "hyperlapse.mp4"),
+                                       speed=20.0, stabilize=False)
+    assert "Hyperlapse decoded 6 of 120 frames" in capsys.readouterr().out
+    
+    # The kept frames themselves, before the encode blurs the luma steps
+    source_frames = read_frames(source)
+    frames = list(processor._hyperlapse_frames(source, processor.get_video_info(source),
+                                               20.0, 1))
+    assert [nearest_source_frames(frames[i:i + 1], source_frames, 20 * i)[0]
+            for i in range(len(frames))] == [0, 20, 40, 60, 80, 100]
+
+def test_hyperlapse_resamples_evenly_when_keyframes_are_sparse(tmp_path, capsys):
+    # A 50-frame keyframe gap: nearest keyframes would skip and bunch up
+    source = make_clip(str(tmp_path / "source.mp4"), seconds=4.0, gop=1000, pattern=NUMBERED,
+                       extra_args=['-sc_threshold', '0', '-force_key_frames',
+                                   'expr:eq(n,0)+eq(n,10)+gte(n,60)*eq(mod(n,10),0)'])
+    processor = lossless_processor(1)
+    frames = list(processor._hyperlapse_frames(source, processor.get_video_info(source),
+                                               20.0, 1))
+    assert "reference frames only" in capsys.readouterr().out
+    
+    source_frames = read_frames(source)
+    assert [nearest_source_frames(frames[i:i + 1], source_frames, 20 * i)[0]
+            for i in range(len(frames))] == [0, 20, 40, 60, 80, 100]
+
+def test_fused_chain_matches_one_pass_per_operation(tmp_path):
+    source = make_clip(str(tmp_path / "source.mp4"), seconds=2.0)
+    processor = lossless_processor(2)
+    chain = [{"op": "trim", "start_time": 0.5, "duration": 1.0},
+             {"op": "resize", "width": 180, "height": 320},
+             {"op": "cinematic"}]
+    fused = str(tmp_path / "fused.mp4")
+    assert processor.process_video(source, fused, chain)
+    
+    # The same chain as three separate renders, each re-encoding its input
+    step = source
+    for i, operation in enumerate(chain):
+        output = str(tmp_path / f"step_{i}.mp4")
+        assert processor.process_video(step, output, [operation])
+        step = output
+    
+    frames = read_frames(fused)
+    assert frames.shape == (30, 320, 180, 3)
+    assert np.mean(np.abs(frames.astype(np.float32) - read_frames(step))) < 1.0
+
+def test_unknown_operation_fails_the_render(tmp_path):
+    source = make_clip(str(tmp_path / "source.mp4"), seconds=1.0)
+    output = str(tmp_path / "out.mp4")
+    assert not lossless_processor(1).process_video(source, output, [{"op": "sharpen"}])
+    assert not os.path.exists(output)
+
+def test_color_grade_matches_the_pil_enhance_chain():
+    from PIL import Image, ImageEnhance
+    
+    # Unclipped after brightness, so channel means give the same pivot as PIL
+    frame = np.random.default_rng(1).integers(0, 200, (48, 64, 3), dtype=np.uint8)
+    image = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+    image = ImageEnhance.Brightness(image).enhance(1.2)
+    pivot = int(np.asarray(image.convert("L")).mean() + 0.5)
+    image = ImageEnhance.Contrast(image).enhance(1.3)
+    image = ImageEnhance.Color(image).enhance(1.1)
+    expected = cv2.cvtColor(np.asarray(image), cv2.COLOR_RGB2BGR).astype(np.int16)
+    
+    assert abs(int(ColorGrade.mean_luma(frame, 1.2) + 0.5) - pivot) <= 1
+    graded = ColorGrade(1.2, 1.3, 1.1, contrast_pivot=pivot).apply(frame)
+    assert graded.dtype == np.uint8 and graded is not frame
+    # PIL truncates to uint8 after each of its three steps; the LUT rounds once
+    assert np.abs(graded - expected).max() <= 3
+    assert np.abs(graded - expected).mean() < 1.5
+    
+    # A neutral grade is no work at all
+    neutral = ColorGrade()
+    assert neutral.is_identity_lut and neutral.matrix is None
+    assert neutral.apply(frame, in_place=True) is frame
+
+def test_mask_cache_builds_each_resolution_once():
+    cache = video_processor.MaskCache(max_entries=2)
+    built = []
+    
+    def builder(width, height, strength):
+        built.append((width, height, strength))
+        return np.full((height, width), strength, dtype=np.float32)
+    
+    first = cache.get("vignette", 64, 48, builder, (0.5,))
+    assert cache.get("vignette", 64, 48, builder, (0.5,)) is first
+    assert not first.flags.writeable
+    
+    # Fixed point reuses the float mask instead of building it again
+    fixed = cache.get("vignette", 64, 48, builder, (0.5,), fixed_point=True)
+    assert fixed.dtype == np.uint16 and fixed[0, 0] == 32768
+    assert built == [(64, 48, 0.5)]
+    
+    # Past max_entries the least recently used mask goes
+    cache.get("vignette", 32, 24, builder, (0.5,))
+    cache.get("vignette", 64, 48, builder, (0.5,))
+    assert len(built) == 3
+    assert cache.stats()["entries"] == 2
+    
+    # Frames rendered at one size share their masks
+    processor = lossless_processor(1)
+    processor._build_cinematic_stage(320, 240)
+    processor._build_cinematic_stage(320, 240)
+    assert processor.mask_cache.stats()["hits"] == 1
+
+def test_ffmpeg_writer_takes_strided_frames_of_odd_size(tmp_path):
+    output = str(tmp_path / "odd.mp4")
+    writer = video_processor.FFmpegWriter(output, 30.0, (101, 75), preset="ultrafast", crf=0)
+    canvas = np.zeros((100, 150, 3), dtype=np.uint8)
+    for i in range(10):
+        canvas[:] = 40 + 10 * i
+        # A crop is a strided view into the canvas
+        writer.write(canvas[10:85, 20:121])
+    writer.release()
+    
+    # yuv420p needs even sizes, so the picture is padded by one pixel
+    frames = read_frames(output)
+    assert frames.shape == (10, 76, 102, 3)
+    # (the RGB/YUV round trip shifts levels by a few steps)
+    levels = [frame[:75, :101].mean() for frame in frames]
+    assert np.allclose(levels, [40 + 10 * i for i in range(10)], atol=4)
+
+def test_ffmpeg_writer_reports_encode_failures(tmp_path):
+    writer = video_processor.FFmpegWriter(str(tmp_path / "missing" / "out.mp4"), 30.0, (64, 48))
+    with pytest.raises(RuntimeError, match="FFmpeg encode failed"):
+        for _ in range(100):
+            writer.write(np.zeros((48, 64, 3), dtype=np.uint8))
+        writer.release()
+    
+    with pytest.raises(ValueError):
+        VideoProcessor(encoder="vp9")
+
+def test_timed_captions_show_only_inside_their_window(tmp_path):
+    source = make_clip(str(tmp_path / "source.mp4"), seconds=3.0,
+                       pattern="geq=lum=100:cb=128:cr=128")
+    output = str(tmp_path / "captioned.mp4")
+    assert lossless_processor(2).add_captions(source, output, [
+        {"text": "Over the ridge", "start": 1.0, "end": 2.0, "position": "bottom"}])
+    
+    changed = np.abs(read_frames(output).astype(np.float32) - read_frames(source)).max(axis=3)
+    bottom, top = changed[:, 160:], changed[:, :120]
+    assert [bool((frame > 40).any()) for frame in bottom] == [30 <= i < 60 for i in range(90)]
+    assert top.max() < 40
+
+def test_thumbnails_and_contact_sheet_in_one_pass(tmp_path):
+    source = make_clip(str(tmp_path / "source.mp4"), seconds=5.0, pattern=NUMBERED)
+    source_frames = read_frames(source)
+    processor = lossless_processor(1)
+    
+    # Out-of-range timestamps clamp to the last frame
+    paths = processor.generate_thumbnails(source, str(tmp_path / "thumbs"),
+                                          timestamps=[2.0, 0.5, 10.0])
+    assert [os.path.basename(path) for path in paths] == [
+        "source_000015.jpg", "source_000060.jpg", "source_000149.jpg"]
+    for path, index in zip(paths, (15, 60, 149)):
+        assert abs(cv2.imread(path).mean() - source_frames[index].mean()) < 2.0
+    
+    sheet = str(tmp_path / "sheet.jpg")
+    paths = processor.generate_thumbnails(source, str(tmp_path / "even"), count=8,
+                                          contact_sheet=sheet, columns=4, thumb_width=80)
+    assert [int(path[-10:-4]) for path in paths] == [9, 28, 46, 65, 84, 103, 121, 140]
+    assert cv2.imread(sheet).shape == (2 * 64 + 4, 4 * 84 + 4, 3)
+
+def test_cover_frame_prefers_the_sharp_well_exposed_second(tmp_path):
+    # Blurred and underexposed everywhere but 2-3 s
+    dull = "enable='not(between(t,2,3))'"
+    source = make_clip(str(tmp_path / "source.mp4"), seconds=6.0,
+                       pattern=f"boxblur=8:{dull},eq=brightness=-0.35:{dull}")
+    processor = lossless_processor(1)
+    
+    cover = processor.select_cover_frame(source, samples=24)
+    assert 2.0 <= cover["timestamp"] <= 3.0
+    assert cover["frame"].shape == (240, 320, 3)
+    assert cover["score"] == pytest.approx(sum(
+        weight * cover[name] for name, weight in VideoProcessor.COVER_WEIGHTS.items()))
+    
+    thumbnail = str(tmp_path / "cover.jpg")
+    assert processor.generate_video_thumbnail(source, thumbnail, timestamp=None)
+    assert cv2.imread(thumbnail).shape == (240, 320, 3)
+    assert processor.select_cover_frame(str(tmp_path / "missing.mp4")) == {}
+
+# Black apart from the moving test pattern between 8 and 12 s
+HIGHLIGHT_AT_8S = "drawbox=c=black:t=fill:enable='not(between(t,8,12))'"
+
+def test_highlight_window_lands_on_the_lively_seconds(tmp_path):
+    source = make_clip(str(tmp_path / "source.mp4"), seconds=16.0, pattern=HIGHLIGHT_AT_8S)
+    processor = lossless_processor(1)
+    
+    highlight = processor.find_highlight(source, duration=4.0)
+    assert (highlight["start_time"], highlight["duration"]) == (8.0, 4.0)
+    assert len(highlight["per_second"]) == 16
+    assert max(highlight["per_second"][:7]) < 0.05 < min(highlight["per_second"][8:12])
+    
+    # Longer than the clip: the window is the whole clip
+    assert processor.find_highlight(source, duration=30.0)["duration"] == 16.0
+
+@pytest.mark.skipif(not shutil.which("ffprobe"), reason="ffprobe not installed")
+def test_extracted_highlight_is_the_window_trimmed(tmp_path):
+    source = make_clip(str(tmp_path / "source.mp4"), seconds=16.0, pattern=HIGHLIGHT_AT_8S)
+    output = str(tmp_path / "highlight.mp4")
+    assert lossless_processor(1).extract_highlight(source, output, duration=4.0)
+    
+    frames = read_frames(output)
+    assert len(frames) == 120
+    assert min(frame.mean() for frame in frames) > 20
+
+def frame_shifts(frames: "np.ndarray") -> "np.ndarray":
+    """Global (dx, dy) between consecutive frames by phase correlation"""
+    grays = [cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY).astype(np.float32) for frame in frames]
+    return np.array([cv2.phaseCorrelate(a, b)[0] for a, b in zip(grays, grays[1:])])
+
+def test_stabilization_removes_shake(tmp_path):
+    # A hand-held looking crop wandering over a larger frame
+    source = make_clip(str(tmp_path / "source.mp4"), seconds=3.0, size="400x300",
+                       pattern="crop=320:240:'40+12*sin(n*2.1)':'30+9*cos(n*1.7)'")
+    output = str(tmp_path / "stable.mp4")
+    assert lossless_processor(2).stabilize_video(source, output, smoothing_radius=10)
+    
+    frames = read_frames(output)
+    assert frames.shape == (90, 240, 320, 3)
+    # Compare away from the edges, which the warp fills by reflection
+    shake = np.abs(frame_shifts(read_frames(source)[:, 30:-30, 40:-40])).mean()
+    residual = np.abs(frame_shifts(frames[:, 30:-30, 40:-40])).mean()
+    assert residual < shake / 4
+    
+    with pytest.raises(ValueError):
+        lossless_processor(1)._build_stabilize_stage(320, 240)
+
+def test_moving_average_pads_with_the_edge_values():
+    values = np.array([0.0, 0.0, 3.0, 0.0, 0.0, 6.0])
+    assert VideoProcessor._moving_average(values, 1).tolist() == [0.0, 1.0, 1.0, 1.0, 2.0, 4.0]
+
+def test_auto_reframe_follows_the_subject_across_the_frame(tmp_path):
+    # A bright box crossing a dark 8:3 frame at 100 px/s
+    source = make_clip(str(tmp_path / "source.mp4"), seconds=5.0, size="640x240",
+                       pattern="geq=lum='if(between(X-40-T*100,0,59)*between(Y,90,149),235,16)'"
+                               ":cb=128:cr=128")
+    processor = lossless_processor(2)
+    
+    path = processor._estimate_crop_path(source, [], 9 / 16)
+    centers = np.array(path["crop_centers"])
+    box_centers = (70 + 100 * np.arange(len(centers)) / path["sample_fps"]) / 640
+    assert len(centers) == 10
+    assert (np.diff(centers) > 0).all()
+    assert np.abs(centers - box_centers).max() < 0.11
+    
+    # The center crop loses the box; the reframed crop keeps it in every frame
+    reframed = str(tmp_path / "reframed.mp4")
+    centered = str(tmp_path / "centered.mp4")
+    assert processor.resize_video(source, reframed, 136, 240, auto_reframe=True)
+    assert processor.resize_video(source, centered, 136, 240)
+    assert all(frame.max() > 200 for frame in read_frames(reframed))
+    assert not all(frame.max() > 200 for frame in read_frames(centered))
@@ -6,21 +6,81 @@ Handles posting and managing TikTok content
 
 import os
 import json
+import asyncio
+import threading
+import concurrent.futures
 import requests
 from typing import Dict, Optional, List
 from datetime import datetime
 import time
 
-class TikTokManager:
-    def __init__(self, client_key: str, client_secret: str):
-        """Initialize TikTok API manager"""
+from http_transport import AsyncHTTPTransport
+from token_cache import TokenCache
+from rate_limiter import RateLimiter, retry_delay
+from request_coalescer import BatchCoalescer
+from chunked_upload import (DEFAULT_CHUNK_SIZE, ChunkedUploader, UploadProgressStore,
+                            plan_chunks)
+
+# /video/query/ accepts at most this many video_ids per request
+VIDEO_QUERY_MAX_IDS = 20
+
+# Seconds a token cache thread waits for the event loop to fetch a token
+TOKEN_FETCH_TIMEOUT = 60.0
+
+class AsyncTikTokManager:
+    def __init__(self, client_key: str, client_secret: str,
+                 upload_state_dir: str = "upload_state", upload_workers: int = 4,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE, http2: bool = False,
+                 token_cache_path: str = "token_cache.json", max_concurrency: int = 16,
+                 rate_limiter: Optional[RateLimiter] = None, max_retries: int = 3,
+                 video_info_ttl: float = 30.0):
+        """Initialize TikTok API manager; max_concurrency caps requests in flight
+        
+        Pass one rate_limiter to several managers to pace their accounts
+        from a shared set of metrics. get_video_info answers are cached for
+        video_info_ttl seconds.
+        """
         self.client_key = client_key
         self.client_secret = client_secret
         self.access_token = None
         self.base_url = "https://open.tiktokapis.com/v2"
+        self._loop = None
         
-    def get_access_token(self) -> Optional[str]:
-        """Get OAuth access token"""
+        # API calls are paced per endpoint and account; 429s are retried
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.max_retries = max_retries
+        
+        # One keep-alive pool for every call; sized to cover the upload workers
+        self.http = AsyncHTTPTransport(pool_maxsize=max(10, upload_workers), http2=http2,
+                                       max_concurrency=max_concurrency)
+        
+        # Tokens are shared on disk by every process using these credentials
+        self.tokens = TokenCache(token_cache_path, f"{client_key}:video.upload",
+                                 self._fetch_token)
+        
+        # Chunk progress survives restarts so interrupted uploads resume
+        self.chunk_size = chunk_size
+        self.upload_progress = UploadProgressStore(upload_state_dir)
+        self.uploader = ChunkedUploader(self.http, upload_workers)
+        
+        # Concurrent get_video_info calls share batched /video/query/ requests
+        self.video_info = BatchCoalescer(self._query_videos, max_batch=VIDEO_QUERY_MAX_IDS,
+                                         ttl=video_info_ttl)
+        
+    async def get_access_token(self) -> Optional[str]:
+        """Get OAuth access token (cached across processes, refreshed before expiry)"""
+        self._loop = asyncio.get_running_loop()
+        try:
+            # Answered from memory when fresh; a blocking refresh holds a worker thread
+            self.access_token = await self._loop.run_in_executor(None, self.tokens.get)
+            return self.access_token
+            
+        except (requests.exceptions.RequestException, RuntimeError, OSError) as e:
+            print(f"Error getting access token: {e}")
+            return None
+    
+    def _fetch_token(self) -> Dict:
+        """Request a new token from the OAuth endpoint (runs on token cache threads)"""
         url = f"{self.base_url}/oauth/token/"
         
         data = {
@@ -34,23 +94,41 @@ class TikTokManager:
             "Content-Type": "application/x-www-form-urlencoded"
         }
         
+        # Runs under the token file lock: never wait on a loop that is gone or
+        # for longer than TOKEN_FETCH_TIMEOUT, or every process sharing the
+        # token file waits too
+        loop = self._loop
+        if loop is None or loop.is_closed() or not loop.is_running():
+            raise RuntimeError("Event loop is not running, cannot fetch a token")
+        future = asyncio.run_coroutine_threadsafe(
+            self._post(url, data=data, headers=headers), loop)
         try:
-            response = requests.post(url, data=data, headers=headers)
-            response.raise_for_status()
-            
-            token_data = response.json()
-            self.access_token = token_data.get("access_token")
-            return self.access_token
+            response = future.result(timeout=TOKEN_FETCH_TIMEOUT)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise RuntimeError(f"Token request timed out after {TOKEN_FETCH_TIMEOUT:.0f}s")
+        response.raise_for_status()
+        return response.json()
+    
+    async def _post(self, url: str, **kwargs):
+        """POST to an API endpoint within its rate limit, waiting out 429s
+        (Retry-After when given, jittered exponential backoff otherwise)"""
+        endpoint = url[len(self.base_url):] if url.startswith(self.base_url) else url
+        for attempt in range(self.max_retries + 1):
+            await self.rate_limiter.acquire(endpoint, self.client_key)
+            response = await self.http.post(url, **kwargs)
+            if response.status_code != 429 or attempt == self.max_retries:
+                return response
             
-        except requests.exceptions.RequestException as e:
-            print(f"Error getting access token: {e}")
-            return None
+            # The next acquire() on this bucket waits out the delay
+            delay = retry_delay(response, attempt)
+            self.rate_limiter.throttled(endpoint, self.client_key, delay)
+            print(f"Rate limited on {endpoint}, retrying in {delay:.1f}s")
     
-    def upload_video(self, video_path: str, caption: str, hashtags: List[str]) -> Dict:
+    async def upload_video(self, video_path: str, caption: str, hashtags: List[str]) -> Dict:
         """Upload video to TikTok using the correct API endpoints"""
-        if not self.access_token:
-            if not self.get_access_token():
-                return {"error": "Failed to get access token"}
+        if not await self.get_access_token():
+            return {"error": "Failed to get access token"}
         
         try:
             # Step 1: Initialize video upload
@@ -60,34 +138,47 @@ class TikTokManager:
                 "Content-Type": "application/json; charset=UTF-8"
             }
             
-            # Get video file size (mock for now)
-            import os
-            try:
+            # An interrupted upload of this same file picks up where it stopped
+            record = self.upload_progress.find(video_path)
+            if record is not None:
+                print(f"Resuming upload {record['publish_id']}: "
+                      f"{len(record['acknowledged'])}/{record['total_chunk_count']} chunks already sent")
+            else:
                 video_size = os.path.getsize(video_path)
-            except:
-                video_size = 10000000  # Default 10MB mock
-            
-            init_data = {
-                "source_info": {
-                    "source": "FILE_UPLOAD",
-                    "video_size": video_size,
-                    "chunk_size": min(video_size, 10000000),  # 10MB chunks
-                    "total_chunk_count": 1
+                chunk_size, total_chunk_count = plan_chunks(video_size, self.chunk_size)
+                
+                init_data = {
+                    "source_info": {
+                        "source": "FILE_UPLOAD",
+                        "video_size": video_size,
+                        "chunk_size": chunk_size,
+                        "total_chunk_count": total_chunk_count
+                    }
                 }
-            }
-            
-            init_response = requests.post(init_url, json=init_data, headers=headers)
-            init_response.raise_for_status()
-            init_result = init_response.json()
+                
+                init_response = await self._post(init_url, json=init_data, headers=headers)
+                init_response.raise_for_status()
+                init_result = init_response.json()
+                
+                if "error" in init_result:
+                    return {"error": init_result["error"]["message"]}
+                
+                record = self.upload_progress.create(
+                    video_path, init_result["data"]["publish_id"],
+                    init_result["data"]["upload_url"], chunk_size, total_chunk_count)
             
-            if "error" in init_result:
-                return {"error": init_result["error"]["message"]}
+            publish_id = record["publish_id"]
             
-            publish_id = init_result["data"]["publish_id"]
-            upload_url = init_result["data"]["upload_url"]
-            
-            # Step 2: Upload video file (mock - just simulate)
-            print(f"Step 2: Uploading video to {upload_url}")
+            # Step 2: Upload the missing chunks in parallel
+            print(f"Step 2: Uploading {record['total_chunk_count']} chunks for {publish_id}")
+            try:
+                await self.uploader.upload(video_path, record, self.upload_progress)
+            except requests.exceptions.RequestException as e:
+                response = getattr(e, "response", None)
+                if response is not None and 400 <= response.status_code < 500:
+                    # Rejected, not interrupted: the next attempt starts over
+                    self.upload_progress.remove(record)
+                return {"error": f"Upload failed: {str(e)}", "publish_id": publish_id}
             
             # Step 3: Publish to inbox
             publish_url = f"{self.base_url}/post/publish/inbox/video/"
@@ -101,13 +192,14 @@ class TikTokManager:
                 }
             }
             
-            publish_response = requests.post(publish_url, json=publish_data, headers=headers)
+            publish_response = await self._post(publish_url, json=publish_data, headers=headers)
             publish_response.raise_for_status()
             publish_result = publish_response.json()
             
             if "error" in publish_result:
                 return {"error": publish_result["error"]["message"]}
             
+            self.upload_progress.remove(record)
             return {
                 "success": True,
                 "video_id": publish_id,
@@ -117,12 +209,28 @@ class TikTokManager:
             
         except requests.exceptions.RequestException as e:
             return {"error": f"Upload failed: {str(e)}"}
+        except OSError as e:
+            return {"error": f"Cannot read video: {str(e)}"}
     
-    def get_video_info(self, video_id: str) -> Dict:
-        """Get information about a uploaded video"""
-        if not self.access_token:
+    async def get_video_info(self, video_id: str) -> Dict:
+        """Get information about a uploaded video
+        
+        Calls made within a few milliseconds of each other are answered by
+        one /video/query/ request for up to 20 videos, and answers are
+        cached briefly, so checking many posts at once (e.g. with
+        asyncio.gather) costs a fraction of the requests.
+        """
+        if not await self.get_access_token():
             return {"error": "No access token"}
         
+        try:
+            return await self.video_info.get(video_id)
+        except (requests.exceptions.RequestException, RuntimeError) as e:
+            return {"error": f"Failed to get video info: {str(e)}"}
+    
+    async def _query_videos(self, video_ids: List[str]) -> Dict[str, Dict]:
+        """One /video/query/ request for several videos, split into the
+        response each video would have had on its own"""
         url = f"{self.base_url}/video/query/"
         headers = {
             "Authorization": f"Bearer {self.access_token}",
@@ -131,21 +239,30 @@ class TikTokManager:
         
         data = {
             "filters": {
-                "video_ids": [video_id]
+                "video_ids": video_ids
             }
         }
         
-        try:
-            response = requests.post(url, json=data, headers=headers)
-            response.raise_for_status()
-            return response.json()
-            
-        except requests.exceptions.RequestException as e:
-            return {"error": f"Failed to get video info: {str(e)}"}
+        response = await self._post(url, json=data, headers=headers)
+        response.raise_for_status()
+        result = response.json()
+        
+        error = result.get("error") or {}
+        if error.get("code", "ok") != "ok":
+            # Not cached: every caller in the batch gets the error
+            raise RuntimeError(error.get("message") or error["code"])
+        
+        body = result.get("data") or {}
+        videos = {str(video.get("id")): video for video in body.get("videos", [])}
+        return {
+            video_id: {**result, "data": {**body, "videos": [videos[str(video_id)]]
+                                          if str(video_id) in videos else []}}
+            for video_id in video_ids
+        }
     
-    def get_user_videos(self, count: int = 20) -> List[Dict]:
+    async def get_user_videos(self, count: int = 20) -> List[Dict]:
         """Get user's uploaded videos"""
-        if not self.access_token:
+        if not await self.get_access_token():
             return []
         
         # Note: This endpoint might require additional permissions
@@ -163,7 +280,7 @@ class TikTokManager:
         }
         
         try:
-            response = requests.post(url, json=data, headers=headers)
+            response = await self._post(url, json=data, headers=headers)
             response.raise_for_status()
             result = response.json()
             
@@ -178,9 +295,9 @@ class TikTokManager:
             print(f"Error getting user videos: {e}")
             return []
     
-    def delete_video(self, video_id: str) -> Dict:
+    async def delete_video(self, video_id: str) -> Dict:
         """Delete a video"""
-        if not self.access_token:
+        if not await self.get_access_token():
             return {"error": "No access token"}
         
         url = f"{self.base_url}/video/delete/"
@@ -194,14 +311,15 @@ class TikTokManager:
         }
         
         try:
-            response = requests.post(url, json=data, headers=headers)
+            response = await self._post(url, json=data, headers=headers)
             response.raise_for_status()
+            self.video_info.invalidate(video_id)
             return response.json()
             
         except requests.exceptions.RequestException as e:
             return {"error": f"Failed to delete video: {str(e)}"}
     
-    def search_trending_hashtags(self, category: str = "drone") -> List[str]:
+    async def search_trending_hashtags(self, category: str = "drone") -> List[str]:
         """Search for trending hashtags"""
         # Note: TikTok API doesn't directly provide trending hashtags
         # This is a placeholder for trending drone-related hashtags
@@ -224,6 +342,109 @@ class TikTokManager:
         ]
         
         return drone_hashtags[:10]
+    
+    def transport_stats(self) -> Dict:
+        """Connection reuse across all API and upload requests so far"""
+        return self.http.stats()
+    
+    def rate_limit_stats(self) -> Dict:
+        """Time spent waiting for rate limits, and 429s received"""
+        return self.rate_limiter.stats()
+    
+    def video_info_stats(self) -> Dict:
+        """get_video_info calls, the batched queries sent for them and cache hits"""
+        return self.video_info.stats()
+    
+    async def close(self):
+        """Close pooled connections and stop the scheduled token refresh"""
+        self.tokens.close()
+        await self.http.aclose()
+
+class TikTokManager:
+    """Blocking TikTok API manager over AsyncTikTokManager
+    
+    The async manager runs on a private event loop thread; each call submits
+    its coroutine there and waits for the result. Interrupting a call (e.g.
+    Ctrl-C during an upload) cancels its coroutine, which leaves the upload
+    resumable.
+    """
+    
+    def __init__(self, client_key: str, client_secret: str,
+                 upload_state_dir: str = "upload_state", upload_workers: int = 4,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE, http2: bool = False,
+                 token_cache_path: str = "token_cache.json", max_concurrency: int = 16,
+                 rate_limiter: Optional[RateLimiter] = None, max_retries: int = 3,
+                 video_info_ttl: float = 30.0):
+        """Initialize TikTok API manager"""
+        self.client = AsyncTikTokManager(client_key, client_secret, upload_state_dir,
+                                         upload_workers, chunk_size, http2,
+                                         token_cache_path, max_concurrency,
+                                         rate_limiter, max_retries, video_info_ttl)
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="tiktok-loop",
+                                        daemon=True)
+        self._thread.start()
+    
+    def _run(self, coroutine):
+        future = asyncio.run_coroutine_threadsafe(coroutine, self._loop)
+        try:
+            return future.result()
+        except BaseException:
+            future.cancel()
+            raise
+    
+    @property
+    def access_token(self) -> Optional[str]:
+        return self.client.access_token
+    
+    def get_access_token(self) -> Optional[str]:
+        """Get OAuth access token"""
+        return self._run(self.client.get_access_token())
+    
+    def upload_video(self, video_path: str, caption: str, hashtags: List[str]) -> Dict:
+        """Upload video to TikTok"""
+        return self._run(self.client.upload_video(video_path, caption, hashtags))
+    
+    def get_video_info(self, video_id: str) -> Dict:
+        """Get information about a uploaded video"""
+        return self._run(self.client.get_video_info(video_id))
+    
+    def get_user_videos(self, count: int = 20) -> List[Dict]:
+        """Get user's uploaded videos"""
+        return self._run(self.client.get_user_videos(count))
+    
+    def delete_video(self, video_id: str) -> Dict:
+        """Delete a video"""
+        return self._run(self.client.delete_video(video_id))
+    
+    def search_trending_hashtags(self, category: str = "drone") -> List[str]:
+        """Search for trending hashtags"""
+        return self._run(self.client.search_trending_hashtags(category))
+    
+    def transport_stats(self) -> Dict:
+        """Connection reuse across all API and upload requests so far"""
+        return self.client.transport_stats()
+    
+    def rate_limit_stats(self) -> Dict:
+        """Time spent waiting for rate limits, and 429s received"""
+        return self.client.rate_limit_stats()
+    
+    def video_info_stats(self) -> Dict:
+        """get_video_info calls, the batched queries sent for them and cache hits"""
+        return self.client.video_info_stats()
+    
+    def close(self):
+        """Close the async manager, then stop and close its event loop"""
+        if self._loop.is_closed():
+            return
+        # No token refresh may start once the loop is going away
+        self.client.tokens.close()
+        try:
+            self._run(self.client.close())
+        finally:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
 
 class MockTikTokManager:
     """Mock TikTok manager for testing without API credentials"""
@@ -305,6 +526,57 @@ class MockTikTokManager:
             "#mavic",
             "#fpv"
         ]
+    
+    def transport_stats(self) -> Dict:
+        """Mock transport statistics"""
+        return {"requests": 0, "connections": 0, "reused": 0, "reuse_rate": 0.0,
+                "http2": False, "mock": True}
+    
+    def rate_limit_stats(self) -> Dict:
+        """Mock rate limit statistics"""
+        return {"requests": 0, "wait_seconds": 0.0, "max_wait": 0.0, "throttled": 0,
+                "endpoints": {}, "mock": True}
+    
+    def video_info_stats(self) -> Dict:
+        """Mock video info statistics"""
+        return {"calls": 0, "batches": 0, "cache_hits": 0, "shared": 0, "cached": 0,
+                "mock": True}
+
+class MockAsyncTikTokManager:
+    """Mock async TikTok manager, backed by MockTikTokManager"""
+    
+    def __init__(self, client_key: str = "", client_secret: str = ""):
+        self.manager = MockTikTokManager(client_key, client_secret)
+    
+    async def get_access_token(self) -> str:
+        return self.manager.get_access_token()
+    
+    async def upload_video(self, video_path: str, caption: str, hashtags: List[str]) -> Dict:
+        return self.manager.upload_video(video_path, caption, hashtags)
+    
+    async def get_video_info(self, video_id: str) -> Dict:
+        return self.manager.get_video_info(video_id)
+    
+    async def get_user_videos(self, count: int = 20) -> List[Dict]:
+        return self.manager.get_user_videos(count)
+    
+    async def delete_video(self, video_id: str) -> Dict:
+        return self.manager.delete_video(video_id)
+    
+    async def search_trending_hashtags(self, category: str = "drone") -> List[str]:
+        return self.manager.search_trending_hashtags(category)
+    
+    def transport_stats(self) -> Dict:
+        return self.manager.transport_stats()
+    
+    def rate_limit_stats(self) -> Dict:
+        return self.manager.rate_limit_stats()
+    
+    def video_info_stats(self) -> Dict:
+        return self.manager.video_info_stats()
+    
+    async def close(self):
+        pass
 
 def create_tiktok_manager(use_mock: bool = True):
     """Create TikTok manager (mock or real)"""
@@ -315,4 +587,21 @@ def create_tiktok_manager(use_mock: bool = True):
     client_key = os.getenv("TIKTOK_CLIENT_KEY", "")
     client_secret = os.getenv("TIKTOK_CLIENT_SECRET", "")
     
-    return TikTokManager(client_key, client_secret)
\ No newline at end of file
+    return TikTokManager(client_key, client_secret,
+                         upload_state_dir=os.getenv("UPLOAD_STATE_DIR", "upload_state"),
+                         http2=os.getenv("TIKTOK_HTTP2", "").lower() in ("1", "true"),
+                         token_cache_path=os.getenv("TIKTOK_TOKEN_CACHE", "token_cache.json"))
+
+def create_async_tiktok_manager(use_mock: bool = True, max_concurrency: int = 16):
+    """Create async TikTok manager (mock or real)"""
+    if use_mock:
+        return MockAsyncTikTokManager()
+    
+    client_key = os.getenv("TIKTOK_CLIENT_KEY", "")
+    client_secret = os.getenv("TIKTOK_CLIENT_SECRET", "")
+    
+    return AsyncTikTokManager(client_key, client_secret,
+                              upload_state_dir=os.getenv("UPLOAD_STATE_DIR", "upload_state"),
+                              http2=os.getenv("TIKTOK_HTTP2", "").lower() in ("1", "true"),
+                              token_cache_path=os.getenv("TIKTOK_TOKEN_CACHE", "token_cache.json"),
+                              max_concurrency=max_concurrency)
\ No newline at end of file
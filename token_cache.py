@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+OAuth Token Cache Shared Across Processes
+Tokens persisted on disk under a file lock and refreshed before they expire
+"""
+
+import os
+import json
+import time
+import tempfile
+import threading
+from typing import Callable, Dict, Optional
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+# Tokens are refreshed this many seconds before expires_in runs out
+REFRESH_MARGIN = 300
+
+# ...but never earlier than this fraction of a short-lived token's lifetime
+MAX_MARGIN_FRACTION = 0.5
+
+# Assumed lifetime when the token response carries no expires_in
+DEFAULT_EXPIRES_IN = 3600
+
+class _FileLock:
+    """Exclusive advisory lock on a sidecar file, held across processes"""
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+    
+    def __enter__(self):
+        self._file = open(self.path, 'a+')
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        else:
+            self._file.seek(0)
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_LOCK, 1)
+        return self
+    
+    def __exit__(self, *exc):
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            else:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self._file.close()
+
+class TokenCache:
+    """Access token for one client and scope, shared by every process
+    
+    The token lives in a JSON file (mode 0600) next to a lock file. get()
+    answers from memory while the token is fresh, starts a background
+    refresh once it is within refresh_margin of expiring (half its lifetime
+    for tokens shorter than that), and only blocks when there is no usable
+    token at all. A timer refreshes ahead of expiry too, for tokens read
+    from the file as well as fetched ones. Refreshes are single-flight: one
+    per process at a time, and under the file lock a process first re-reads
+    the file, adopting a token another process has just fetched instead of
+    requesting its own. fetch() returns the token endpoint's JSON
+    (access_token, expires_in).
+    """
+    
+    def __init__(self, cache_path: str, key: str, fetch: Callable[[], Dict],
+                 refresh_margin: float = REFRESH_MARGIN):
+        self.cache_path = cache_path
+        self.key = key
+        self.fetch = fetch
+        self.refresh_margin = refresh_margin
+        self.fetches = 0
+        self._token = None
+        self._refresh_lock = threading.Lock()
+        self._background = None
+        self._timer = None
+        folder = os.path.dirname(os.path.abspath(cache_path))
+        os.makedirs(folder, exist_ok=True)
+    
+    def get(self) -> str:
+        """A valid access token, fetching one only when none is usable"""
+        token = self._token
+        if token is None:
+            token = self._adopt()
+        
+        if token is None or token["expires_at"] <= time.time():
+            token = self.refresh()
+        elif self._stale(token):
+            self._refresh_in_background()
+        return token["access_token"]
+    
+    def _adopt(self) -> Optional[Dict]:
+        """Take up a token from the file, scheduling its refresh as if fetched"""
+        with self._refresh_lock:
+            if self._token is None:
+                token = self._read()
+                if token is None:
+                    return None
+                self._token = token
+                self._schedule_refresh(token)
+            return self._token
+    
+    def refresh(self, force: bool = False) -> Dict:
+        """Fetch a new token (single-flight) unless a fresh one appeared meanwhile"""
+        with self._refresh_lock:
+            with _FileLock(self.cache_path + ".lock"):
+                token = self._read()
+                if force or token is None or self._stale(token):
+                    token_data = self.fetch()
+                    self.fetches += 1
+                    if not token_data.get("access_token"):
+                        raise RuntimeError(f"Token response has no access_token: {token_data}")
+                    now = time.time()
+                    token = {
+                        "access_token": token_data["access_token"],
+                        "expires_at": now + float(token_data.get("expires_in")
+                                                  or DEFAULT_EXPIRES_IN),
+                        "obtained_at": now
+                    }
+                    self._write(token)
+            self._token = token
+        
+        self._schedule_refresh(token)
+        return token
+    
+    def _margin(self, token: Dict) -> float:
+        """refresh_margin, capped to a fraction of the token's lifetime so a
+        token shorter than the margin is not refreshed on every get()"""
+        lifetime = token["expires_at"] - token.get("obtained_at", token["expires_at"])
+        if lifetime <= 0:
+            return self.refresh_margin
+        return min(self.refresh_margin, lifetime * MAX_MARGIN_FRACTION)
+    
+    def _stale(self, token: Dict) -> bool:
+        return token["expires_at"] - self._margin(token) <= time.time()
+    
+    def _refresh_in_background(self):
+        """Start a refresh thread unless one is already running"""
+        with self._refresh_lock:
+            if self._background is not None and self._background.is_alive():
+                return
+            self._background = threading.Thread(target=self._refresh_quietly,
+                                                 name="token-refresh", daemon=True)
+            self._background.start()
+    
+    def _refresh_quietly(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            # The current token is still valid; the next get() tries again
+            print(f"Background token refresh failed: {e}")
+    
+    def _schedule_refresh(self, token: Dict):
+        """Refresh ahead of expiry even if nothing calls get() in the meantime"""
+        if self._timer is not None:
+            self._timer.cancel()
+        delay = max(token["expires_at"] - self._margin(token) - time.time(), 0.0)
+        self._timer = threading.Timer(delay, self._refresh_in_background)
+        self._timer.daemon = True
+        self._timer.start()
+    
+    def _read(self) -> Optional[Dict]:
+        try:
+            with open(self.cache_path, 'r') as f:
+                token = json.load(f).get(self.key)
+        except (OSError, ValueError):
+            return None
+        if not token or token.get("expires_at", 0) <= time.time():
+            return None
+        return token
+    
+    def _write(self, token: Dict):
+        """Replace this key's entry, keeping other clients' tokens (file lock held)"""
+        try:
+            with open(self.cache_path, 'r') as f:
+                tokens = json.load(f)
+        except (OSError, ValueError):
+            tokens = {}
+        tokens[self.key] = token
+        
+        fd, temp_path = tempfile.mkstemp(prefix=".tokens-",
+                                         dir=os.path.dirname(os.path.abspath(self.cache_path)))
+        with os.fdopen(fd, 'w') as f:
+            json.dump(tokens, f)
+        os.replace(temp_path, self.cache_path)
+    
+    def close(self):
+        """Stop the scheduled refresh"""
+        if self._timer is not None:
+            self._timer.cancel()
@@ -5,26 +5,485 @@ Handles video editing, enhancement, and formatting for TikTok
 """
 
 import os
-from typing import List, Dict, Optional, Tuple
+import re
+import json
+import bisect
+from typing import Callable, Iterable, List, Dict, Optional, Tuple
 import subprocess
-from datetime import datetime
 import tempfile
+import threading
+import queue
+import shutil
+import functools
+from collections import OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+
+from mp4_info import is_mp4, read_keyframes, read_mp4_info
+from render_cache import RenderCache
+from captions import CaptionRenderer, caption_opacity, normalize_captions
+from audio_analysis import AudioAnalysisCache, plan_beat_cuts
+from audio_assets import AudioAssetStore
 
 try:
     import cv2
     import numpy as np
-    from PIL import Image, ImageEnhance, ImageFilter
     VIDEO_PROCESSING_AVAILABLE = True
 except ImportError:
     VIDEO_PROCESSING_AVAILABLE = False
 
+# ffmpeg's exit summary (-v verbose) of how many video frames it decoded
+DECODED_FRAMES = re.compile(r'Input stream #\d+:\d+ \(video\): \d+ packets read '
+                            r'\(\d+ bytes\); (\d+) frames decoded')
+
+class ColorGrade:
+    """Color adjustments compiled once into a per-channel LUT and a 3x3 color matrix
+    
+    Brightness, contrast, gamma and channel gains are per-value curves, so they
+    fold into a single cv2.LUT lookup; saturation mixes channels and becomes a
+    cv2.transform matrix. Frames stay uint8 throughout.
+    """
+    
+    # ITU-R 601 luma weights in OpenCV's BGR channel order (same as PIL's "L")
+    LUMA_WEIGHTS = (0.114, 0.587, 0.299)
+    
+    def __init__(self, brightness: float = 1.0, contrast: float = 1.0,
+                 saturation: float = 1.0, gamma: float = 1.0,
+                 channel_gains: Tuple[float, float, float] = (1.0, 1.0, 1.0),
+                 contrast_pivot: float = 128.0):
+        levels = np.arange(256, dtype=np.float64)
+        
+        # Same order and clipping as the PIL ImageEnhance chain
+        curve = np.clip(levels * brightness, 0, 255)
+        curve = np.clip(contrast_pivot + contrast * (curve - contrast_pivot), 0, 255)
+        curve = 255.0 * (curve / 255.0) ** gamma
+        
+        channels = [np.clip(curve * gain, 0, 255) for gain in channel_gains]
+        self.lut = np.round(np.stack(channels, axis=-1)).astype(np.uint8).reshape(1, 256, 3)
+        self.is_identity_lut = bool(np.array_equal(self.lut[0, :, 0], levels) and
+                                    (self.lut == self.lut[:, :, :1]).all())
+        
+        if saturation != 1.0:
+            luma = np.tile(np.array(self.LUMA_WEIGHTS, dtype=np.float32), (3, 1))
+            self.matrix = saturation * np.eye(3, dtype=np.float32) + (1.0 - saturation) * luma
+        else:
+            self.matrix = None
+    
+    @classmethod
+    def mean_luma(cls, frame: "np.ndarray", brightness: float = 1.0) -> float:
+        """Mean luma of a frame after brightness, used as the contrast pivot"""
+        means = cv2.mean(frame)[:3]
+        return float(sum(w * min(m * brightness, 255.0)
+                         for w, m in zip(cls.LUMA_WEIGHTS, means)))
+    
+    def apply(self, frame: "np.ndarray", in_place: bool = False) -> "np.ndarray":
+        """Grade a uint8 BGR frame"""
+        dst = frame if in_place else None
+        if not self.is_identity_lut:
+            frame = cv2.LUT(frame, self.lut, dst=dst)
+            dst = frame
+        if self.matrix is not None:
+            frame = cv2.transform(frame, self.matrix, dst=dst)
+        return frame
+
+class MaskCache:
+    """LRU cache of per-resolution spatial masks shared by VideoProcessor effects
+    
+    Masks are keyed by (effect, width, height, params) and built on first use.
+    Fixed-point copies scale [0, 1] to uint16 [0, FIXED_POINT_ONE] so effects
+    can apply them with integer-saturating cv2 arithmetic.
+    """
+    
+    FIXED_POINT_ONE = 65535
+    
+    def __init__(self, max_entries: int = 16):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._masks = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, effect: str, width: int, height: int,
+            builder: Callable, params: Tuple = (),
+            fixed_point: bool = False) -> "np.ndarray":
+        """Return the cached mask, building it with builder(width, height, *params)"""
+        key = (effect, width, height, tuple(params), fixed_point)
+        
+        with self._lock:
+            mask = self._masks.get(key)
+            if mask is not None:
+                self._masks.move_to_end(key)
+                self.hits += 1
+                return mask
+            self.misses += 1
+        
+        if fixed_point:
+            mask = self.get(effect, width, height, builder, params)
+            mask = np.round(np.clip(mask, 0.0, 1.0) * self.FIXED_POINT_ONE).astype(np.uint16)
+        else:
+            mask = builder(width, height, *params)
+        mask.setflags(write=False)
+        
+        with self._lock:
+            self._masks[key] = mask
+            while len(self._masks) > self.max_entries:
+                self._masks.popitem(last=False)
+        
+        return mask
+    
+    def clear(self):
+        """Drop all masks and reset counters"""
+        with self._lock:
+            self._masks.clear()
+            self.hits = 0
+            self.misses = 0
+    
+    def stats(self) -> Dict:
+        """Hit/miss counters for checking the cache is doing its job"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._masks),
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+
+class FramePool:
+    """Reusable frame buffers keyed by shape and dtype
+    
+    Buffers from acquire() come back through release() once a frame has been
+    replaced by a stage or encoded, so a steady-state render loop allocates
+    nothing. release() ignores arrays the pool did not hand out. At most
+    max_free buffers per shape are kept, which should cover the frames a
+    render holds in flight. Renders run inside session(); when the last one
+    ends the pool lets go of every buffer, including any an error path
+    never released, so an idle processor holds no frame memory.
+    """
+    
+    def __init__(self, max_free: int = 64):
+        self.max_free = max_free
+        self.allocations = 0
+        self.reuses = 0
+        self._free = {}
+        self._free_ids = set()
+        self._owned = {}
+        self._sessions = 0
+        self._lock = threading.Lock()
+    
+    @contextmanager
+    def session(self):
+        """Scope of one render; sessions may overlap and nest"""
+        with self._lock:
+            self._sessions += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._sessions -= 1
+                if self._sessions == 0:
+                    self._free.clear()
+                    self._free_ids.clear()
+                    self._owned.clear()
+    
+    def acquire(self, shape: Tuple[int, ...], dtype: str = "uint8") -> "np.ndarray":
+        """Get a buffer of the given shape; contents are undefined"""
+        key = (tuple(shape), np.dtype(dtype).str)
+        
+        with self._lock:
+            free = self._free.get(key)
+            if free:
+                buffer = free.pop()
+                self._free_ids.discard(id(buffer))
+                self.reuses += 1
+                return buffer
+            self.allocations += 1
+        
+        buffer = np.empty(shape, dtype=dtype)
+        with self._lock:
+            self._owned[id(buffer)] = buffer
+        return buffer
+    
+    def release(self, frame: "np.ndarray"):
+        """Return a buffer to the pool"""
+        with self._lock:
+            if self._owned.get(id(frame)) is not frame or id(frame) in self._free_ids:
+                return
+            
+            free = self._free.setdefault((frame.shape, frame.dtype.str), [])
+            if len(free) < self.max_free:
+                free.append(frame)
+                self._free_ids.add(id(frame))
+            else:
+                del self._owned[id(frame)]
+    
+    def stats(self) -> Dict:
+        """Allocation counters; reuses should dominate once a render warms up"""
+        with self._lock:
+            return {
+                "allocations": self.allocations,
+                "reuses": self.reuses,
+                "free": len(self._free_ids),
+                "owned": len(self._owned)
+            }
+
+def _pooled(method: Callable) -> Callable:
+    """Run a VideoProcessor render method inside a frame pool session"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.frame_pool.session():
+            return method(self, *args, **kwargs)
+    return wrapper
+
+@functools.lru_cache(maxsize=None)
+def _passthrough_args() -> Tuple[str, ...]:
+    """ffmpeg flags that keep source frame timestamps: -fps_mode on 5.1 and
+    later, the older -vsync (deprecated there, but the only spelling 4.x knows)"""
+    try:
+        result = subprocess.run(['ffmpeg', '-hide_banner', '-h', 'long'],
+                                capture_output=True, text=True)
+        if '-fps_mode' in result.stdout:
+            return ('-fps_mode', 'passthrough')
+    except OSError:
+        pass
+    return ('-vsync', 'passthrough')
+
+class FramePipeline:
+    """Overlapped decode -> transform -> encode with bounded, ordered queues
+    
+    A decoder thread feeds N transform workers; the calling thread encodes,
+    reassembling frames in their original order. Bounded queues apply
+    backpressure so a slow encoder never lets decoded frames pile up.
+    OpenCV and NumPy release the GIL, so the workers run in parallel.
+    """
+    
+    _DONE = object()
+    
+    def __init__(self, workers: int = 1, queue_size: int = 8):
+        self.workers = max(1, workers)
+        self.queue_size = max(1, queue_size)
+    
+    def run(self, frames: Iterable, stages: List[Callable],
+            write: Callable, pool: Optional[FramePool] = None) -> int:
+        """Push every (t, frame) through stages and into write; returns frames written
+        
+        Stages are called as stage(frame, t), t being the frame's time in
+        seconds on the output timeline. When a stage returns a new frame, its
+        input goes back to pool.
+        """
+        if self.workers == 1:
+            frame_count = 0
+            for t, frame in frames:
+                frame = self._apply(stages, frame, t, pool)
+                write(frame)
+                frame_count += 1
+            return frame_count
+        
+        decoded = queue.Queue(self.queue_size)
+        transformed = queue.Queue(self.queue_size)
+        stop = threading.Event()
+        errors = []
+        
+        def put(target, item) -> bool:
+            while not stop.is_set():
+                try:
+                    target.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+        
+        def get(source):
+            while not stop.is_set():
+                try:
+                    return source.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+            return None
+        
+        def decode():
+            try:
+                for item in enumerate(frames):
+                    if not put(decoded, item):
+                        return
+            except Exception as e:
+                errors.append(e)
+                stop.set()
+            finally:
+                for _ in range(self.workers):
+                    put(decoded, self._DONE)
+        
+        def transform():
+            try:
+                while True:
+                    item = get(decoded)
+                    if item is None:
+                        return
+                    if item is self._DONE:
+                        put(transformed, self._DONE)
+                        return
+                    
+                    index, (t, frame) = item
+                    frame = self._apply(stages, frame, t, pool)
+                    if not put(transformed, (index, frame)):
+                        return
+            except Exception as e:
+                errors.append(e)
+                stop.set()
+        
+        threads = [threading.Thread(target=decode, name="frame-decoder", daemon=True)]
+        threads += [threading.Thread(target=transform, name=f"frame-worker-{i}", daemon=True)
+                    for i in range(self.workers)]
+        for thread in threads:
+            thread.start()
+        
+        # Encode on the calling thread, restoring decode order
+        pending = {}
+        next_index = 0
+        finished = 0
+        try:
+            while finished < self.workers:
+                item = get(transformed)
+                if item is None:
+                    break
+                if item is self._DONE:
+                    finished += 1
+                    continue
+                
+                index, frame = item
+                pending[index] = frame
+                while next_index in pending:
+                    write(pending.pop(next_index))
+                    next_index += 1
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
+        
+        if errors:
+            raise errors[0]
+        return next_index
+    
+    @staticmethod
+    def _apply(stages: List[Callable], frame, t: float, pool: Optional[FramePool]):
+        for stage in stages:
+            result = stage(frame, t)
+            if pool is not None and not np.may_share_memory(result, frame):
+                pool.release(frame)
+            frame = result
+        return frame
+
+class OpenCVWriter:
+    """cv2.VideoWriter (mp4v) encoder backend, used when ffmpeg is unavailable"""
+    
+    def __init__(self, output_path: str, fps: float, size: Tuple[int, int]):
+        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+        self.writer = cv2.VideoWriter(output_path, fourcc, fps, size)
+        if not self.writer.isOpened():
+            raise IOError(f"Cannot open video writer: {output_path}")
+    
+    def write(self, frame: "np.ndarray"):
+        self.writer.write(frame)
+    
+    def release(self):
+        self.writer.release()
+
+class FFmpegWriter:
+    """H.264 encoder backend streaming raw BGR frames into ffmpeg over stdin
+    
+    Contiguous frames are written straight from their buffers; only strided
+    views (e.g. crops) are compacted first.
+    """
+    
+    def __init__(self, output_path: str, fps: float, size: Tuple[int, int],
+                 preset: str = "veryfast", crf: int = 23):
+        width, height = size
+        cmd = [
+            'ffmpeg', '-y',
+            '-loglevel', 'error',
+            '-f', 'rawvideo',
+            '-pix_fmt', 'bgr24',
+            '-s', f'{width}x{height}',
+            '-r', f'{fps}',
+            '-i', '-',
+            '-an',
+            '-c:v', 'libx264',
+            '-preset', preset,
+            '-crf', str(crf),
+            '-pix_fmt', 'yuv420p',
+            '-movflags', '+faststart'
+        ]
+        if width % 2 or height % 2:
+            # yuv420p needs even dimensions
+            cmd += ['-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2']
+        cmd.append(output_path)
+        
+        self._stderr = tempfile.TemporaryFile()
+        self.process = subprocess.Popen(cmd, stdin=subprocess.PIPE,
+                                        stdout=subprocess.DEVNULL,
+                                        stderr=self._stderr)
+    
+    def write(self, frame: "np.ndarray"):
+        if not frame.flags['C_CONTIGUOUS']:
+            frame = np.ascontiguousarray(frame)
+        try:
+            self.process.stdin.write(memoryview(frame).cast('B'))
+        except BrokenPipeError:
+            self.release()
+    
+    def release(self):
+        if self.process.stdin and not self.process.stdin.closed:
+            try:
+                self.process.stdin.close()
+            except BrokenPipeError:
+                pass
+        returncode = self.process.wait()
+        if self._stderr.closed:
+            return
+        self._stderr.seek(0)
+        error = self._stderr.read().decode(errors='replace')
+        self._stderr.close()
+        if returncode != 0:
+            raise RuntimeError(f"FFmpeg encode failed: {error}")
+
 class VideoProcessor:
     """Video processing and editing for drone content"""
     
-    def __init__(self):
+    def __init__(self, workers: Optional[int] = None, queue_size: int = 8,
+                 encoder: str = "auto", preset: str = "veryfast", crf: int = 23,
+                 cache_dir: Optional[str] = None,
+                 cache_max_bytes: int = 10 * 1024 ** 3,
+                 audio_cache_dir: Optional[str] = None):
         if not VIDEO_PROCESSING_AVAILABLE:
             raise ImportError("Video processing libraries not available")
         self.temp_dir = tempfile.mkdtemp()
+        self.mask_cache = MaskCache()
+        self.caption_renderer = CaptionRenderer()
+        # Leave a core each for the decoder and encoder threads
+        if workers is None:
+            workers = max(1, (os.cpu_count() or 1) - 2)
+        self.pipeline = FramePipeline(workers, queue_size)
+        # Enough free buffers per shape for both queues, the workers, the
+        # decoder and the encoder
+        self.frame_pool = FramePool(max_free=2 * self.pipeline.queue_size
+                                    + self.pipeline.workers + 2)
+        
+        # Encoder backend: "ffmpeg" (libx264), "opencv" (mp4v) or "auto"
+        if encoder == "auto":
+            encoder = "ffmpeg" if shutil.which("ffmpeg") else "opencv"
+        if encoder not in ("ffmpeg", "opencv"):
+            raise ValueError(f"Unknown encoder: {encoder}")
+        self.encoder = encoder
+        self.preset = preset
+        self.crf = crf
+        
+        # Finished renders keyed by source content + operations (None disables)
+        self.render_cache = RenderCache(cache_dir, cache_max_bytes) if cache_dir else None
+        
+        # Per-track music analysis, persistent when audio_cache_dir is given
+        self.audio_cache_dir = audio_cache_dir or os.path.join(self.temp_dir, "audio")
+        self.audio_analysis = AudioAnalysisCache(os.path.join(self.audio_cache_dir, "analysis"))
+        self.audio_assets = AudioAssetStore(os.path.join(self.audio_cache_dir, "assets"))
         print(f"Using temp directory: {self.temp_dir}")
     
     def __del__(self):
@@ -36,75 +495,715 @@ class VideoProcessor:
             pass
     
     def resize_video(self, input_path: str, output_path: str, 
-                    width: int = 1080, height: int = 1920) -> bool:
-        """Resize video to TikTok vertical format (9:16)"""
+                    width: int = 1080, height: int = 1920,
+                    auto_reframe: bool = False) -> bool:
+        """Resize video to TikTok vertical format (9:16)
+        
+        auto_reframe pans the crop to follow the subject instead of
+        cropping the center.
+        """
         if not VIDEO_PROCESSING_AVAILABLE:
             return False
             
         try:
-            cap = cv2.VideoCapture(input_path)
+            self._render(input_path, output_path,
+                         [{"op": "resize", "width": width, "height": height,
+                           "mode": "auto" if auto_reframe else "center"}])
+            
+            print(f"Video resized successfully: {output_path}")
+            return True
+            
+        except Exception as e:
+            print(f"Error resizing video: {e}")
+            return False
+    
+    def process_video(self, input_path: str, output_path: str, 
+                     operations: List[Dict]) -> bool:
+        """Apply a chain of operations in a single decode/encode pass
+        
+        Operations run in the given order, e.g.
+        [{"op": "resize", "width": 1080, "height": 1920},
+         {"op": "enhance", "brightness": 1.2},
+         {"op": "overlay", "text": "Drone life", "position": "bottom"}]
+        Supported ops: resize, enhance, cinematic, overlay, stabilize (place it
+        before resize), trim. overlay also
+        takes a timed track: {"op": "overlay", "captions": [...]} (see add_captions).
+        """
+        try:
+            frame_count = self._render(input_path, output_path, operations)
+            
+            print(f"Video processed successfully ({frame_count} frames): {output_path}")
+            return True
+            
+        except Exception as e:
+            print(f"Error processing video: {e}")
+            return False
+    
+    # Shortest segment worth a process of its own
+    MIN_SEGMENT_SECONDS = 2.0
+    
+    def process_video_parallel(self, input_path: str, output_path: str,
+                              operations: List[Dict],
+                              workers: Optional[int] = None) -> bool:
+        """Render a long clip as segments across a process pool, then concat losslessly
+        
+        Segments split the (trimmed) clip at even time boundaries, snapped to
+        keyframes when they can be read, and each one runs the full
+        operation chain in its own process. Falls back to
+        process_video when only one worker is useful or ffmpeg is missing.
+        """
+        workers = workers or os.cpu_count() or 1
+        if workers <= 1 or not shutil.which("ffmpeg"):
+            return self.process_video(input_path, output_path, operations)
+        
+        try:
+            frame_count = self._cached(
+                input_path, output_path, operations,
+                lambda path: self._render_parallel(input_path, path, operations, workers))
+            
+            print(f"Video processed successfully ({frame_count} frames): {output_path}")
+            return True
+            
+        except Exception as e:
+            print(f"Error processing video in parallel: {e}")
+            return False
+    
+    def process_variants(self, input_path: str,
+                        variants: List[Tuple[str, List[Dict]]]) -> bool:
+        """Render several (output_path, operations) variants from a single decode
+        
+        Each decoded frame fans out to every variant's own stage chain and
+        encoder, which run concurrently, so K variants pay for decoding once.
+        Variants already in the render cache are copied out instead.
+        """
+        try:
+            pending = []
+            reserved = []
+            for output_path, operations in variants:
+                if self.render_cache is None:
+                    pending.append((output_path, operations, output_path))
+                    continue
+                
+                suffix = os.path.splitext(output_path)[1] or ".mp4"
+                key = self._cache_key(input_path, suffix, operations)
+                entry = self.render_cache.lookup(key, suffix)
+                if entry is not None:
+                    print(f"Render cache hit: {entry['path']}")
+                    self.render_cache.export(entry["path"], output_path)
+                    continue
+                
+                temp_path = self.render_cache.reserve(key, suffix)
+                reserved.append((key, suffix, temp_path))
+                pending.append((output_path, operations, temp_path))
+            
+            try:
+                frame_counts = self._render_variants(
+                    input_path, [(operations, target) for _, operations, target in pending])
+            except Exception:
+                for _, _, temp_path in reserved:
+                    self.render_cache.discard(temp_path)
+                raise
+            
+            if self.render_cache is not None:
+                for (key, suffix, temp_path), (output_path, operations, _), frame_count in zip(
+                        reserved, pending, frame_counts):
+                    entry = self.render_cache.publish(key, temp_path, {
+                        "frame_count": frame_count,
+                        "source": os.path.abspath(input_path),
+                        "operations": operations
+                    }, suffix)
+                    self.render_cache.export(entry["path"], output_path)
+            
+            print(f"Rendered {len(pending)} of {len(variants)} variants from one decode")
+            return True
+            
+        except Exception as e:
+            print(f"Error processing variants: {e}")
+            return False
+    
+    def render_to_cache(self, input_path: str, operations: List[Dict],
+                       workers: Optional[int] = None) -> Optional[str]:
+        """Path of the cached render for these operations, rendering it on a miss"""
+        if self.render_cache is None:
+            print("Render cache is not configured")
+            return None
+        
+        workers = workers if workers is not None else 1
+        try:
+            if workers > 1 and shutil.which("ffmpeg"):
+                render = lambda path: self._render_parallel(input_path, path, operations, workers)
+            else:
+                render = lambda path: self._render_frames(input_path, path, operations)
+            
+            entry = self._cached_entry(input_path, ".mp4", operations, render)
+            return entry["path"]
+            
+        except Exception as e:
+            print(f"Error rendering to cache: {e}")
+            return None
+    
+    def _cached(self, input_path: str, output_path: str, operations: List[Dict],
+               render: Callable, frame_range: Optional[Tuple[int, int]] = None) -> int:
+        """Serve a render from the cache, or run render(path) and publish it;
+        returns frames written"""
+        if self.render_cache is None:
+            return render(output_path)
+        
+        suffix = os.path.splitext(output_path)[1] or ".mp4"
+        entry = self._cached_entry(input_path, suffix, operations, render, frame_range)
+        self.render_cache.export(entry["path"], output_path)
+        return entry["frame_count"]
+    
+    def _cached_entry(self, input_path: str, suffix: str, operations: List[Dict],
+                     render: Callable,
+                     frame_range: Optional[Tuple[int, int]] = None) -> Dict:
+        key = self._cache_key(input_path, suffix, operations, frame_range)
+        
+        entry = self.render_cache.lookup(key, suffix)
+        if entry is not None:
+            print(f"Render cache hit: {entry['path']}")
+            return entry
+        
+        temp_path = self.render_cache.reserve(key, suffix)
+        try:
+            frame_count = render(temp_path)
+        except Exception:
+            self.render_cache.discard(temp_path)
+            raise
+        
+        return self.render_cache.publish(key, temp_path, {
+            "frame_count": frame_count,
+            "source": os.path.abspath(input_path),
+            "operations": operations
+        }, suffix)
+    
+    def _cache_key(self, input_path: str, suffix: str, operations: List[Dict],
+                  frame_range: Optional[Tuple[int, int]] = None) -> str:
+        return self.render_cache.key(input_path, {
+            "operations": operations,
+            "frame_range": frame_range,
+            "encoder": self.encoder,
+            "preset": self.preset,
+            "crf": self.crf,
+            "suffix": suffix
+        })
+    
+    def _render_parallel(self, input_path: str, output_path: str,
+                        operations: List[Dict], workers: int) -> int:
+        """Segment, render across processes and concat; returns frames written"""
+        cap = cv2.VideoCapture(input_path)
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        cap.release()
+        if total_frames <= 0:
+            return self._render_frames(input_path, output_path, operations)
+        
+        start_frame, end_frame = self._trim_range(operations, fps)
+        end_frame = min(end_frame or total_frames, total_frames)
+        min_frames = max(1, int(fps * self.MIN_SEGMENT_SECONDS))
+        count = max(1, min(workers, (end_frame - start_frame) // min_frames))
+        bounds = [start_frame + (end_frame - start_frame) * i // count
+                  for i in range(count + 1)]
+        if is_mp4(input_path) or shutil.which("ffprobe"):
+            keyframe_frames = [self._frame_at(t, fps) for t in self.get_keyframes(input_path)]
+            bounds = self._snap_to_keyframes(bounds, keyframe_frames)
+        
+        # frame_range overrides the trim; keeping it anchors timed stages
+        segment_ops = self._analyze_operations(input_path, operations)
+        # Segments get a directory per call so concurrent renders never collide
+        work_dir = tempfile.mkdtemp(prefix="segments-", dir=self.temp_dir)
+        segment_paths = [os.path.join(work_dir, f"segment_{i:04d}.mp4")
+                         for i in range(count)]
+        
+        print(f"Rendering {count} segments across {min(count, workers)} processes")
+        try:
+            with ProcessPoolExecutor(max_workers=count) as pool:
+                futures = [pool.submit(_render_segment, input_path, path, segment_ops,
+                                       (bounds[i], bounds[i + 1]),
+                                       self.encoder, self.preset, self.crf)
+                           for i, path in enumerate(segment_paths)]
+                frame_count = sum(future.result() for future in futures)
+            
+            self._concat_segments(segment_paths, output_path)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+        
+        return frame_count
+    
+    @staticmethod
+    def _snap_to_keyframes(bounds: List[int], keyframe_frames: List[int]) -> List[int]:
+        """Move interior segment boundaries to the nearest keyframe between neighbours"""
+        snapped = [bounds[0]]
+        for bound, next_bound in zip(bounds[1:-1], bounds[2:]):
+            candidates = [k for k in keyframe_frames if snapped[-1] < k < next_bound]
+            snapped.append(min(candidates, key=lambda k: abs(k - bound)) if candidates else bound)
+        snapped.append(bounds[-1])
+        return snapped
+    
+    def _concat_segments(self, segment_paths: List[str], output_path: str):
+        """Join same-codec segments with ffmpeg's concat demuxer (stream copy);
+        the list file goes next to the segments, in the caller's work directory"""
+        list_path = os.path.join(os.path.dirname(segment_paths[0]), "segments.txt")
+        with open(list_path, 'w') as f:
+            for path in segment_paths:
+                f.write(f"file '{os.path.abspath(path)}'\n")
+        
+        cmd = [
+            'ffmpeg', '-y',
+            '-f', 'concat',
+            '-safe', '0',
+            '-i', list_path,
+            '-c', 'copy',
+            output_path
+        ]
+        
+        result = subprocess.run(cmd, capture_output=True, text=True)
+        os.remove(list_path)
+        if result.returncode != 0:
+            raise RuntimeError(f"FFmpeg concat failed: {result.stderr}")
+    
+    def _render(self, input_path: str, output_path: str, operations: List[Dict],
+               frame_range: Optional[Tuple[int, int]] = None) -> int:
+        """Render through the cache (when configured); returns frames written"""
+        return self._cached(
+            input_path, output_path, operations,
+            lambda path: self._render_frames(input_path, path, operations, frame_range),
+            frame_range)
+    
+    @_pooled
+    def _render_frames(self, input_path: str, output_path: str, operations: List[Dict],
+                      frame_range: Optional[Tuple[int, int]] = None) -> int:
+        """Decode, transform and encode a clip once; returns frames written
+        
+        frame_range, when given, overrides any trim operation.
+        """
+        operations = self._analyze_operations(input_path, operations)
+        cap = cv2.VideoCapture(input_path)
+        try:
+            if not cap.isOpened():
+                raise IOError(f"Cannot open video: {input_path}")
             
             # Get video properties
             fps = cap.get(cv2.CAP_PROP_FPS)
+            width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+            height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
             total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
             
+            stages, output_size, (start_frame, end_frame) = self._compile_operations(
+                operations, width, height, fps)
+            # Timed stages count from the trim start, even within a segment
+            origin = start_frame
+            if frame_range is not None:
+                start_frame, end_frame = frame_range
+            
+            if start_frame > 0:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+            if end_frame is None or (total_frames > 0 and end_frame > total_frames):
+                end_frame = total_frames if total_frames > 0 else None
+            
+            total = end_frame - start_frame if end_frame is not None else total_frames
+            
             # Create video writer
-            fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-            out = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
+            out = self._open_writer(output_path, fps, output_size)
             
-            frame_count = 0
-            while cap.isOpened():
-                ret, frame = cap.read()
-                if not ret:
-                    break
-                
-                # Resize frame maintaining aspect ratio
-                frame_height, frame_width = frame.shape[:2]
-                aspect_ratio = frame_width / frame_height
-                
-                if aspect_ratio > 9/16:  # Wider than 9:16
-                    new_width = int(height * aspect_ratio)
-                    resized = cv2.resize(frame, (new_width, height))
-                    # Crop center
-                    start_x = (new_width - width) // 2
-                    cropped = resized[:, start_x:start_x + width]
-                else:  # Taller than 9:16
-                    new_height = int(width / aspect_ratio)
-                    resized = cv2.resize(frame, (width, new_height))
-                    # Add black bars top/bottom
-                    top_bottom = (height - new_height) // 2
-                    cropped = np.zeros((height, width, 3), dtype=np.uint8)
-                    cropped[top_bottom:top_bottom + new_height, :] = resized
-                
-                out.write(cropped)
-                frame_count += 1
+            written = [0]
+            
+            def write(frame):
+                out.write(frame)
+                self.frame_pool.release(frame)
+                written[0] += 1
+                if written[0] % 100 == 0:
+                    print(f"Processed {written[0]}/{total} frames")
+            
+            try:
+                frame_count = self.pipeline.run(
+                    self._read_frames(cap, start_frame, end_frame, (height, width, 3),
+                                      origin, fps),
+                    stages, write, self.frame_pool)
+            finally:
+                out.release()
+            
+            return frame_count
+        finally:
+            cap.release()
+    
+    @_pooled
+    def _render_variants(self, input_path: str,
+                        variants: List[Tuple[List[Dict], str]]) -> List[int]:
+        """Decode once and feed every (operations, output_path) chain; returns
+        frames written per variant
+        
+        The calling thread decodes the union of the variants' trim ranges and
+        hands each frame (a pooled copy for all but the last taker) to a
+        bounded per-variant queue. Each variant renders its queue through the
+        frame pipeline into its own encoder on a thread of its own.
+        """
+        if not variants:
+            return []
+        
+        cap = cv2.VideoCapture(input_path)
+        try:
+            if not cap.isOpened():
+                raise IOError(f"Cannot open video: {input_path}")
+            
+            fps = cap.get(cv2.CAP_PROP_FPS)
+            width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+            height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+            total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            
+            chains = []
+            try:
+                for operations, output_path in variants:
+                    operations = self._analyze_operations(input_path, operations)
+                    stages, output_size, (start_frame, end_frame) = self._compile_operations(
+                        operations, width, height, fps)
+                    if end_frame is None or (total_frames > 0 and end_frame > total_frames):
+                        end_frame = total_frames if total_frames > 0 else None
+                    chains.append({
+                        "stages": stages,
+                        "range": (start_frame, end_frame),
+                        "writer": self._open_writer(output_path, fps, output_size),
+                        "frames": queue.Queue(self.pipeline.queue_size),
+                        "written": 0
+                    })
+            except BaseException:
+                # A later variant failed to set up: stop the encoders already started
+                for chain in chains:
+                    chain["writer"].release()
+                raise
+            
+            stop = threading.Event()
+            errors = []
+            
+            def feed(chain):
+                while True:
+                    item = chain["frames"].get()
+                    if item is None:
+                        return
+                    yield item
+            
+            def render(chain):
+                def write(frame):
+                    chain["writer"].write(frame)
+                    self.frame_pool.release(frame)
                 
-                if frame_count % 100 == 0:
-                    print(f"Processed {frame_count}/{total_frames} frames")
+                try:
+                    chain["written"] = self.pipeline.run(feed(chain), chain["stages"], write,
+                                                         self.frame_pool)
+                except Exception as e:
+                    errors.append(e)
+                    stop.set()
+                    # Keep draining so the decoder never blocks on this queue
+                    for item in iter(chain["frames"].get, None):
+                        self.frame_pool.release(item[1])
+            
+            threads = [threading.Thread(target=render, args=(chain,),
+                                        name=f"variant-{i}", daemon=True)
+                       for i, chain in enumerate(chains)]
+            for thread in threads:
+                thread.start()
+            
+            start_frame = min(chain["range"][0] for chain in chains)
+            ends = [chain["range"][1] for chain in chains]
+            end_frame = None if None in ends else max(ends)
+            if start_frame > 0:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
             
+            try:
+                frame_index = start_frame
+                for _, frame in self._read_frames(cap, start_frame, end_frame,
+                                                  (height, width, 3)):
+                    if stop.is_set():
+                        break
+                    takers = [chain for chain in chains
+                              if chain["range"][0] <= frame_index
+                              and (chain["range"][1] is None or frame_index < chain["range"][1])]
+                    for i, chain in enumerate(takers):
+                        if i == len(takers) - 1:
+                            copy = frame
+                        else:
+                            copy = self.frame_pool.acquire(frame.shape)
+                            np.copyto(copy, frame)
+                        t = (frame_index - chain["range"][0]) / fps if fps else 0.0
+                        chain["frames"].put((t, copy))
+                    if not takers:
+                        self.frame_pool.release(frame)
+                    frame_index += 1
+            finally:
+                for chain in chains:
+                    chain["frames"].put(None)
+                for thread in threads:
+                    thread.join()
+                for chain in chains:
+                    chain["writer"].release()
+            
+            if errors:
+                raise errors[0]
+            return [chain["written"] for chain in chains]
+        finally:
             cap.release()
-            out.release()
+    
+    def _open_writer(self, output_path: str, fps: float, size: Tuple[int, int]):
+        """Open the configured encoder backend"""
+        if self.encoder == "ffmpeg":
+            return FFmpegWriter(output_path, fps, size, self.preset, self.crf)
+        return OpenCVWriter(output_path, fps, size)
+    
+    def _read_frames(self, cap, start_frame: int, end_frame: Optional[int],
+                    shape: Tuple[int, int, int], origin: int = 0, fps: float = 0.0):
+        """Yield (t, frame) from start_frame up to (not including) end_frame,
+        decoded into pooled buffers; t counts seconds from the origin frame"""
+        frame_index = start_frame
+        while end_frame is None or frame_index < end_frame:
+            buffer = self.frame_pool.acquire(shape)
+            ret, frame = cap.read(buffer)
+            if frame is not buffer:
+                self.frame_pool.release(buffer)
+            if not ret:
+                break
+            yield ((frame_index - origin) / fps if fps else 0.0), frame
+            frame_index += 1
+    
+    def _compile_operations(self, operations: List[Dict], width: int, height: int,
+                           fps: float) -> Tuple[List[Callable], Tuple[int, int],
+                                                Tuple[int, Optional[int]]]:
+        """Turn an operation list into frame stages, output size and frame range"""
+        builders = {
+            "resize": self._build_resize_stage,
+            "enhance": self._build_enhance_stage,
+            "cinematic": self._build_cinematic_stage,
+            "overlay": self._build_overlay_stage,
+            "stabilize": self._build_stabilize_stage,
+        }
+        
+        stages = []
+        
+        for operation in operations:
+            params = dict(operation)
+            name = params.pop("op", None)
             
-            print(f"Video resized successfully: {output_path}")
-            return True
+            if name == "trim":
+                continue
+            if name not in builders:
+                raise ValueError(f"Unknown operation: {name}")
             
-        except Exception as e:
-            print(f"Error resizing video: {e}")
-            return False
+            stage, (width, height) = builders[name](width, height, **params)
+            stages.append(stage)
+        
+        return stages, (width, height), self._trim_range(operations, fps)
+    
+    @staticmethod
+    def _frame_at(seconds: float, fps: float) -> int:
+        """Index of the frame nearest to a time; every trim path rounds this way"""
+        return int(round(seconds * fps))
+    
+    @classmethod
+    def _trim_range(cls, operations: List[Dict], fps: float) -> Tuple[int, Optional[int]]:
+        """Source frame range selected by the (single) trim operation"""
+        trims = [op for op in operations if op.get("op") == "trim"]
+        if len(trims) > 1:
+            raise ValueError("Only one trim operation is supported")
+        if not trims:
+            return 0, None
+        
+        start_time = trims[0].get("start_time", 0.0)
+        duration = trims[0].get("duration")
+        start_frame = cls._frame_at(start_time, fps)
+        end_frame = cls._frame_at(start_time + duration, fps) if duration is not None else None
+        return start_frame, end_frame
+    
+    def _analyze_operations(self, input_path: str, operations: List[Dict]) -> List[Dict]:
+        """Run the whole-clip analysis passes some stages need before the first
+        frame is rendered (stabilization motion, auto-reframe crop path,
+        contrast pivot), filling in their results"""
+        analyzed = []
+        for operation in operations:
+            if operation.get("op") == "stabilize" and "corrections" not in operation:
+                operation = {**operation, **self._estimate_stabilization(
+                    input_path, operations,
+                    operation.get("smoothing_radius", 15),
+                    operation.get("analysis_width", 320))}
+            elif (operation.get("op") == "resize" and operation.get("mode") == "auto"
+                  and "crop_centers" not in operation):
+                operation = {**operation, **self._estimate_crop_path(
+                    input_path, operations,
+                    operation.get("width", 1080) / operation.get("height", 1920))}
+            analyzed.append(operation)
+        
+        if any(self._needs_pivot(operation) for operation in analyzed):
+            analyzed = self._pin_operations(input_path, analyzed)
+        return analyzed
+    
+    @staticmethod
+    def _needs_pivot(operation: Dict) -> bool:
+        return operation.get("op") == "enhance" and operation.get("contrast_pivot") is None
+    
+    @_pooled
+    def _pin_operations(self, input_path: str, operations: List[Dict],
+                       start_frame: Optional[int] = None) -> List[Dict]:
+        """Resolve parameters derived from the first rendered frame (the enhance
+        contrast pivot) before rendering, so every worker and segment grades
+        identically; start_frame defaults to the trim start"""
+        cap = cv2.VideoCapture(input_path)
+        try:
+            fps = cap.get(cv2.CAP_PROP_FPS)
+            width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+            height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+            if start_frame is None:
+                start_frame = self._trim_range(operations, fps)[0]
+            if start_frame > 0:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+            ret, frame = cap.read()
+        finally:
+            cap.release()
+        
+        if not ret:
+            raise IOError(f"Cannot read frame {start_frame} of {input_path}")
+        
+        # Walk the frame down the chain, pinning each pivot from the frame
+        # as that stage would see it
+        remaining = sum(map(self._needs_pivot, operations))
+        pinned = []
+        for operation in operations:
+            if remaining and operation.get("op") != "trim":
+                if self._needs_pivot(operation):
+                    # Contrast pivots around the clip's mean luma (as PIL does per image)
+                    operation = {**operation, "contrast_pivot": int(ColorGrade.mean_luma(
+                        frame, operation.get("brightness", 1.2)) + 0.5)}
+                    remaining -= 1
+                stages, (width, height), _ = self._compile_operations([operation], width,
+                                                                      height, fps)
+                frame = FramePipeline._apply(stages, frame, 0.0, self.frame_pool)
+            pinned.append(operation)
+        
+        self.frame_pool.release(frame)
+        return pinned
+    
+    def _build_resize_stage(self, src_width: int, src_height: int,
+                           width: int = 1080, height: int = 1920,
+                           mode: str = "center",
+                           crop_centers: Optional[List[float]] = None,
+                           sample_fps: float = 2.0) -> Tuple[Callable, Tuple[int, int]]:
+        """Crop or letterbox to the target size
+        
+        Wider sources are center-cropped, or with mode="auto" cropped along
+        the precomputed crop_centers path (crop center x as a fraction of
+        the width, sampled at sample_fps).
+        """
+        aspect_ratio = src_width / src_height
+        pool = self.frame_pool
+        
+        if aspect_ratio > width / height and mode == "auto" and crop_centers:
+            # Slide the crop window along the subject path
+            crop_width = min(src_width, int(round(src_height * width / height)))
+            centers = np.asarray(crop_centers, dtype=np.float64)
+            times = np.arange(len(centers)) / sample_fps
+            
+            def resize(frame, t):
+                center = np.interp(t, times, centers) * src_width
+                crop_x = min(max(0, int(round(center - crop_width / 2))), src_width - crop_width)
+                out = pool.acquire((height, width, 3))
+                return cv2.resize(frame[:, crop_x:crop_x + crop_width], (width, height), dst=out)
+        elif aspect_ratio > width / height:  # Wider than target
+            # Crop the center in source coordinates, then scale the crop
+            # straight into a pooled output buffer
+            scale = height / src_height
+            new_width = int(height * aspect_ratio)
+            crop_x = int(round(((new_width - width) // 2) / scale))
+            crop_width = min(src_width - crop_x, int(round(width / scale)))
+            
+            def resize(frame, t):
+                out = pool.acquire((height, width, 3))
+                return cv2.resize(frame[:, crop_x:crop_x + crop_width], (width, height), dst=out)
+        else:  # Taller than target
+            # Fit inside the target and center it on a black canvas
+            new_width = min(width, int(round(height * aspect_ratio)))
+            new_height = min(height, int(round(width / aspect_ratio)))
+            left = (width - new_width) // 2
+            top = (height - new_height) // 2
+            
+            def resize(frame, t):
+                canvas = pool.acquire((height, width, 3))
+                # Add black bars around the picture
+                canvas[:top] = 0
+                canvas[top + new_height:] = 0
+                canvas[:, :left] = 0
+                canvas[:, left + new_width:] = 0
+                cv2.resize(frame, (new_width, new_height),
+                           dst=canvas[top:top + new_height, left:left + new_width])
+                return canvas
+        
+        return resize, (width, height)
+    
+    def _estimate_crop_path(self, input_path: str, operations: List[Dict],
+                           aspect: float, sample_fps: float = 2.0,
+                           analysis_width: int = 96,
+                           smoothing_seconds: float = 1.5) -> Dict:
+        """Horizontal crop path that follows the subject, from sampled proxy frames
+        
+        Each sample's subject position is the column centroid of spectral
+        residual saliency plus frame-to-frame motion; the path is smoothed
+        with a moving average and kept inside the frame. Times count from
+        the trim start.
+        """
+        info = self.get_video_info(input_path)
+        fps = info.get("fps", 0.0)
+        start_frame, end_frame = self._trim_range(operations, fps)
+        start_time = start_frame / fps if fps else 0.0
+        end_time = end_frame / fps if fps and end_frame is not None else float("inf")
+        
+        grays = [cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY).astype(np.float32)
+                 for t, frame in self._proxy_frames(input_path, sample_fps, analysis_width)
+                 if start_time <= t < end_time]
+        if not grays:
+            raise IOError(f"No frames decoded from {input_path}")
+        frames = np.stack(grays)
+        
+        # Spectral residual saliency, all samples in one batched FFT
+        spectrum = np.fft.fft2(frames)
+        log_amplitude = np.log1p(np.abs(spectrum))
+        average = sum(np.roll(log_amplitude, (dy, dx), axis=(1, 2))
+                      for dy in (-1, 0, 1) for dx in (-1, 0, 1)) / 9.0
+        saliency = np.abs(np.fft.ifft2(np.exp(log_amplitude - average + 1j * np.angle(spectrum)))) ** 2
+        motion = np.abs(np.diff(frames, axis=0, prepend=frames[:1]))
+        
+        # Only above-average response counts, so texture does not pull to the middle
+        for response in (saliency, motion):
+            response -= response.mean(axis=(1, 2), keepdims=True)
+            np.maximum(response, 0.0, out=response)
+            response /= response.sum(axis=(1, 2), keepdims=True) + 1e-9
+        
+        weights = (saliency + motion).sum(axis=1)
+        columns = (np.arange(frames.shape[2]) + 0.5) / frames.shape[2]
+        centers = (weights * columns).sum(axis=1) / (weights.sum(axis=1) + 1e-9)
+        
+        # Smooth, then keep the crop window inside the frame
+        centers = self._moving_average(centers, max(1, int(round(smoothing_seconds * sample_fps))))
+        half = min(0.5, aspect * info["height"] / info["width"] / 2.0)
+        centers = np.clip(centers, half, 1.0 - half)
+        
+        return {"sample_fps": sample_fps, "crop_centers": np.round(centers, 5).tolist()}
     
     def add_music(self, video_path: str, audio_path: str, output_path: str) -> bool:
-        """Add background music to video"""
+        """Add background music to video
+        
+        The track comes from the audio asset store, already AAC at the target
+        loudness and trimmed to a common duration, so both streams are copied.
+        """
         try:
-            # Use ffmpeg for audio mixing
+            duration = self.get_video_info(video_path).get("duration")
+            music = self.audio_assets.asset(audio_path, duration)
+            
+            # Pure remux: no audio or video encoding
             cmd = [
                 'ffmpeg', '-y',
                 '-i', video_path,
-                '-i', audio_path,
-                '-c:v', 'copy',
-                '-c:a', 'aac',
+                '-i', music,
+                '-c', 'copy',
                 '-map', '0:v:0',
                 '-map', '1:a:0',
                 '-shortest',
+                '-movflags', '+faststart',
                 output_path
             ]
             
@@ -121,86 +1220,248 @@ class VideoProcessor:
             print(f"Error adding music: {e}")
             return False
     
+    def analyze_music(self, audio_path: str) -> Dict:
+        """Tempo, beat and onset times of a music track (cached per track content)"""
+        try:
+            return self.audio_analysis.analyze(audio_path)
+        except Exception as e:
+            print(f"Error analyzing music: {e}")
+            return {}
+    
+    def plan_beat_synced_cuts(self, audio_path: str, clip_paths: List[str],
+                             duration: float = 30.0, beats_per_cut: int = 4) -> List[Dict]:
+        """Cut list that switches between footage clips on the music's beats
+        
+        Returns [{"path", "start_time", "duration", "at"}, ...]; each entry
+        can be cut with trim_video and the pieces joined in order.
+        """
+        analysis = self.analyze_music(audio_path)
+        if not analysis:
+            return []
+        
+        clips = [(path, self.get_video_info(path).get("duration", 0.0)) for path in clip_paths]
+        cuts = plan_beat_cuts(analysis["beats"], clips, duration, beats_per_cut)
+        print(f"Planned {len(cuts)} cuts at {analysis['tempo']:.1f} BPM")
+        return cuts
+    
+    # Re-encoders for the partial GOPs at trim edges, keyed by ffprobe codec_name
+    SMART_TRIM_ENCODERS = {
+        "h264": ["-c:v", "libx264"],
+        "hevc": ["-c:v", "libx265"],
+        "mpeg4": ["-c:v", "mpeg4", "-q:v", "2"]
+    }
+    
     def trim_video(self, input_path: str, output_path: str, 
                   start_time: float, duration: float) -> bool:
-        """Trim video to specific duration"""
+        """Frame-accurate trim that re-encodes only the partial GOPs at each edge
+        
+        Whole GOPs between the first and last keyframe inside the range are
+        stream-copied; the head and tail are re-encoded with the source codec
+        and joined losslessly. Without a keyframe index or a matching encoder
+        the whole range is re-encoded.
+        """
         try:
-            cap = cv2.VideoCapture(input_path)
-            fps = cap.get(cv2.CAP_PROP_FPS)
-            cap.release()
+            stream = self._probe_video_stream(input_path)
+            fps = self._stream_fps(stream, input_path)
+            codec_args = self._edge_codec_args(stream.get("codec_name"))
+            keyframes = self.get_keyframes(input_path) if codec_args else []
             
-            start_frame = int(start_time * fps)
-            end_frame = int((start_time + duration) * fps)
+            # Work in frame indices so pieces butt together exactly; a range
+            # running past the end stops at the last frame, as -t would
+            start_frame = self._frame_at(start_time, fps)
+            end_frame = self._frame_at(start_time + duration, fps)
+            frame_count = self.get_video_info(input_path).get("frame_count")
+            if frame_count:
+                end_frame = min(end_frame, frame_count)
+            if end_frame <= start_frame:
+                raise ValueError(f"Trim starts at frame {start_frame}, past the end of "
+                                 f"{input_path}")
+            inside = sorted({self._frame_at(t, fps) for t in keyframes
+                             if start_frame <= self._frame_at(t, fps) <= end_frame})
             
-            # Use ffmpeg for trimming
-            cmd = [
-                'ffmpeg', '-y',
-                '-i', input_path,
-                '-ss', str(start_time),
-                '-t', str(duration),
-                '-c', 'copy',
-                output_path
-            ]
+            if codec_args and len(inside) >= 2:
+                copy_start, copy_end = inside[0], inside[-1]
+                pieces = [(start_frame, copy_start, False),
+                          (copy_start, copy_end, True),
+                          (copy_end, end_frame, False)]
+                pieces = [piece for piece in pieces if piece[1] > piece[0]]
+            else:
+                codec_args = codec_args or self._edge_codec_args("h264")
+                pieces = [(start_frame, end_frame, False)]
             
-            result = subprocess.run(cmd, capture_output=True, text=True)
+            # Pieces get a directory per call so concurrent trims never collide,
+            # and output_path is only written once every piece checked out
+            work_dir = tempfile.mkdtemp(prefix="trim-", dir=self.temp_dir)
+            extension = os.path.splitext(output_path)[1] or ".mp4"
+            piece_paths = [os.path.join(work_dir, f"trim_{i}{extension}")
+                           for i in range(len(pieces))]
             
-            if result.returncode == 0:
-                print(f"Video trimmed successfully: {output_path}")
-                return True
-            else:
-                print(f"FFmpeg error: {result.stderr}")
-                return False
+            try:
+                for (first, last, copy), path in zip(pieces, piece_paths):
+                    self._cut_piece(input_path, path, first, last - first, fps,
+                                    copy, codec_args, stream)
+                if len(pieces) > 1:
+                    self._concat_segments(piece_paths, output_path)
+                else:
+                    shutil.move(piece_paths[0], output_path)
+            finally:
+                shutil.rmtree(work_dir, ignore_errors=True)
+            
+            copied = sum(last - first for first, last, copy in pieces if copy)
+            total = end_frame - start_frame
+            print(f"Video trimmed successfully ({copied} frames stream-copied, "
+                  f"{total - copied} re-encoded): {output_path}")
+            return True
                 
         except Exception as e:
             print(f"Error trimming video: {e}")
             return False
     
+    def _edge_codec_args(self, codec_name: Optional[str]) -> Optional[List[str]]:
+        """Encoder arguments that reproduce the source codec, if we have one"""
+        args = self.SMART_TRIM_ENCODERS.get(codec_name)
+        if args is None:
+            return None
+        if codec_name in ("h264", "hevc"):
+            args = args + ["-preset", self.preset, "-crf", str(self.crf)]
+        return args
+    
+    def _cut_piece(self, input_path: str, output_path: str, first_frame: int,
+                  frame_count: int, fps: float, copy: bool,
+                  codec_args: List[str], stream: Dict):
+        """Extract frames [first_frame, first_frame + frame_count), copied or
+        re-encoded; raises if the piece does not hold exactly frame_count frames"""
+        if copy:
+            # Stream copy snaps back to the keyframe at or before -ss
+            seek = (first_frame + 0.5) / fps
+            duration = frame_count / fps
+        else:
+            # Accurate seek keeps frames at or after -ss; the window runs from
+            # that half-frame lead-in to the end of the piece's last frame
+            seek = max(0.0, (first_frame - 0.5) / fps)
+            duration = (first_frame + frame_count) / fps - seek
+        
+        cmd = [
+            'ffmpeg', '-y',
+            '-ss', f'{seek:.6f}',
+            '-i', input_path,
+            '-frames:v', str(frame_count),
+            '-t', f'{duration:.6f}',
+            '-map', '0:v:0',
+            '-map', '0:a:0?'
+        ]
+        
+        if copy:
+            cmd += ['-c:v', 'copy', '-avoid_negative_ts', 'make_zero']
+        else:
+            # Keep source timestamps: constant-rate output would pad the
+            # half-frame lead-in with a duplicate and -frames:v would then
+            # drop the piece's last frame
+            cmd += [*_passthrough_args(), *codec_args]
+            if stream.get("pix_fmt"):
+                cmd += ['-pix_fmt', stream["pix_fmt"]]
+        
+        # Audio is cheap to re-encode and keeps every piece on the same codec
+        cmd += ['-c:a', 'aac']
+        
+        # Matching timescales keep the concat demuxer's timestamps exact
+        time_base = stream.get("time_base", "")
+        if "/" in time_base:
+            cmd += ['-video_track_timescale', time_base.split("/")[1]]
+        cmd.append(output_path)
+        
+        result = subprocess.run(cmd, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"FFmpeg error: {result.stderr}")
+        
+        if is_mp4(output_path):
+            written = read_mp4_info(output_path).get("frame_count")
+            if written != frame_count:
+                raise RuntimeError(f"Trim piece at frame {first_frame} has {written} frames, "
+                                   f"expected {frame_count}")
+    
+    @staticmethod
+    def _stream_fps(stream: Dict, video_path: str) -> float:
+        """Frame rate from ffprobe's r_frame_rate, falling back to OpenCV"""
+        numerator, _, denominator = stream.get("r_frame_rate", "").partition("/")
+        try:
+            fps = float(numerator) / float(denominator or 1)
+            if fps > 0:
+                return fps
+        except ValueError:
+            pass
+        
+        cap = cv2.VideoCapture(video_path)
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        cap.release()
+        if fps <= 0:
+            raise IOError(f"Cannot determine frame rate of {video_path}")
+        return fps
+    
+    def get_keyframes(self, video_path: str) -> List[float]:
+        """Keyframe timestamps (seconds) of the first video stream"""
+        if is_mp4(video_path):
+            try:
+                keyframes = read_keyframes(video_path)
+                if keyframes:
+                    return keyframes
+            except (OSError, ValueError):
+                pass
+        
+        try:
+            cmd = [
+                'ffprobe', '-v', 'error',
+                '-select_streams', 'v:0',
+                '-show_entries', 'packet=pts_time,flags',
+                '-of', 'csv=print_section=0',
+                video_path
+            ]
+            
+            result = subprocess.run(cmd, capture_output=True, text=True)
+            if result.returncode != 0:
+                print(f"FFprobe error: {result.stderr}")
+                return []
+            
+            keyframes = []
+            for line in result.stdout.splitlines():
+                pts_time, _, flags = line.partition(',')
+                if 'K' in flags and pts_time not in ('', 'N/A'):
+                    keyframes.append(float(pts_time))
+            return sorted(keyframes)
+            
+        except Exception as e:
+            print(f"Error reading keyframes: {e}")
+            return []
+    
+    def _probe_video_stream(self, video_path: str) -> Dict:
+        """Codec, pixel format, time base and frame rate of the first video stream"""
+        try:
+            cmd = [
+                'ffprobe', '-v', 'error',
+                '-select_streams', 'v:0',
+                '-show_entries', 'stream=codec_name,pix_fmt,time_base,r_frame_rate',
+                '-of', 'json',
+                video_path
+            ]
+            
+            result = subprocess.run(cmd, capture_output=True, text=True)
+            if result.returncode != 0:
+                return {}
+            streams = json.loads(result.stdout).get("streams", [])
+            return streams[0] if streams else {}
+            
+        except Exception:
+            return {}
+    
     def enhance_video(self, input_path: str, output_path: str, 
                      brightness: float = 1.2, 
                      contrast: float = 1.1,
                      saturation: float = 1.1) -> bool:
         """Enhance video quality with filters"""
         try:
-            cap = cv2.VideoCapture(input_path)
-            fps = cap.get(cv2.CAP_PROP_FPS)
-            width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-            height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-            
-            fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-            out = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
-            
-            frame_count = 0
-            while cap.isOpened():
-                ret, frame = cap.read()
-                if not ret:
-                    break
-                
-                # Convert to PIL for enhancement
-                pil_image = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
-                
-                # Apply enhancements
-                if brightness != 1.0:
-                    enhancer = ImageEnhance.Brightness(pil_image)
-                    pil_image = enhancer.enhance(brightness)
-                
-                if contrast != 1.0:
-                    enhancer = ImageEnhance.Contrast(pil_image)
-                    pil_image = enhancer.enhance(contrast)
-                
-                if saturation != 1.0:
-                    enhancer = ImageEnhance.Color(pil_image)
-                    pil_image = enhancer.enhance(saturation)
-                
-                # Convert back to OpenCV
-                enhanced_frame = cv2.cvtColor(np.array(pil_image), cv2.COLOR_RGB2BGR)
-                out.write(enhanced_frame)
-                
-                frame_count += 1
-                if frame_count % 100 == 0:
-                    print(f"Enhanced {frame_count} frames")
-            
-            cap.release()
-            out.release()
+            self._render(input_path, output_path,
+                         [{"op": "enhance", "brightness": brightness,
+                           "contrast": contrast, "saturation": saturation}])
             
             print(f"Video enhanced successfully: {output_path}")
             return True
@@ -209,118 +1470,420 @@ class VideoProcessor:
             print(f"Error enhancing video: {e}")
             return False
     
+    def _build_enhance_stage(self, width: int, height: int,
+                            brightness: float = 1.2,
+                            contrast: float = 1.1,
+                            saturation: float = 1.1,
+                            contrast_pivot: Optional[int] = None) -> Tuple[Callable, Tuple[int, int]]:
+        """Brightness, contrast and saturation adjustment
+        
+        contrast_pivot is filled in by _analyze_operations from the first
+        rendered frame, so the grade is fixed before any worker runs it.
+        """
+        if contrast_pivot is None:
+            raise ValueError("enhance needs a contrast_pivot; run _analyze_operations first")
+        grade = ColorGrade(brightness=brightness, contrast=contrast,
+                           saturation=saturation, contrast_pivot=contrast_pivot)
+        
+        def enhance(frame, t):
+            return grade.apply(frame, in_place=True)
+        
+        return enhance, (width, height)
+    
     def add_text_overlay(self, input_path: str, output_path: str, 
                        text: str, position: str = "bottom") -> bool:
         """Add text overlay to video"""
         try:
-            cap = cv2.VideoCapture(input_path)
-            fps = cap.get(cv2.CAP_PROP_FPS)
-            width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-            height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+            self._render(input_path, output_path,
+                         [{"op": "overlay", "text": text, "position": position}])
+            
+            print(f"Text overlay added successfully: {output_path}")
+            return True
+            
+        except Exception as e:
+            print(f"Error adding text overlay: {e}")
+            return False
+    
+    def add_captions(self, input_path: str, output_path: str,
+                    captions: List[Dict]) -> bool:
+        """Add a timed caption track to video
+        
+        Each caption is {"text", "start", "end", "position", "fade"} with times
+        in seconds; position defaults to "bottom" and fade (in/out) to 0.
+        """
+        try:
+            self._render(input_path, output_path,
+                         [{"op": "overlay", "captions": captions}])
             
-            fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-            out = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
+            print(f"Captions added successfully: {output_path}")
+            return True
             
-            # Text settings
-            font = cv2.FONT_HERSHEY_SIMPLEX
-            font_scale = 1
-            thickness = 2
-            text_color = (255, 255, 255)  # White
-            background_color = (0, 0, 0)  # Black
+        except Exception as e:
+            print(f"Error adding captions: {e}")
+            return False
+    
+    def _build_overlay_stage(self, width: int, height: int, text: str = "",
+                            position: str = "bottom",
+                            captions: Optional[List[Dict]] = None,
+                            font_size: Optional[int] = None) -> Tuple[Callable, Tuple[int, int]]:
+        """Static caption or timed caption track, each on a translucent box"""
+        font_size = font_size or max(16, width // 24)
+        margin = max(10, height // 40)
+        
+        # Rasterize each caption once; per frame only its box is blended
+        sprites = []
+        for caption in normalize_captions(text, position, captions):
+            sprite = self.mask_cache.get("caption", width, height, self._build_caption_sprite,
+                                         (caption["text"], font_size))
+            sprite_height = min(sprite.shape[0], height)
+            sprite_width = min(sprite.shape[1], width)
             
             # Calculate text position
-            text_size = cv2.getTextSize(text, font, font_scale, thickness)[0]
-            
-            if position == "bottom":
-                text_x = (width - text_size[0]) // 2
-                text_y = height - 50
-            elif position == "top":
-                text_x = (width - text_size[0]) // 2
-                text_y = 50
+            x = (width - sprite_width) // 2
+            if caption["position"] == "bottom":
+                y = height - margin - sprite_height
+            elif caption["position"] == "top":
+                y = margin
             else:  # center
-                text_x = (width - text_size[0]) // 2
-                text_y = height // 2
+                y = (height - sprite_height) // 2
+            y = max(0, y)
             
-            frame_count = 0
-            while cap.isOpened():
-                ret, frame = cap.read()
-                if not ret:
-                    break
-                
-                # Add background rectangle
-                cv2.rectangle(frame, 
-                            (text_x - 10, text_y - text_size[1] - 10),
-                            (text_x + text_size[0] + 10, text_y + 10),
-                            background_color, -1)
+            alpha = sprite[:sprite_height, :sprite_width, 3].astype(np.float32) / 255.0
+            sprites.append({
+                "caption": caption,
+                "roi": (slice(y, y + sprite_height), slice(x, x + sprite_width)),
+                "color": np.ascontiguousarray(sprite[:sprite_height, :sprite_width, :3]),
+                "alpha": alpha,
+                "inverse": 1.0 - alpha
+            })
+        
+        def overlay(frame, t):
+            for sprite in sprites:
+                opacity = caption_opacity(sprite["caption"], t)
+                if opacity <= 0.0:
+                    continue
                 
-                # Add text
-                cv2.putText(frame, text, (text_x, text_y), 
-                           font, font_scale, text_color, thickness)
+                if opacity >= 1.0:
+                    alpha, inverse = sprite["alpha"], sprite["inverse"]
+                else:
+                    alpha = sprite["alpha"] * opacity
+                    inverse = 1.0 - alpha
                 
-                out.write(frame)
-                frame_count += 1
-                
-                if frame_count % 100 == 0:
-                    print(f"Processed {frame_count} frames with text")
-            
-            cap.release()
-            out.release()
+                roi = frame[sprite["roi"]]
+                cv2.blendLinear(sprite["color"], roi, alpha, inverse, dst=roi)
+            return frame
+        
+        return overlay, (width, height)
+    
+    def _build_caption_sprite(self, width: int, height: int, text: str,
+                             font_size: int) -> "np.ndarray":
+        """BGRA caption sprite wrapped to fit the frame width"""
+        return self.caption_renderer.render(text, font_size, int(width * 0.9))
+    
+    def stabilize_video(self, input_path: str, output_path: str,
+                       smoothing_radius: int = 15) -> bool:
+        """Remove jitter and wind shake, keeping deliberate camera moves
+        
+        smoothing_radius is the moving-average half-width in frames; larger
+        values hold the shot steadier but crop more at the edges.
+        """
+        try:
+            self._render(input_path, output_path,
+                         [{"op": "stabilize", "smoothing_radius": smoothing_radius}])
             
-            print(f"Text overlay added successfully: {output_path}")
+            print(f"Video stabilized successfully: {output_path}")
             return True
             
         except Exception as e:
-            print(f"Error adding text overlay: {e}")
+            print(f"Error stabilizing video: {e}")
             return False
     
-    def create_cinematic_effect(self, input_path: str, output_path: str) -> bool:
-        """Add cinematic look to drone footage"""
+    def _estimate_stabilization(self, input_path: str, operations: List[Dict],
+                               smoothing_radius: int, analysis_width: int) -> Dict:
+        """Per-frame corrections that move the camera path onto its moving average
+        
+        Motion is measured between consecutive frames of a small grayscale
+        proxy: corners are tracked with pyramidal Lucas-Kanade and fitted with
+        a rotation+translation+scale model. Corrections are (dx, dy, angle)
+        with translations as fractions of the frame size, one per rendered
+        frame from the trim start.
+        """
+        fps = self.get_video_info(input_path).get("fps", 0.0)
+        start_frame, end_frame = self._trim_range(operations, fps)
+        
+        motions = []
+        previous = None
+        for t, gray in self._proxy_frames(input_path, None, analysis_width, gray=True):
+            frame_index = int(round(t * fps))
+            if frame_index < start_frame:
+                continue
+            if end_frame is not None and frame_index >= end_frame:
+                break
+            
+            motion = (0.0, 0.0, 0.0)
+            if previous is not None:
+                points = cv2.goodFeaturesToTrack(previous, maxCorners=200, qualityLevel=0.01,
+                                                 minDistance=max(4, analysis_width // 40))
+                if points is not None:
+                    moved, status, _ = cv2.calcOpticalFlowPyrLK(previous, gray, points, None)
+                    tracked = status.ravel() == 1
+                    if tracked.sum() >= 6:
+                        matrix, _ = cv2.estimateAffinePartial2D(points[tracked], moved[tracked])
+                        if matrix is not None:
+                            # Translation as the displacement of the frame center,
+                            # matching the center-anchored warp
+                            center = np.array([gray.shape[1] / 2.0, gray.shape[0] / 2.0])
+                            shift = matrix[:, :2] @ center + matrix[:, 2] - center
+                            motion = (shift[0] / gray.shape[1], shift[1] / gray.shape[0],
+                                      float(np.arctan2(matrix[1, 0], matrix[0, 0])))
+            motions.append(motion)
+            previous = gray
+        
+        if not motions:
+            raise IOError(f"No frames decoded from {input_path}")
+        
+        # Camera path and its moving average
+        trajectory = np.cumsum(np.array(motions, dtype=np.float64), axis=0)
+        smoothed = self._moving_average(trajectory, smoothing_radius)
+        
+        corrections = np.round(smoothed - trajectory, 6)
+        return {"fps": fps, "corrections": corrections.tolist()}
+    
+    @staticmethod
+    def _moving_average(values: "np.ndarray", radius: int) -> "np.ndarray":
+        """Centered moving average along the first axis, edges padded"""
+        window = 2 * radius + 1
+        pad = [(radius, radius)] + [(0, 0)] * (values.ndim - 1)
+        padded = np.pad(values, pad, mode="edge")
+        running = np.cumsum(np.concatenate([np.zeros_like(padded[:1]), padded]), axis=0)
+        return (running[window:] - running[:-window]) / window
+    
+    def _build_stabilize_stage(self, width: int, height: int,
+                              corrections: Optional[List[List[float]]] = None,
+                              fps: float = 30.0, zoom: float = 1.05,
+                              smoothing_radius: int = 15,
+                              analysis_width: int = 320) -> Tuple[Callable, Tuple[int, int]]:
+        """Warp each frame by its precomputed correction, zoomed to hide the edges"""
+        if corrections is None:
+            raise ValueError("stabilize needs its motion analysis pass")
+        
+        # One full-resolution affine warp per frame
+        corrections = np.asarray(corrections, dtype=np.float64)
+        center = (width / 2.0, height / 2.0)
+        pool = self.frame_pool
+        
+        def stabilize(frame, t):
+            index = min(int(round(t * fps)), len(corrections) - 1)
+            dx, dy, angle = corrections[index]
+            matrix = cv2.getRotationMatrix2D(center, -np.degrees(angle), zoom)
+            matrix[0, 2] += dx * width * zoom
+            matrix[1, 2] += dy * height * zoom
+            out = pool.acquire(frame.shape)
+            return cv2.warpAffine(frame, matrix, (width, height), dst=out,
+                                  flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REFLECT)
+        
+        return stabilize, (width, height)
+    
+    def create_hyperlapse(self, input_path: str, output_path: str, speed: float = 10.0,
+                         blend: int = 1, stabilize: bool = True) -> bool:
+        """Speed footage up by keeping one frame in every `speed`
+        
+        Dropped frames are not decoded where the stream allows it: when no
+        two keyframes (or the last one and the end) are more than `speed`
+        frames apart, ffmpeg seeks straight to the keyframe nearest each kept
+        frame and decodes only those. Otherwise the decoder skips non-reference frames, but every
+        reference frame still has to be decoded (about half of a typical
+        phone clip). blend > 1 averages that many consecutive frames into each
+        kept frame (motion blur) and decodes everything up to the last kept
+        frame. The real decoded/total count is printed either way.
+        Stabilization runs over the kept frames only.
+        """
         try:
-            cap = cv2.VideoCapture(input_path)
-            fps = cap.get(cv2.CAP_PROP_FPS)
-            width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-            height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+            operations = [{"op": "hyperlapse", "speed": speed, "blend": blend,
+                           "stabilize": stabilize}]
+            self._cached(input_path, output_path, operations,
+                         lambda path: self._render_hyperlapse(input_path, path, speed,
+                                                              blend, stabilize))
             
-            fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-            out = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
+            print(f"Hyperlapse created successfully: {output_path}")
+            return True
             
-            frame_count = 0
-            while cap.isOpened():
-                ret, frame = cap.read()
-                if not ret:
+        except Exception as e:
+            print(f"Error creating hyperlapse: {e}")
+            return False
+    
+    @_pooled
+    def _render_hyperlapse(self, input_path: str, output_path: str, speed: float,
+                          blend: int, stabilize: bool) -> int:
+        """Encode the kept frames, then stabilize them in a second pass over that
+        much shorter clip; returns frames written"""
+        info = self.get_video_info(input_path)
+        if not info.get("width") or not info.get("fps"):
+            raise IOError(f"Cannot read video info: {input_path}")
+        size = (info["width"], info["height"])
+        
+        target = output_path
+        if stabilize:
+            target = os.path.join(self.temp_dir,
+                                  f"hyperlapse_{os.getpid()}_{threading.get_ident()}.mp4")
+        # The intermediate is encoded losslessly so only the final pass costs quality
+        if stabilize and self.encoder == "ffmpeg":
+            writer = FFmpegWriter(target, info["fps"], size, "ultrafast", 0)
+        else:
+            writer = self._open_writer(target, info["fps"], size)
+        
+        written = 0
+        try:
+            for frame in self._hyperlapse_frames(input_path, info, speed, blend):
+                writer.write(frame)
+                self.frame_pool.release(frame)
+                written += 1
+        finally:
+            writer.release()
+        
+        if written == 0:
+            raise IOError(f"No frames decoded from {input_path}")
+        if not stabilize:
+            return written
+        
+        try:
+            return self._render_frames(target, output_path, [{"op": "stabilize"}])
+        finally:
+            if os.path.exists(target):
+                os.remove(target)
+    
+    def _hyperlapse_frames(self, input_path: str, info: Dict, speed: float, blend: int):
+        """Yield the kept frames of a hyperlapse, pooled (the consumer releases them)"""
+        fps = info["fps"]
+        total_frames = info.get("frame_count") or int(info.get("duration", 0.0) * fps)
+        shape = (info["height"], info["width"], 3)
+        step = max(1.0, float(speed))
+        blend = max(1, min(int(blend), int(step)))
+        targets = [int(i * step) for i in range(int(max(0, total_frames - 1) / step) + 1)]
+        
+        keyframe_times = self.get_keyframes(input_path)
+        keyframes = [int(round(t * fps)) for t in keyframe_times]
+        use_ffmpeg = blend == 1 and shutil.which("ffmpeg")
+        stats = {}
+        
+        # Keyframes stand in for the targets only when no gap between them is
+        # wider than a step and every target gets a keyframe of its own;
+        # otherwise frames would come out at uneven times or go missing
+        wanted = set()
+        gaps = np.diff(keyframes + [total_frames]) if keyframes else []
+        if use_ffmpeg and len(keyframes) > 1 and max(gaps) <= step:
+            for target in targets:
+                i = bisect.bisect_left(keyframes, target)
+                wanted.add(min((j for j in (i - 1, i) if 0 <= j < len(keyframes)),
+                               key=lambda j: abs(keyframes[j] - target)))
+            if len(wanted) < len(targets):
+                print(f"Keyframes cover {len(wanted)} of {len(targets)} hyperlapse frames, "
+                      f"resampling instead")
+                wanted = set()
+        
+        if wanted:
+            # Seek straight to the keyframe nearest each target: the concat
+            # demuxer plays just that one frame of the file per list entry
+            fd, list_path = tempfile.mkstemp(prefix="keyframes-", suffix=".txt",
+                                             dir=self.temp_dir)
+            source = os.path.abspath(input_path).replace("'", "'\\''")
+            with os.fdopen(fd, "w") as f:
+                for j in sorted(wanted):
+                    f.write(f"file '{source}'\ninpoint {keyframe_times[j]:.6f}\n"
+                            f"outpoint {keyframe_times[j] + 0.5 / fps:.6f}\n")
+            try:
+                yield from self._pipe_frames(
+                    ['-skip_frame', 'nokey', '-f', 'concat', '-safe', '0', '-i', list_path,
+                     *_passthrough_args()], shape, stats)
+            finally:
+                os.remove(list_path)
+            print(f"Hyperlapse decoded {stats.get('decoded', '?')} of {total_frames} frames "
+                  f"(seeking to {len(wanted)} keyframes)")
+        
+        elif use_ffmpeg:
+            # Non-reference frames are never decoded; the fps filter keeps the
+            # last decoded frame of each evenly spaced output slot, and
+            # round=up ends slot n at frame n * step, the same targets as above
+            yield from self._pipe_frames(
+                ['-skip_frame', 'noref', '-i', input_path, '-vf', f'fps={fps / step}:round=up',
+                 '-frames:v', str(len(targets))],
+                shape, stats)
+            print(f"Hyperlapse decoded {stats.get('decoded', '?')} of {total_frames} frames "
+                  f"(reference frames only)")
+        
+        else:
+            cap = cv2.VideoCapture(input_path)
+            try:
+                indices = [t + j for t in targets for j in range(blend)]
+                accumulator = np.zeros(shape, dtype=np.float32) if blend > 1 else None
+                group, count, retrieved, last = None, 0, 0, -1
+                for index, frame in self._sample_frames(cap, indices):
+                    retrieved += 1
+                    last = index
+                    if accumulator is None:
+                        yield frame
+                        continue
+                    
+                    target = targets[bisect.bisect_right(targets, index) - 1]
+                    if target != group and count:
+                        yield cv2.convertScaleAbs(accumulator, self.frame_pool.acquire(shape),
+                                                  1.0 / count)
+                        count = 0
+                    if count == 0:
+                        accumulator.fill(0)
+                    group = target
+                    cv2.accumulate(frame, accumulator)
+                    count += 1
+                if count:
+                    yield cv2.convertScaleAbs(accumulator, self.frame_pool.acquire(shape),
+                                              1.0 / count)
+                # grab() still decodes, it only skips the colour conversion
+                print(f"Hyperlapse decoded {last + 1} of {total_frames} frames, "
+                      f"converting {retrieved}")
+            finally:
+                cap.release()
+    
+    def _pipe_frames(self, input_args: List[str], shape: Tuple[int, int, int],
+                     stats: Optional[Dict] = None):
+        """Yield BGR frames decoded by ffmpeg (input_args select the input and
+        filters), read straight into pooled buffers
+        
+        If stats is given, stats["decoded"] is set to the number of frames
+        ffmpeg reports having decoded once the frames run out.
+        """
+        level = 'verbose' if stats is not None else 'error'
+        cmd = (['ffmpeg', '-v', level] + input_args
+               + ['-an', '-sn', '-f', 'rawvideo', '-pix_fmt', 'bgr24', 'pipe:1'])
+        log = tempfile.TemporaryFile(dir=self.temp_dir) if stats is not None else None
+        process = subprocess.Popen(cmd, stdout=subprocess.PIPE,
+                                   stderr=log or subprocess.DEVNULL)
+        try:
+            while True:
+                buffer = self.frame_pool.acquire(shape)
+                if process.stdout.readinto(memoryview(buffer).cast('B')) < buffer.nbytes:
+                    self.frame_pool.release(buffer)
                     break
-                
-                # Convert to float for processing
-                frame_float = frame.astype(np.float32) / 255.0
-                
-                # Apply cinematic LUT (color grading)
-                # Increase contrast, slightly desaturate, add blue tint
-                frame_float = frame_float ** 1.1  # Gamma correction
-                frame_float[:, :, 0] *= 0.9  # Reduce red
-                frame_float[:, :, 1] *= 0.95  # Slightly reduce green
-                frame_float[:, :, 2] *= 1.1   # Increase blue
-                
-                # Add subtle vignette
-                rows, cols = frame_float.shape[:2]
-                X_resultant_kernel = cv2.getGaussianKernel(cols, cols/2)
-                Y_resultant_kernel = cv2.getGaussianKernel(rows, rows/2)
-                kernel = Y_resultant_kernel * X_resultant_kernel.T
-                mask = kernel / np.linalg.norm(kernel)
-                
-                vignette = np.dstack([mask] * 3)
-                frame_float = frame_float * vignette * 0.7 + frame_float * 0.3
-                
-                # Convert back to uint8
-                processed_frame = np.clip(frame_float * 255, 0, 255).astype(np.uint8)
-                
-                out.write(processed_frame)
-                frame_count += 1
-                
-                if frame_count % 100 == 0:
-                    print(f"Processed {frame_count} frames with cinematic effect")
+                yield buffer
             
-            cap.release()
-            out.release()
+            # ffmpeg reports the counts on exit
+            process.wait()
+            if log is not None:
+                log.seek(0)
+                match = DECODED_FRAMES.search(log.read().decode('utf-8', 'replace'))
+                if match:
+                    stats["decoded"] = int(match.group(1))
+        finally:
+            process.stdout.close()
+            if process.poll() is None:
+                process.kill()
+            process.wait()
+            if log is not None:
+                log.close()
+    
+    def create_cinematic_effect(self, input_path: str, output_path: str) -> bool:
+        """Add cinematic look to drone footage"""
+        try:
+            self._render(input_path, output_path, [{"op": "cinematic"}])
             
             print(f"Cinematic effect applied successfully: {output_path}")
             return True
@@ -329,9 +1892,50 @@ class VideoProcessor:
             print(f"Error applying cinematic effect: {e}")
             return False
     
+    def _build_cinematic_stage(self, width: int, height: int) -> Tuple[Callable, Tuple[int, int]]:
+        """Cool color grade with a soft vignette"""
+        # Apply cinematic LUT (color grading)
+        # Increase contrast, slightly desaturate, add blue tint
+        grade = ColorGrade(gamma=1.1,  # Gamma correction
+                           channel_gains=(0.9, 0.95, 1.1))  # Per-channel gains
+        
+        # Add subtle vignette (built once per resolution, applied in fixed point)
+        vignette = self.mask_cache.get("vignette", width, height,
+                                       self._build_vignette_mask, (0.7,),
+                                       fixed_point=True)
+        vignette_scale = 1.0 / MaskCache.FIXED_POINT_ONE
+        
+        def cinematic(frame, t):
+            graded = grade.apply(frame, in_place=True)
+            return cv2.multiply(graded, vignette, dst=graded,
+                                scale=vignette_scale, dtype=cv2.CV_8U)
+        
+        return cinematic, (width, height)
+    
+    @staticmethod
+    def _build_vignette_mask(width: int, height: int, strength: float) -> "np.ndarray":
+        """Per-pixel gain blending a Gaussian falloff with the original frame"""
+        X_resultant_kernel = cv2.getGaussianKernel(width, width/2)
+        Y_resultant_kernel = cv2.getGaussianKernel(height, height/2)
+        kernel = Y_resultant_kernel * X_resultant_kernel.T
+        mask = kernel / np.linalg.norm(kernel)
+        
+        gain = (mask * strength + (1.0 - strength)).astype(np.float32)
+        return np.dstack([gain] * 3)
+    
     def generate_video_thumbnail(self, video_path: str, output_path: str, 
-                                timestamp: float = 1.0) -> bool:
-        """Generate thumbnail from video"""
+                                timestamp: Optional[float] = 1.0) -> bool:
+        """Generate thumbnail from video (timestamp=None picks the best cover frame)"""
+        if timestamp is None:
+            cover = self.select_cover_frame(video_path)
+            if not cover:
+                return False
+            cv2.imwrite(output_path, cover["frame"])
+            print(f"Thumbnail generated at {cover['timestamp']:.2f}s "
+                  f"(score {cover['score']:.2f}): {output_path}")
+            return True
+        
+        cap = None
         try:
             cap = cv2.VideoCapture(video_path)
             fps = cap.get(cv2.CAP_PROP_FPS)
@@ -351,11 +1955,341 @@ class VideoProcessor:
         except Exception as e:
             print(f"Error generating thumbnail: {e}")
             return False
+        finally:
+            if cap is not None:
+                cap.release()
+    
+    # Relative weight of each cover score component
+    COVER_WEIGHTS = {"sharpness": 0.5, "exposure": 0.3, "colorfulness": 0.2}
+    
+    def select_cover_frame(self, video_path: str, samples: int = 24,
+                          analysis_width: int = 320, batch_size: int = 8) -> Dict:
+        """Pick the best-looking frame for a cover from evenly spaced samples
+        
+        Candidates are grab()-skipped to, downscaled to analysis_width and
+        scored in batches for sharpness, exposure and colorfulness. Returns
+        the winning full-resolution frame with its timestamp and scores,
+        or {} on failure.
+        """
+        cap = None
+        try:
+            cap = cv2.VideoCapture(video_path)
+            if not cap.isOpened():
+                raise IOError(f"Cannot open video: {video_path}")
+            
+            fps = cap.get(cv2.CAP_PROP_FPS)
+            total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            targets = [total_frames * (2 * i + 1) // (2 * samples) for i in range(samples)]
+            
+            best = {}
+            batch = []
+            
+            def score_batch():
+                nonlocal best
+                scores = self._score_frames(np.stack([proxy for _, _, proxy in batch]))
+                i = int(np.argmax(scores["score"]))
+                if not best or scores["score"][i] > best["score"]:
+                    frame_index, frame, _ = batch[i]
+                    best = {
+                        "frame_index": frame_index,
+                        "timestamp": frame_index / fps if fps else 0.0,
+                        **{name: float(values[i]) for name, values in scores.items()},
+                        "frame": frame
+                    }
+                batch.clear()
+            
+            for frame_index, frame in self._sample_frames(cap, targets):
+                scale = analysis_width / frame.shape[1]
+                proxy = cv2.resize(frame, (analysis_width, int(round(frame.shape[0] * scale))),
+                                   interpolation=cv2.INTER_AREA)
+                batch.append((frame_index, frame, proxy))
+                if len(batch) == batch_size:
+                    score_batch()
+            if batch:
+                score_batch()
+            
+            return best
+            
+        except Exception as e:
+            print(f"Error selecting cover frame: {e}")
+            return {}
+        finally:
+            if cap is not None:
+                cap.release()
+    
+    @classmethod
+    def _score_frames(cls, frames: "np.ndarray") -> Dict[str, "np.ndarray"]:
+        """Per-frame quality scores in [0, 1] for an (N, H, W, 3) BGR batch"""
+        pixels = frames.astype(np.float32)
+        b, g, r = pixels[..., 0], pixels[..., 1], pixels[..., 2]
+        luma = 0.114 * b + 0.587 * g + 0.299 * r
+        
+        # Sharpness: variance of the 4-neighbour Laplacian
+        laplacian = (luma[:, :-2, 1:-1] + luma[:, 2:, 1:-1] + luma[:, 1:-1, :-2]
+                     + luma[:, 1:-1, 2:] - 4.0 * luma[:, 1:-1, 1:-1])
+        sharpness = laplacian.var(axis=(1, 2))
+        
+        # Exposure: mid-grey mean with few crushed or blown pixels
+        mean = luma.mean(axis=(1, 2)) / 255.0
+        clipped = ((luma < 5) | (luma > 250)).mean(axis=(1, 2))
+        exposure = np.clip(1.0 - 2.0 * np.abs(mean - 0.5) - clipped, 0.0, 1.0)
+        
+        # Colorfulness (Hasler & Suesstrunk)
+        rg = r - g
+        yb = 0.5 * (r + g) - b
+        colorfulness = (np.sqrt(rg.var(axis=(1, 2)) + yb.var(axis=(1, 2)))
+                        + 0.3 * np.sqrt(rg.mean(axis=(1, 2)) ** 2 + yb.mean(axis=(1, 2)) ** 2))
+        
+        scores = {
+            "sharpness": sharpness / (sharpness + 200.0),
+            "exposure": exposure,
+            "colorfulness": colorfulness / (colorfulness + 40.0)
+        }
+        scores["score"] = sum(cls.COVER_WEIGHTS[name] * scores[name] for name in cls.COVER_WEIGHTS)
+        return scores
+    
+    # Relative weight of each per-second highlight score component
+    HIGHLIGHT_WEIGHTS = {"motion": 0.4, "sharpness": 0.4, "exposure": 0.2}
+    
+    def find_highlight(self, video_path: str, duration: float = 30.0,
+                      sample_fps: float = 2.0, analysis_width: int = 160) -> Dict:
+        """Find the highest-scoring window of a long take
+        
+        Decodes a downscaled proxy at sample_fps, scores every second for
+        motion, sharpness and exposure, and slides a duration-long window
+        over the per-second scores. Returns start_time, duration, score and
+        the per-second scores, or {} on failure.
+        """
+        try:
+            seconds = {}
+            previous = None
+            batch = []
+            
+            def score_batch():
+                nonlocal previous
+                frames = np.stack([frame for _, frame in batch])
+                scores = self._score_frames(frames)
+                
+                # Motion: mean absolute luma change from the previous sample
+                luma = frames.mean(axis=3)
+                before = np.concatenate([luma[:1] if previous is None else previous[None], luma[:-1]])
+                motion = np.abs(luma - before).mean(axis=(1, 2))
+                previous = luma[-1]
+                scores["motion"] = motion / (motion + 10.0)
+                
+                score = sum(self.HIGHLIGHT_WEIGHTS[name] * scores[name]
+                            for name in self.HIGHLIGHT_WEIGHTS)
+                for (t, _), value in zip(batch, score):
+                    seconds.setdefault(int(t), []).append(float(value))
+                batch.clear()
+            
+            for t, frame in self._proxy_frames(video_path, sample_fps, analysis_width):
+                batch.append((t, frame))
+                if len(batch) == 32:
+                    score_batch()
+            if batch:
+                score_batch()
+            
+            if not seconds:
+                raise IOError(f"No frames decoded from {video_path}")
+            
+            per_second = np.zeros(max(seconds) + 1)
+            for second, values in seconds.items():
+                per_second[second] = np.mean(values)
+            
+            # Sliding-window sum over whole seconds
+            window = max(1, min(len(per_second), int(np.ceil(duration))))
+            sums = np.convolve(per_second, np.ones(window), mode="valid")
+            start = int(np.argmax(sums))
+            
+            return {
+                "start_time": float(start),
+                "duration": float(min(duration, len(per_second) - start)),
+                "score": float(sums[start] / window),
+                "per_second": per_second.tolist()
+            }
+            
+        except Exception as e:
+            print(f"Error finding highlight: {e}")
+            return {}
+    
+    def extract_highlight(self, input_path: str, output_path: str,
+                         duration: float = 30.0) -> bool:
+        """Trim a long take down to its best duration-long window"""
+        highlight = self.find_highlight(input_path, duration)
+        if not highlight:
+            return False
+        
+        print(f"Highlight: {highlight['start_time']:.0f}s-"
+              f"{highlight['start_time'] + highlight['duration']:.0f}s "
+              f"(score {highlight['score']:.2f})")
+        return self.trim_video(input_path, output_path,
+                               highlight["start_time"], highlight["duration"])
+    
+    def _proxy_frames(self, video_path: str, sample_fps: Optional[float], width: int,
+                     gray: bool = False):
+        """Yield (t, frame) for a low-resolution proxy of a clip, sampled at
+        sample_fps or (sample_fps=None) with every frame
+        
+        ffmpeg decodes, drops and scales in one native pass; when sampling it
+        also skips non-reference frames and deblocking that a sparse, tiny
+        proxy does not need. Without ffmpeg, OpenCV grab()-skips and each kept
+        frame is resized.
+        """
+        info = self.get_video_info(video_path)
+        if not info.get("width") or not info.get("fps"):
+            raise IOError(f"Cannot read video info: {video_path}")
+        fps = info["fps"]
+        height = max(2, int(round(info["height"] * width / info["width"] / 2)) * 2)
+        shape = (height, width) if gray else (height, width, 3)
+        
+        if shutil.which("ffmpeg"):
+            scale = f'scale={width}:{height}:flags=area'
+            cmd = ['ffmpeg', '-v', 'error']
+            if sample_fps:
+                cmd += ['-skip_frame', 'noref', '-skip_loop_filter', 'all', '-flags2', '+fast']
+            cmd += [
+                '-i', video_path,
+                '-an', '-sn',
+                '-vf', f'fps={sample_fps},{scale}' if sample_fps else scale,
+                '-f', 'rawvideo',
+                '-pix_fmt', 'gray' if gray else 'bgr24',
+                'pipe:1'
+            ]
+            if not sample_fps:
+                cmd[-1:-1] = ['-vsync', 'passthrough']
+            frame_bytes = int(np.prod(shape))
+            process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+            try:
+                index = 0
+                while True:
+                    data = process.stdout.read(frame_bytes)
+                    if len(data) < frame_bytes:
+                        break
+                    yield index / (sample_fps or fps), np.frombuffer(data, np.uint8).reshape(shape)
+                    index += 1
+            finally:
+                process.stdout.close()
+                process.kill()
+                process.wait()
+            return
+        
+        cap = cv2.VideoCapture(video_path)
+        try:
+            step = max(1.0, fps / sample_fps) if sample_fps else 1.0
+            targets = [int(i * step) for i in range(int(info.get("frame_count", 0) / step) + 1)]
+            for frame_index, frame in self._sample_frames(cap, targets):
+                if gray:
+                    frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+                yield frame_index / fps, cv2.resize(frame, (width, height),
+                                                    interpolation=cv2.INTER_AREA)
         finally:
             cap.release()
     
+    def generate_thumbnails(self, video_path: str, output_dir: str,
+                           timestamps: Optional[List[float]] = None,
+                           count: int = 8,
+                           contact_sheet: Optional[str] = None,
+                           columns: int = 4, thumb_width: int = 270) -> List[str]:
+        """Extract many thumbnails in one sequential pass over the stream
+        
+        Takes explicit timestamps, or count evenly spaced frames when none are
+        given. Frames between targets are skipped with grab() and only targets
+        are decoded, so N thumbnails cost one walk instead of N seeks.
+        Optionally tiles them into a contact sheet image. Returns the paths
+        of the thumbnails written.
+        """
+        cap = None
+        try:
+            cap = cv2.VideoCapture(video_path)
+            if not cap.isOpened():
+                raise IOError(f"Cannot open video: {video_path}")
+            
+            fps = cap.get(cv2.CAP_PROP_FPS)
+            total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            if timestamps is None:
+                targets = [total_frames * (2 * i + 1) // (2 * count) for i in range(count)]
+            else:
+                targets = [int(t * fps) for t in timestamps]
+            if total_frames > 0:
+                targets = [min(max(0, t), total_frames - 1) for t in targets]
+            
+            os.makedirs(output_dir, exist_ok=True)
+            base = os.path.splitext(os.path.basename(video_path))[0]
+            
+            paths = []
+            tiles = []
+            for frame_index, frame in self._sample_frames(cap, targets):
+                path = os.path.join(output_dir, f"{base}_{frame_index:06d}.jpg")
+                cv2.imwrite(path, frame)
+                paths.append(path)
+                
+                if contact_sheet:
+                    tile_height = int(round(frame.shape[0] * thumb_width / frame.shape[1]))
+                    tiles.append(cv2.resize(frame, (thumb_width, tile_height),
+                                            interpolation=cv2.INTER_AREA))
+            
+            if contact_sheet and tiles:
+                cv2.imwrite(contact_sheet, self._tile_contact_sheet(tiles, columns))
+                print(f"Contact sheet generated: {contact_sheet}")
+            
+            print(f"Generated {len(paths)} thumbnails in {output_dir}")
+            return paths
+            
+        except Exception as e:
+            print(f"Error generating thumbnails: {e}")
+            return []
+        finally:
+            if cap is not None:
+                cap.release()
+    
+    @staticmethod
+    def _sample_frames(cap, frame_indices: Iterable[int]):
+        """Yield (index, frame) for the given frame indices in one forward walk,
+        grabbing past everything in between without decoding it"""
+        position = 0
+        for target in sorted(set(frame_indices)):
+            while position < target:
+                if not cap.grab():
+                    return
+                position += 1
+            
+            if not cap.grab():
+                return
+            position += 1
+            ret, frame = cap.retrieve()
+            if not ret:
+                return
+            yield target, frame
+    
+    @staticmethod
+    def _tile_contact_sheet(tiles: List["np.ndarray"], columns: int,
+                            gap: int = 4) -> "np.ndarray":
+        """Lay equally sized tiles out in a grid on a black sheet"""
+        tile_height, tile_width = tiles[0].shape[:2]
+        columns = max(1, min(columns, len(tiles)))
+        rows = (len(tiles) + columns - 1) // columns
+        
+        sheet = np.zeros((rows * (tile_height + gap) + gap,
+                          columns * (tile_width + gap) + gap, 3), dtype=np.uint8)
+        for i, tile in enumerate(tiles):
+            row, column = divmod(i, columns)
+            y = gap + row * (tile_height + gap)
+            x = gap + column * (tile_width + gap)
+            sheet[y:y + tile_height, x:x + tile_width] = tile[:tile_height, :tile_width]
+        return sheet
+    
     def get_video_info(self, video_path: str) -> Dict:
         """Get video metadata"""
+        # MP4/MOV headers answer this without starting a decoder
+        if is_mp4(video_path):
+            try:
+                info = read_mp4_info(video_path)
+                if info.get("frame_count"):
+                    return info
+            except (OSError, ValueError):
+                pass
+        
         try:
             cap = cv2.VideoCapture(video_path)
             
@@ -374,6 +2308,13 @@ class VideoProcessor:
             print(f"Error getting video info: {e}")
             return {}
 
+def _render_segment(input_path: str, output_path: str, operations: List[Dict],
+                    frame_range: Tuple[int, int], encoder: str = "opencv",
+                    preset: str = "veryfast", crf: int = 23) -> int:
+    """Process-pool entry point: render one frame range of a clip serially"""
+    processor = VideoProcessor(workers=1, encoder=encoder, preset=preset, crf=crf)
+    return processor._render_frames(input_path, output_path, operations, frame_range)
+
 class MockVideoProcessor:
     """Mock video processor for testing without actual video files"""
     
@@ -382,14 +2323,49 @@ class MockVideoProcessor:
         print(f"Mock video processor using temp directory: {self.temp_dir}")
     
     def resize_video(self, input_path: str, output_path: str, 
-                    width: int = 1080, height: int = 1920) -> bool:
+                    width: int = 1080, height: int = 1920,
+                    auto_reframe: bool = False) -> bool:
         print(f"Mock: Resizing {input_path} -> {output_path} ({width}x{height})")
         return True
     
+    def process_video(self, input_path: str, output_path: str, 
+                     operations: List[Dict]) -> bool:
+        steps = ", ".join(op.get("op", "?") for op in operations)
+        print(f"Mock: Processing {input_path} [{steps}] -> {output_path}")
+        return True
+    
+    def process_video_parallel(self, input_path: str, output_path: str,
+                              operations: List[Dict],
+                              workers: Optional[int] = None) -> bool:
+        return self.process_video(input_path, output_path, operations)
+    
+    def process_variants(self, input_path: str,
+                        variants: List[Tuple[str, List[Dict]]]) -> bool:
+        for output_path, operations in variants:
+            self.process_video(input_path, output_path, operations)
+        return True
+    
+    def render_to_cache(self, input_path: str, operations: List[Dict],
+                       workers: Optional[int] = None) -> Optional[str]:
+        steps = ", ".join(op.get("op", "?") for op in operations)
+        print(f"Mock: Rendering {input_path} [{steps}] to cache")
+        return os.path.join(self.temp_dir, os.path.basename(input_path))
+    
     def add_music(self, video_path: str, audio_path: str, output_path: str) -> bool:
         print(f"Mock: Adding music {audio_path} to {video_path} -> {output_path}")
         return True
     
+    def analyze_music(self, audio_path: str) -> Dict:
+        print(f"Mock: Analyzing music {audio_path}")
+        return {"duration": 30.0, "tempo": 120.0,
+                "beats": [i * 0.5 for i in range(60)], "onsets": []}
+    
+    def plan_beat_synced_cuts(self, audio_path: str, clip_paths: List[str],
+                             duration: float = 30.0, beats_per_cut: int = 4) -> List[Dict]:
+        print(f"Mock: Planning beat-synced cuts for {audio_path}")
+        return plan_beat_cuts(self.analyze_music(audio_path)["beats"],
+                              [(path, 30.0) for path in clip_paths], duration, beats_per_cut)
+    
     def trim_video(self, input_path: str, output_path: str, 
                   start_time: float, duration: float) -> bool:
         print(f"Mock: Trimming {input_path} ({start_time}s, {duration}s) -> {output_path}")
@@ -406,16 +2382,63 @@ class MockVideoProcessor:
         print(f"Mock: Adding text '{text}' to {input_path} -> {output_path}")
         return True
     
+    def add_captions(self, input_path: str, output_path: str,
+                    captions: List[Dict]) -> bool:
+        print(f"Mock: Adding {len(captions)} captions to {input_path} -> {output_path}")
+        return True
+    
+    def stabilize_video(self, input_path: str, output_path: str,
+                       smoothing_radius: int = 15) -> bool:
+        print(f"Mock: Stabilizing {input_path} -> {output_path}")
+        return True
+    
+    def create_hyperlapse(self, input_path: str, output_path: str, speed: float = 10.0,
+                         blend: int = 1, stabilize: bool = True) -> bool:
+        print(f"Mock: Creating {speed}x hyperlapse {input_path} -> {output_path}")
+        return True
+    
     def create_cinematic_effect(self, input_path: str, output_path: str) -> bool:
         print(f"Mock: Adding cinematic effect to {input_path} -> {output_path}")
         return True
     
     def generate_video_thumbnail(self, video_path: str, output_path: str, 
-                                timestamp: float = 1.0) -> bool:
+                                timestamp: Optional[float] = 1.0) -> bool:
         print(f"Mock: Generating thumbnail from {video_path} -> {output_path}")
         return True
     
+    def find_highlight(self, video_path: str, duration: float = 30.0,
+                      sample_fps: float = 2.0, analysis_width: int = 160) -> Dict:
+        print(f"Mock: Finding {duration}s highlight in {video_path}")
+        return {"start_time": 0.0, "duration": duration, "score": 0.8, "per_second": []}
+    
+    def extract_highlight(self, input_path: str, output_path: str,
+                         duration: float = 30.0) -> bool:
+        print(f"Mock: Extracting {duration}s highlight from {input_path} -> {output_path}")
+        return True
+    
+    def select_cover_frame(self, video_path: str, samples: int = 24,
+                          analysis_width: int = 320, batch_size: int = 8) -> Dict:
+        print(f"Mock: Selecting cover frame from {video_path}")
+        return {"frame_index": 30, "timestamp": 1.0, "score": 0.8, "sharpness": 0.8,
+                "exposure": 0.8, "colorfulness": 0.8, "frame": None}
+    
+    def generate_thumbnails(self, video_path: str, output_dir: str,
+                           timestamps: Optional[List[float]] = None,
+                           count: int = 8,
+                           contact_sheet: Optional[str] = None,
+                           columns: int = 4, thumb_width: int = 270) -> List[str]:
+        targets = timestamps if timestamps is not None else range(count)
+        print(f"Mock: Generating {len(targets)} thumbnails from {video_path} -> {output_dir}")
+        return [os.path.join(output_dir, f"thumbnail_{i}.jpg") for i in range(len(targets))]
+    
     def get_video_info(self, video_path: str) -> Dict:
+        # Header parsing needs no video libraries, so real files get real values
+        if is_mp4(video_path) and os.path.exists(video_path):
+            try:
+                return {**read_mp4_info(video_path), "mock": True}
+            except (OSError, ValueError):
+                pass
+        
         return {
             "width": 1080,
             "height": 1920,
@@ -430,10 +2453,10 @@ def create_video_processor(use_mock: bool = True):
     if use_mock:
         return MockVideoProcessor()
     
-    try:
-        # Check if cv2 is available
-        import cv2
-        return VideoProcessor()
-    except ImportError:
+    if not VIDEO_PROCESSING_AVAILABLE:
         print("OpenCV not available, using mock processor")
-        return MockVideoProcessor()
\ No newline at end of file
+        return MockVideoProcessor()
+    
+    # Persistent caches are opt-in: set RENDER_CACHE_DIR / AUDIO_CACHE_DIR
+    return VideoProcessor(cache_dir=os.getenv("RENDER_CACHE_DIR") or None,
+                          audio_cache_dir=os.getenv("AUDIO_CACHE_DIR") or None)
\ No newline at end of file